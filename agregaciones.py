@@ -0,0 +1,98 @@
+# agregaciones.py
+
+import db
+from config import LARGO_VISTA_PREVIA
+
+MS_POR_MINUTO = 60 * 1000
+MS_POR_DIA = 24 * 60 * MS_POR_MINUTO
+
+# Referencia de cierre de una interrupción: "fin" si existe, si no "fecha_hora"
+REFERENCIA = {"$ifNull": ["$fin", "$fecha_hora"]}
+
+
+def minutos_entre(desde, hasta):
+    return {"$toInt": {"$floor": {"$divide": [{"$subtract": [hasta, desde]}, MS_POR_MINUTO]}}}
+
+
+# =========================
+# HISTORIAL DE INTERRUPCIONES
+# =========================
+def pipeline_historial_interrupciones(limite=None, antes_de=None):
+    # Primero la página (índice evento, fecha_hora, _id) más la interrupción
+    # anterior, que solo hace falta para el $shift del gap. Los conteos miran
+    # hasta 7 días atrás, fuera de la página: un $lookup por fila sobre el mismo
+    # índice, acotado a ese rango, en vez de una ventana sobre todo el historial
+    filtro = {"evento": "interrupcion"}
+    if antes_de is not None:
+        filtro.update(db.anteriores("fecha_hora", antes_de))
+
+    pipeline = [
+        {"$match": filtro},
+        {"$sort": {"fecha_hora": -1, "_id": -1}},
+    ]
+    if limite:
+        pipeline.append({"$limit": limite + 1})
+
+    pipeline += [
+        {"$setWindowFields": {
+            # Con _id el orden es total: con fechas repetidas el $shift no es arbitrario
+            "sortBy": {"fecha_hora": 1, "_id": 1},
+            "output": {"referencia_anterior": {"$shift": {"output": REFERENCIA, "by": -1}}},
+        }},
+        {"$sort": {"fecha_hora": -1, "_id": -1}},
+    ]
+    if limite:
+        pipeline.append({"$limit": limite})
+
+    pipeline += [
+        {"$lookup": {
+            "from": db.coleccion_eventos.name,
+            "let": {"fecha": "$fecha_hora"},
+            "pipeline": [
+                {"$match": {"evento": "interrupcion", "$expr": {"$and": [
+                    {"$gte": ["$fecha_hora", {"$subtract": ["$$fecha", 7 * MS_POR_DIA]}]},
+                    {"$lte": ["$fecha_hora", "$$fecha"]},
+                ]}}},
+                {"$group": {
+                    "_id": None,
+                    "semana": {"$sum": 1},
+                    "dia": {"$sum": {"$cond": [
+                        {"$gte": ["$fecha_hora", {"$subtract": ["$$fecha", MS_POR_DIA]}]}, 1, 0
+                    ]}},
+                }},
+            ],
+            "as": "conteos",
+        }},
+        {"$set": {
+            "duracion_calc": {"$cond": [
+                {"$and": [{"$ifNull": ["$inicio", False]}, {"$ifNull": ["$fin", False]}]},
+                minutos_entre("$inicio", "$fin"),
+                None
+            ]},
+            "gap_calc": {"$cond": [
+                {"$and": [{"$ifNull": ["$inicio", False]}, {"$ifNull": ["$referencia_anterior", False]}]},
+                minutos_entre("$referencia_anterior", "$inicio"),
+                None
+            ]},
+        }},
+        {"$project": {
+            "fecha_hora": 1,
+            "texto": {"$substrCP": [{"$ifNull": ["$texto", ""]}, 0, LARGO_VISTA_PREVIA]},
+            "largo_texto": {"$strLenCP": {"$ifNull": ["$texto", ""]}},
+            "duracion_min": {"$ifNull": ["$duracion_calc", "$duracion_min"]},
+            "desde_anterior_min": {"$cond": [{"$gte": ["$gap_calc", 0]}, "$gap_calc", None]},
+            "conteo_dia": {"$ifNull": [{"$first": "$conteos.dia"}, 0]},
+            "conteo_semana": {"$ifNull": [{"$first": "$conteos.semana"}, 0]},
+        }},
+    ]
+
+    return pipeline
+
+
+def historial_interrupciones(limite=None, antes_de=None):
+    return list(db.coleccion_eventos.aggregate(pipeline_historial_interrupciones(limite, antes_de)))
+
+
+def texto_interrupcion(_id):
+    doc = db.coleccion_eventos.find_one({"_id": _id}, {"texto": 1})
+    return (doc or {}).get("texto", "")
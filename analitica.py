@@ -0,0 +1,137 @@
+# analitica.py
+
+import streamlit as st
+
+from config import DESFASE_COLOMBIA, dias_semana_3letras
+import db
+import instantaneas
+from estado import estado_actual
+
+# Bordes del histograma de rachas, en minutos
+BORDES_RACHAS = [0, 60, 6 * 60, 24 * 60, 3 * 1440, 7 * 1440, 14 * 1440, 30 * 1440, 90 * 1440, float("inf")]
+ETIQUETAS_RACHAS = ["<1h", "1-6h", "6h-1d", "1-3d", "3-7d", "7-14d", "14-30d", "30-90d", "≥90d"]
+
+PERCENTILES = [25, 50, 75, 90]
+
+
+# =========================
+# CÁLCULOS (SOBRE ARREGLOS DE SEGUNDOS UTC, ORDENADOS)
+# =========================
+def rachas_minutos(ts):
+    import numpy as np
+    return np.diff(ts) / 60
+
+
+def resumen_rachas(rachas):
+    import numpy as np
+    if len(rachas) == 0:
+        return {"n": 0, "mas_larga": 0, "media": 0, **{f"p{p}": 0 for p in PERCENTILES}}
+
+    percentiles = np.percentile(rachas, PERCENTILES)
+    return {
+        "n": int(len(rachas)),
+        "mas_larga": float(rachas.max()),
+        "media": float(rachas.mean()),
+        **{f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+    }
+
+
+def histograma_rachas(rachas):
+    import numpy as np
+    import pandas as pd
+    conteos, _ = np.histogram(rachas, bins=BORDES_RACHAS)
+    return pd.Series(conteos, index=ETIQUETAS_RACHAS, name="Rachas")
+
+
+def mapa_calor(ts):
+    import numpy as np
+    import pandas as pd
+    local = ts + DESFASE_COLOMBIA
+    dias = local // 86400
+    # 1970-01-01 fue jueves (weekday 3)
+    dia_semana = (dias + 3) % 7
+    hora = (local % 86400) // 3600
+
+    conteos = np.bincount(dia_semana * 24 + hora, minlength=7 * 24).reshape(7, 24)
+    return pd.DataFrame(conteos, index=[dias_semana_3letras[i] for i in range(7)], columns=range(24))
+
+
+def frecuencia_movil(ts, ventana_dias=7):
+    # Eventos en los últimos `ventana_dias` días, evaluado al final de cada día local
+    import numpy as np
+    import pandas as pd
+    if len(ts) == 0:
+        return pd.Series(dtype="int64", name=f"Últimos {ventana_dias} días")
+
+    local = ts + DESFASE_COLOMBIA
+    dias = np.arange(local[0] // 86400, local[-1] // 86400 + 1)
+    cortes = (dias + 1) * 86400
+
+    hasta = np.searchsorted(local, cortes, side="left")
+    desde = np.searchsorted(local, cortes - ventana_dias * 86400, side="left")
+
+    fechas = pd.to_datetime(dias, unit="D")
+    return pd.Series(hasta - desde, index=fechas, name=f"Últimos {ventana_dias} días")
+
+
+def calcular(ts):
+    rachas = rachas_minutos(ts)
+    return {
+        "resumen": resumen_rachas(rachas),
+        "histograma": histograma_rachas(rachas),
+        "mapa_calor": mapa_calor(ts),
+        "frecuencia": frecuencia_movil(ts),
+    }
+
+
+# =========================
+# CARGA + CACHÉ
+# =========================
+def _cargar(filtro):
+    import numpy as np
+    import pandas as pd
+    fechas = [d["fecha_hora"] for d in db.coleccion_eventos.find(filtro, {"_id": 0, "fecha_hora": 1})]
+    if not fechas:
+        return np.array([], dtype="int64")
+    return np.sort(pd.to_datetime(fechas, utc=True).as_unit("s").asi8)
+
+
+@st.cache_resource
+def _cache_analitica():
+    # evento -> {"clave": (ultima, conteo), "ts": arreglo, "resultado": dict}
+    return {}
+
+
+def analitica_evento(evento):
+    # La clave sale de estado_actual (una consulta por _id); solo si cambió se
+    # traen de Mongo los eventos nuevos y se recalcula sobre el arreglo completo
+    import numpy as np
+    estado = estado_actual(evento)
+    if not estado:
+        return calcular(np.array([], dtype="int64"))
+
+    cache = _cache_analitica()
+    clave = (estado["ultima"], estado["conteo"])
+
+    entrada = cache.get(evento)
+    if entrada and entrada["clave"] == clave:
+        return entrada["resultado"]
+
+    ts = None
+    if entrada:
+        nuevos = _cargar({"evento": evento, "fecha_hora": {"$gt": entrada["clave"][0]}})
+        if len(entrada["ts"]) + len(nuevos) == estado["conteo"]:
+            ts = np.concatenate([entrada["ts"], nuevos])
+
+    if ts is None:
+        # Primera carga, o hubo registros atrasados: instantánea + lo nuevo de Mongo,
+        # y si el total no cuadra con el conteo, todo desde Mongo
+        fechas = instantaneas.fechas("coleccion_eventos", estado["conteo"], evento=evento)
+        if fechas is not None:
+            ts = np.sort(fechas.astype("datetime64[s]").astype("int64"))
+        else:
+            ts = _cargar({"evento": evento})
+
+    resultado = calcular(ts)
+    cache[evento] = {"clave": clave, "ts": ts, "resultado": resultado}
+    return resultado
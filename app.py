@@ -2,19 +2,27 @@
 
 import streamlit as st
 from datetime import datetime, timedelta
-import pandas as pd
 
 # =========================
 # IMPORTS PROPIOS
 # =========================
-from config import EVENTO_A, EVENTO_B, colombia
-from db import coleccion_eventos, coleccion_capital_b
+from instrumentacion import iniciar_rerun, terminar_rerun, panel_debug, ACTIVA as INSTRUMENTACION_ACTIVA
+from config import EVENTO_A, EVENTO_B, colombia, TAMANO_PAGINA_HISTORIAL, LARGO_VISTA_PREVIA, REFRESCO_SESIONES_SEGUNDOS
+import db
+import formato
+import instantaneas
+import busqueda
+import proyeccion
 from helpers import (
     registrar_evento,
     mostrar_racha,
     obtener_registros,
     obtener_reflexiones,
+    contar_reflexiones,
     guardar_reflexion,
+    cola_clasificacion,
+    buffer_escrituras,
+    refrescar_estados,
     minutos_a_tiempo_humano
 )
 from servicios import (
@@ -23,10 +31,14 @@ from servicios import (
     obtener_historial_capital_b
 )
 from interrupcion import mostrar_interrupcion
+from agregaciones import historial_interrupciones, texto_interrupcion
+from analitica import analitica_evento
 
 # =========================
 # CONFIGURACIÓN
 # =========================
+iniciar_rerun(st.session_state)
+
 st.set_page_config(page_title="Reinicia", layout="centered")
 st.title("Reinicia")
 
@@ -61,17 +73,65 @@ seleccion = st.selectbox(
 
 opcion = eventos[seleccion]
 
+# El menú ya está pintado: la primera conexión a Mongo no retrasa el primer cuadro
+conectado = db.conexion_saludable()
+
+# Registrar no necesita Mongo: las escrituras esperan en el buffer local
+sincronizacion = buffer_escrituras().resumen()
+st.caption(
+    f"☁️ {sincronizacion['sincronizados']} sincronizados · ⏳ {sincronizacion['pendientes']} pendientes"
+    + (f" · ✖ {sincronizacion['fallidos']} rechazados" if sincronizacion["fallidos"] else "")
+)
+
+if not conectado:
+    if opcion == "historial":
+        st.error("Sin conexión con la base de datos. Reintentando…")
+        st.stop()
+    st.warning("Sin conexión: lo que registres se guarda en este equipo y se envía al volver la conexión.")
+else:
+    # Retoma las reflexiones que quedaron pendientes de clasificar
+    cola_clasificacion()
+
 # =========================
-# CARGA ESTADO INICIAL
+# ESTADO (Y CAMBIOS DESDE OTROS DISPOSITIVOS)
 # =========================
-for ev in [EVENTO_A, EVENTO_B]:
-    if ev not in st.session_state:
-        ultimo = coleccion_eventos.find_one(
-            {"evento": ev},
-            sort=[("fecha_hora", -1)]
-        )
-        if ultimo:
-            st.session_state[ev] = ultimo["fecha_hora"].astimezone(colombia)
+@st.fragment(run_every=REFRESCO_SESIONES_SEGUNDOS)
+def vigilar_estados():
+    # Solo las pantallas de racha se redibujan; las demás toman el valor nuevo al volver
+    if refrescar_estados(st.session_state) and opcion in [EVENTO_A, EVENTO_B]:
+        st.rerun()
+
+
+if conectado:
+    refrescar_estados(st.session_state)
+    vigilar_estados()
+
+# =========================
+# HISTORIAL PAGINADO
+# =========================
+# Cada lista guarda en la sesión lo ya cargado; "Cargar más" pide a Mongo
+# solo la página siguiente, anterior a la última (fecha, _id) vista
+def pagina_historial(clave, cargar):
+    estado = f"pagina_{clave}"
+    if estado not in st.session_state:
+        filas = cargar(TAMANO_PAGINA_HISTORIAL, None)
+        st.session_state[estado] = {"filas": filas, "hay_mas": len(filas) == TAMANO_PAGINA_HISTORIAL}
+    return st.session_state[estado]["filas"]
+
+
+def boton_cargar_mas(clave, cargar, campo_fecha):
+    pagina = st.session_state[f"pagina_{clave}"]
+    if pagina["hay_mas"] and st.button("Cargar más", key=f"mas_{clave}"):
+        ultima = pagina["filas"][-1]
+        nuevas = cargar(TAMANO_PAGINA_HISTORIAL, (ultima[campo_fecha], ultima["_id"]))
+        pagina["filas"] = pagina["filas"] + nuevas
+        pagina["hay_mas"] = len(nuevas) == TAMANO_PAGINA_HISTORIAL
+        st.rerun()
+
+
+if opcion != "historial":
+    for k in [k for k in st.session_state if k.startswith(("pagina_", "filas_"))]:
+        del st.session_state[k]
 
 # =========================
 # RESET INTERRUPCIÓN SI SALES
@@ -83,7 +143,8 @@ if opcion != "interrupcion":
         "interrupcion_fin",
         "interrupcion_texto",
         "interrupcion_cerrada",
-        "interrupcion_guardada"
+        "interrupcion_guardada",
+        "interrupcion_gap"
     ]:
         if k in st.session_state:
             del st.session_state[k]
@@ -124,12 +185,7 @@ elif opcion == "viaje_tiempo":
 
     monto, objetivo, progreso = obtener_capital_desde_ynab()
 
-    monto_formateado = (
-        f"{monto:,.2f}"
-        .replace(",", "X")
-        .replace(".", ",")
-        .replace("X", ".")
-    )
+    monto_formateado = formato.cop(monto)
 
     st.markdown(f"**Capital detectado en YNAB:** {monto_formateado} COP")
 
@@ -139,19 +195,14 @@ elif opcion == "viaje_tiempo":
 
     st.metric(
         "Tiempo acumulado",
-        f"+ {int(monto):,} minutos".replace(",", "."),
+        f"+ {formato.numero(int(monto), 0)} minutos",
         tiempo_humano
     )
 
     years = monto / 525600
     st.caption(f"≈ {years:.2f} años de vida acumulados")
 
-    objetivo_formateado = (
-        f"{objetivo:,.2f}"
-        .replace(",", "X")
-        .replace(".", ",")
-        .replace("X", ".")
-    )
+    objetivo_formateado = formato.cop(objetivo)
 
     st.markdown(f"**Objetivo YNAB:** {objetivo_formateado} COP")
     st.progress(min(max(progreso / 100, 0), 1))
@@ -169,7 +220,7 @@ elif opcion == "viaje_tiempo":
 
             st.success(f"{tiempo_adelanto}")
             st.markdown(f"**Capital:** {monto_formateado} COP")
-            st.markdown(f"**Fecha equivalente futura:** {fecha_futura.strftime('%d-%m-%y %H:%M')}")
+            st.markdown(f"**Fecha equivalente futura:** {fecha_futura.strftime(formato.FORMATO_FECHA_HORA)}")
 
         elif diferencia == 0:
             fecha_futura = ahora
@@ -180,9 +231,56 @@ elif opcion == "viaje_tiempo":
             fecha_futura = ahora
             st.warning(f"Atraso detectado: {atraso} minutos")
 
+        # =========================
+        # 📈 PROYECCIÓN
+        # =========================
+        # La serie queda en caché hasta que se guarde otro registro de capital;
+        # la ventana del ajuste termina ahora
+        ajuste = proyeccion.ajuste_capital(ahora)
+        p = proyeccion.proyectar(ajuste, monto, objetivo, minutos_actuales, ahora)
+
+        st.markdown("### 📈 Proyección")
+        if ajuste is None:
+            st.caption(
+                "Hacen falta al menos dos registros de capital en fechas distintas, el último de "
+                f"los últimos {proyeccion.VENTANA_DIAS} días, para proyectar."
+            )
+        else:
+            st.metric(
+                "Ritmo de ahorro",
+                f"{formato.cop(p['velocidad'])} COP/día",
+                f"{formato.cop(p['neto'])} COP/día frente a la racha"
+            )
+            st.caption(
+                f"Ajuste sobre {ajuste['registros']} registros del "
+                f"{ajuste['desde'].astimezone(colombia).strftime(formato.FORMATO_FECHA)} al "
+                f"{ajuste['hasta'].astimezone(colombia).strftime(formato.FORMATO_FECHA)} · R² {ajuste['r2']:.2f}"
+            )
+            if ajuste["dias_sin_registros"] >= 1:
+                st.caption(
+                    f"⚠️ El último registro de capital es de hace {int(ajuste['dias_sin_registros'])} días: "
+                    "el ritmo puede estar desactualizado."
+                )
+
+            if p["objetivo_alcanzado"]:
+                st.markdown("🎯 **Objetivo YNAB:** alcanzado")
+            elif p["fecha_objetivo"]:
+                st.markdown(f"🎯 **Objetivo YNAB:** {p['fecha_objetivo'].strftime(formato.FORMATO_FECHA)}")
+            else:
+                st.markdown("🎯 **Objetivo YNAB:** al ritmo actual no se alcanza")
+
+            if p["fecha_cruce"] and p["diferencia"] < 0:
+                st.markdown(f"⚖️ **Sin atraso desde:** {p['fecha_cruce'].strftime(formato.FORMATO_FECHA)}")
+            elif p["fecha_cruce"]:
+                st.markdown(f"⚖️ **La ventaja se agota:** {p['fecha_cruce'].strftime(formato.FORMATO_FECHA)}")
+            elif p["diferencia"] < 0:
+                st.markdown("⚖️ Al ritmo actual el atraso sigue creciendo")
+            else:
+                st.markdown("⚖️ Al ritmo actual la ventaja se mantiene")
+
         if "mensaje_guardado" not in st.session_state:
             if st.button("Guardar estado"):
-                coleccion_capital_b.insert_one({
+                buffer_escrituras().anotar(db.coleccion_capital_b, {
                     "fecha_registro": ahora,
                     "fecha_futura": fecha_futura,
                     "monto": monto
@@ -190,7 +288,7 @@ elif opcion == "viaje_tiempo":
 
                 st.session_state["mensaje_guardado"] = {
                     "capital": monto_formateado,
-                    "fecha_futura": fecha_futura.strftime("%d-%m-%y %H:%M")
+                    "fecha_futura": fecha_futura.strftime(formato.FORMATO_FECHA_HORA)
                 }
 
                 st.rerun()
@@ -210,7 +308,7 @@ elif opcion == "reflexion":
 
         st.success("🧠 Reflexión registrada")
         st.markdown(f"**Reflexión:** {msg['texto']}")
-        st.markdown(f"**Categoría:** {msg['categoria']}")
+        st.caption("⏳ La categoría se asigna en segundo plano; aparecerá en el historial.")
 
         del st.session_state["mensaje_reflexion"]
 
@@ -230,11 +328,10 @@ elif opcion == "reflexion":
 
     if (texto.strip() or emociones) and st.button("📝 Guardar reflexión"):
 
-        categoria = guardar_reflexion(datetime.now(colombia), emociones, texto)
+        guardar_reflexion(datetime.now(colombia), emociones, texto)
 
         st.session_state["mensaje_reflexion"] = {
-            "texto": texto.strip(),
-            "categoria": categoria
+            "texto": texto.strip()
         }
 
         st.session_state["limpiar_reflexion"] = True
@@ -245,14 +342,28 @@ elif opcion == "reflexion":
 # =========================
 elif opcion == "historial":
 
+    def cargar_reflexiones(limite, antes_de):
+        return obtener_reflexiones(limite, antes_de).to_dict("records")
+
+    def cargar_capital(limite, antes_de):
+        return obtener_historial_capital_b(limite, antes_de).to_dict("records")
+
+    def mostrar_encontradas(resultados, clave):
+        if not resultados:
+            return
+        fechas = formato.fecha_hora(formato.a_colombia([r["fecha_hora"] for r in resultados])).tolist()
+        for r, fecha in zip(resultados, fechas):
+            with st.expander(f"{fecha} · {r['reflexion'][:60]}"):
+                st.write(r["reflexion"])
+                if st.toggle("Ver parecidas", key=f"parecidas_{clave}_{r['_id']}"):
+                    for p in busqueda.indice_al_dia().parecidas(_id=r["_id"]):
+                        st.caption(f"{p['puntaje']:.2f} · {p['reflexion']}")
+
     tabs = st.tabs(["🧠", "✊🏽", "💸", "🧭"])
 
     with tabs[0]:
 
-        interrupciones = list(
-            coleccion_eventos.find({"evento": "interrupcion"})
-            .sort("fecha_hora", -1)
-        )
+        interrupciones = pagina_historial("interrupciones", historial_interrupciones)
 
         if interrupciones:
             st.markdown("### 🔴 Interrupciones")
@@ -264,7 +375,7 @@ elif opcion == "historial":
                 gap = r.get("desde_anterior_min")
                 texto = r.get("texto", "")
 
-                with st.expander(fecha.strftime("%d-%m-%y %H:%M")):
+                with st.expander(fecha.strftime(formato.FORMATO_FECHA_HORA)):
 
                     if dur is not None:
                         st.markdown(f"**Duración:** {dur} min")
@@ -272,35 +383,113 @@ elif opcion == "historial":
                     if gap is not None:
                         st.markdown(f"**Desde anterior:** {gap} min")
 
+                    st.caption(f"Últimas 24 h: {r['conteo_dia']} · Últimos 7 días: {r['conteo_semana']}")
+
                     if texto:
-                        if len(texto) > 300:
-                            st.write(texto[:300] + "...")
-                            with st.expander("Ver completo"):
-                                st.write(texto)
+                        if r.get("largo_texto", 0) > LARGO_VISTA_PREVIA:
+                            # El texto completo se trae solo si se pide
+                            if st.toggle("Ver completo", key=f"completo_{r['_id']}"):
+                                st.write(texto_interrupcion(r["_id"]))
+                            else:
+                                st.write(texto + "...")
                         else:
                             st.write(texto)
 
-        df = obtener_reflexiones()
+            boton_cargar_mas("interrupciones", historial_interrupciones, "fecha_hora")
+
+        st.markdown("### 🔎 Buscar en reflexiones")
+        consulta = st.text_input("Palabras o frase", key="buscar_reflexiones")
+
+        if consulta.strip():
+            # Índice local en memoria: no consulta Mongo por cada búsqueda
+            indice = busqueda.indice_al_dia()
+            coinciden = indice.buscar(consulta)
+            vistas = {r["_id"] for r in coinciden}
+            parecidas = [r for r in indice.parecidas(consulta, k=10) if r["_id"] not in vistas]
+
+            st.caption(f"{len(coinciden)} con todas las palabras · {len(parecidas)} parecidas")
+            mostrar_encontradas(coinciden, "coinciden")
+            if parecidas:
+                st.markdown("**Parecidas**")
+                mostrar_encontradas(parecidas, "parecidas")
+
+        reflexiones = pagina_historial("reflexiones", cargar_reflexiones)
 
         st.markdown("### 🧠 Reflexiones")
-        st.caption(f"Total: {len(df)}")
+        st.caption(f"Total: {contar_reflexiones()}")
 
-        for _, r in df.iterrows():
+        for r in reflexiones:
             with st.expander(f"{r['Fecha']} {r['Hora']} {r['Emociones']}"):
                 st.write(r["Reflexión"])
                 st.divider()
                 st.markdown(f"**Categoría:** {r['Categoría']}")
                 st.markdown(f"**Subcategoría:** {r['Subcategoría']}")
 
-    with tabs[1]:
-        st.dataframe(obtener_registros(EVENTO_A), use_container_width=True)
+        boton_cargar_mas("reflexiones", cargar_reflexiones, "fecha_hora")
 
-    with tabs[2]:
-        st.dataframe(obtener_registros(EVENTO_B), use_container_width=True)
+    # La tabla de intervalos ya se mantiene en caché de forma incremental;
+    # aquí solo se pagina lo que se dibuja
+    for tab, evento in [(tabs[1], EVENTO_A), (tabs[2], EVENTO_B)]:
+        with tab:
+            clave = f"filas_{evento}"
+            if clave not in st.session_state:
+                st.session_state[clave] = TAMANO_PAGINA_HISTORIAL
+
+            df_ev = obtener_registros(evento)
+            st.dataframe(df_ev.head(st.session_state[clave]), use_container_width=True)
+
+            if len(df_ev) > st.session_state[clave] and st.button("Cargar más", key=f"mas_{evento}"):
+                st.session_state[clave] += TAMANO_PAGINA_HISTORIAL
+                st.rerun()
+
+            datos = analitica_evento(evento)
+            resumen = datos["resumen"]
+
+            if resumen["n"]:
+                st.markdown("#### 📊 Rachas")
+                st.markdown(
+                    f"**Más larga:** {minutos_a_tiempo_humano(round(resumen['mas_larga']))}  \n"
+                    f"**Mediana:** {minutos_a_tiempo_humano(round(resumen['p50']))}  \n"
+                    f"**P90:** {minutos_a_tiempo_humano(round(resumen['p90']))}"
+                )
+                st.bar_chart(datos["histograma"])
+
+                st.caption("Registros por día de la semana y hora")
+                st.dataframe(datos["mapa_calor"], use_container_width=True)
+
+                st.caption("Frecuencia móvil")
+                st.line_chart(datos["frecuencia"])
 
     with tabs[3]:
-        df_cap = obtener_historial_capital_b()
-        if not df_cap.empty:
-            st.dataframe(df_cap, use_container_width=True)
+        capital = pagina_historial("capital", cargar_capital)
+        if capital:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(capital).drop(columns=["fecha_registro", "_id"]), use_container_width=True)
+            boton_cargar_mas("capital", cargar_capital, "fecha_registro")
         else:
-            st.info("Sin registros aún")
\ No newline at end of file
+            st.info("Sin registros aún")
+
+    # Copias columnares por mes: los cargadores del historial completo y la
+    # analítica las leen con memory-map y solo piden a Mongo lo posterior
+    with st.expander("📦 Instantáneas"):
+        for clave in instantaneas.COLECCIONES:
+            datos = instantaneas.manifiesto(clave)
+            if datos:
+                st.caption(
+                    f"{db.COLECCIONES[clave]}: {datos['filas']} registros hasta "
+                    f"{datos['ultima']:%d-%m-%y %H:%M} UTC"
+                )
+            else:
+                st.caption(f"{db.COLECCIONES[clave]}: sin exportar")
+
+        if st.button("Exportar lo nuevo", key="exportar_instantaneas"):
+            exportados = instantaneas.exportar_todo()
+            st.success(" · ".join(f"{db.COLECCIONES[c]}: +{n}" for c, n in exportados.items()))
+
+# =========================
+# 🐞 DEBUG
+# =========================
+if INSTRUMENTACION_ACTIVA and st.sidebar.checkbox("🐞 Debug"):
+    panel_debug()
+
+terminar_rerun()
@@ -1,19 +1,75 @@
+import argparse
+import os
+import time
+
+from bson import json_util
+from pymongo import UpdateOne
+
+import instantaneas
 from db import coleccion_eventos
-from config import colombia
 
-# traer registros ordenados
-registros = list(
-    coleccion_eventos.find({"evento": "interrupcion"})
-    .sort("fecha_hora", 1)
+parser = argparse.ArgumentParser(description="Recalcula desde_anterior_min de todas las interrupciones.")
+parser.add_argument("--lote", type=int, default=500, help="operaciones por bulk_write")
+parser.add_argument("--dry-run", action="store_true", help="mostrar los cambios sin escribir")
+parser.add_argument("--checkpoint", default=".arreglar_interrupciones_checkpoint.json")
+parser.add_argument("--desde-cero", action="store_true", help="ignorar el checkpoint")
+args = parser.parse_args()
+
+# =========================
+# CHECKPOINT
+# =========================
+# Guarda el último documento escrito y la referencia de cierre vigente,
+# que es todo lo que hace falta para seguir calculando gaps
+estado = {"fecha_hora": None, "_id": None, "anterior_fin": None}
+
+if not args.dry_run and not args.desde_cero and os.path.exists(args.checkpoint):
+    with open(args.checkpoint) as f:
+        estado = json_util.loads(f.read())
+    print(f"↻ Retomando después de {estado['fecha_hora']}")
+
+
+def guardar_checkpoint():
+    if not args.dry_run:
+        with open(args.checkpoint, "w") as f:
+            f.write(json_util.dumps(estado))
+
+
+filtro = {"evento": "interrupcion"}
+if estado["fecha_hora"] is not None:
+    filtro["$or"] = [
+        {"fecha_hora": {"$gt": estado["fecha_hora"]}},
+        {"fecha_hora": estado["fecha_hora"], "_id": {"$gt": estado["_id"]}},
+    ]
+
+# traer registros ordenados, por lotes
+cursor = (
+    coleccion_eventos.find(filtro, {"inicio": 1, "fin": 1, "fecha_hora": 1, "desde_anterior_min": 1})
+    .sort([("fecha_hora", 1), ("_id", 1)])
+    .batch_size(args.lote)
 )
 
-anterior_fin = None
+# =========================
+# UNA PASADA
+# =========================
+operaciones = []
+revisados = cambiados = 0
+t0 = time.perf_counter()
+
 
-for r in registros:
+def escribir():
+    global operaciones
+    if operaciones and not args.dry_run:
+        # Lo ya exportado quedaría con el desde_anterior_min viejo
+        instantaneas.descartar("coleccion_eventos")
+        coleccion_eventos.bulk_write(operaciones, ordered=False)
+        guardar_checkpoint()
+    operaciones = []
 
-    _id = r["_id"]
+
+for r in cursor:
+    revisados += 1
     inicio = r.get("inicio")
-    fin = r.get("fin")
+    anterior_fin = estado["anterior_fin"]
 
     gap = None
 
@@ -24,26 +80,38 @@ for r in registros:
 
             if gap < 0:
                 gap = None
-        except:
+        except TypeError:
             gap = None
 
-    # limpiar campo viejo
-    coleccion_eventos.update_one(
-        {"_id": _id},
-        {"$unset": {"desde_anterior_min": ""}}
-    )
+    actual = r.get("desde_anterior_min")
+
+    # un solo cambio por documento, y solo si hace falta
+    if gap != actual or (gap is None and "desde_anterior_min" in r):
+        cambiados += 1
 
-    # guardar solo si es válido
-    if gap is not None:
-        coleccion_eventos.update_one(
-            {"_id": _id},
-            {"$set": {"desde_anterior_min": gap}}
-        )
+        if gap is None:
+            operaciones.append(UpdateOne({"_id": r["_id"]}, {"$unset": {"desde_anterior_min": ""}}))
+        else:
+            operaciones.append(UpdateOne({"_id": r["_id"]}, {"$set": {"desde_anterior_min": gap}}))
+
+        if args.dry_run:
+            print(f"{r['fecha_hora']:%d-%m-%y %H:%M}  {actual} → {gap}")
 
     # actualizar referencia
-    if fin:
-        anterior_fin = fin
-    elif r.get("fecha_hora"):
-        anterior_fin = r["fecha_hora"]
+    estado["fecha_hora"] = r["fecha_hora"]
+    estado["_id"] = r["_id"]
+    estado["anterior_fin"] = r.get("fin") or r.get("fecha_hora") or anterior_fin
+
+    if len(operaciones) >= args.lote:
+        escribir()
+        segundos = time.perf_counter() - t0
+        print(f"… {revisados} revisados, {cambiados} cambios · {revisados / segundos:.0f} docs/s")
+
+escribir()
+
+segundos = time.perf_counter() - t0
+accion = "por cambiar" if args.dry_run else "corregidos"
+print(f"✔ Listo: {revisados} revisados, {cambiados} {accion} en {segundos:.2f} s")
 
-print("✔ Listo, datos corregidos")
\ No newline at end of file
+if not args.dry_run and os.path.exists(args.checkpoint):
+    os.remove(args.checkpoint)
@@ -0,0 +1,35 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_analitica
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from analitica import calcular
+
+parser = argparse.ArgumentParser(description="Mide analitica.calcular sobre eventos sintéticos.")
+parser.add_argument("--eventos", type=int, default=100_000)
+parser.add_argument("--repeticiones", type=int, default=20)
+parser.add_argument("--limite-ms", type=float, default=100.0)
+args = parser.parse_args()
+
+# Rachas sintéticas: mezcla de minutos, horas y semanas desde 2015
+rng = np.random.default_rng(0)
+rachas = rng.choice([60, 3600, 86400 * 3], size=args.eventos) * rng.exponential(1.0, size=args.eventos)
+ts = 1_420_070_400 + np.cumsum(rachas.astype("int64") + 1)
+
+calcular(ts)  # calentamiento
+
+tiempos = []
+for _ in range(args.repeticiones):
+    t0 = time.perf_counter()
+    calcular(ts)
+    tiempos.append((time.perf_counter() - t0) * 1000)
+
+mediana = float(np.median(tiempos))
+print(f"{args.eventos} eventos · mediana {mediana:.1f} ms · mínimo {min(tiempos):.1f} ms · máximo {max(tiempos):.1f} ms")
+
+if mediana >= args.limite_ms:
+    print(f"✖ Supera el límite de {args.limite_ms:.0f} ms")
+    sys.exit(1)
+print(f"✔ Por debajo de {args.limite_ms:.0f} ms")
@@ -0,0 +1,73 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_busqueda
+# Arma el índice local de reflexiones con textos sintéticos y mide búsqueda
+# de texto y "parecidas" (top-k por coseno). Sale con 1 si el p95 pasa el límite.
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from busqueda import IndiceReflexiones
+
+parser = argparse.ArgumentParser(description="Tiempos del índice de búsqueda de reflexiones.")
+parser.add_argument("--reflexiones", type=int, default=50_000)
+parser.add_argument("--consultas", type=int, default=200)
+parser.add_argument("--limite-ms", type=float, default=50.0)
+args = parser.parse_args()
+
+VOCABULARIO = (
+    "hoy sentí ansiedad después del trabajo y quise escapar pero respiré salí a caminar "
+    "mi familia me llamó estaba cansado aburrido solo con el celular en la noche dormí mal "
+    "tuve ganas fuertes recordé por qué empecé hablé con un amigo leí un rato hice ejercicio "
+    "la semana fue difícil estrés discusión tranquilo orgulloso culpa frustración alivio "
+    "madrugada cama computador redes música ducha fría meditación escribir diario metas"
+).split()
+
+rng = np.random.default_rng(0)
+inicio = datetime(2020, 1, 1)
+
+
+def texto():
+    return " ".join(rng.choice(VOCABULARIO, size=int(rng.integers(8, 60))))
+
+
+documentos = [
+    {"_id": ObjectId(), "fecha_hora": inicio + timedelta(hours=i), "reflexion": texto()}
+    for i in range(args.reflexiones)
+]
+
+t0 = time.perf_counter()
+indice = IndiceReflexiones()
+indice.agregar(documentos)
+print(f"construcción   {args.reflexiones} reflexiones · {time.perf_counter() - t0:6.2f} s")
+
+t0 = time.perf_counter()
+for d in documentos[:100]:
+    indice.agregar([{**d, "_id": ObjectId()}])
+print(f"agregar de a 1 {(time.perf_counter() - t0) * 10:6.2f} ms por reflexión")
+
+
+def medir(nombre, funcion):
+    tiempos = []
+    for _ in range(args.consultas):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    p50, p95 = np.percentile(tiempos, [50, 95])
+    print(f"{nombre:<14} p50 {p50:6.2f} ms · p95 {p95:6.2f} ms")
+    return p95
+
+
+consultas = [" ".join(rng.choice(VOCABULARIO, size=int(rng.integers(1, 4)))) for _ in range(args.consultas)]
+ids = [documentos[int(i)]["_id"] for i in rng.integers(0, args.reflexiones, size=args.consultas)]
+consulta, propia = iter(consultas * 3), iter(ids * 3)
+
+peores = [
+    medir("buscar", lambda: indice.buscar(next(consulta))),
+    medir("parecidas txt", lambda: indice.parecidas(next(consulta), k=10)),
+    medir("parecidas _id", lambda: indice.parecidas(_id=next(propia), k=10)),
+]
+
+sys.exit(0 if max(peores) <= args.limite_ms else 1)
@@ -0,0 +1,180 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_cargadores [--uri mongodb://localhost]
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+import db
+
+parser = argparse.ArgumentParser(description="Mide los cargadores de datos sobre datos sintéticos.")
+parser.add_argument("--uri", help="mongod local; sin esto se usa mongomock")
+parser.add_argument("--volumenes", default="1000,10000,100000")
+parser.add_argument("--repeticiones", type=int, default=3)
+parser.add_argument("--salida", default=None, help="archivo JSON (por defecto benchmarks/resultados/)")
+args = parser.parse_args()
+
+BASE = "bench_registro_bucle"
+
+if args.uri:
+    from pymongo import MongoClient
+    cliente = MongoClient(args.uri)
+    motor = "mongod " + cliente.server_info()["version"]
+else:
+    import mongomock
+    cliente = mongomock.MongoClient()
+    motor = "mongomock " + mongomock.__version__
+
+db.usar_cliente(cliente, BASE)
+
+# Después de usar_cliente: estos módulos toman las colecciones de la base de prueba
+from config import EVENTO_A, sistema_categorial  # noqa: E402
+from helpers import obtener_registros, obtener_reflexiones, _cache_intervalos  # noqa: E402
+from servicios import obtener_historial_capital_b  # noqa: E402
+from agregaciones import historial_interrupciones  # noqa: E402
+
+
+# =========================
+# DATOS SINTÉTICOS
+# =========================
+def sembrar(n):
+    cliente.drop_database(BASE)
+    rng = np.random.default_rng(n)
+    codigos = list(sistema_categorial)
+
+    inicio = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    minutos = np.cumsum(rng.exponential(600, size=n).astype("int64") + 1)
+    fechas = [inicio + timedelta(minutes=int(m)) for m in minutos]
+
+    eventos = [{"evento": EVENTO_A, "fecha_hora": f} for f in fechas]
+    interrupciones = [{
+        "evento": "interrupcion",
+        "inicio": f - timedelta(minutes=20),
+        "fin": f,
+        "fecha_hora": f,
+        "duracion_min": 20,
+        "texto": "x" * int(rng.integers(0, 800)),
+    } for f in fechas]
+    reflexiones = [{
+        "fecha_hora": f,
+        "emociones": [{"emoji": "😌", "nombre": "Aliviado"}],
+        "reflexion": "texto de prueba " * int(rng.integers(1, 40)),
+        "categoria_categorial": codigos[i % len(codigos)],
+    } for i, f in enumerate(fechas)]
+    capital = [{
+        "fecha_registro": f,
+        "fecha_futura": f + timedelta(days=3),
+        "monto": float(rng.integers(0, 5_000_000)),
+    } for f in fechas]
+
+    for coleccion, docs in [
+        (db.coleccion_eventos, eventos + interrupciones),
+        (db.coleccion_reflexiones, reflexiones),
+        (db.coleccion_capital_b, capital),
+    ]:
+        for i in range(0, len(docs), 10_000):
+            coleccion.insert_many(docs[i:i + 10_000])
+
+    if args.uri:
+        db.asegurar_indices()
+
+
+# =========================
+# MEDICIÓN
+# =========================
+def medir(nombre, funcion, antes=None):
+    tiempos = []
+    pico = 0
+    resultado = None
+
+    for _ in range(args.repeticiones):
+        if antes:
+            antes()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+        pico = max(pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    fila = {
+        "cargador": nombre,
+        "segundos_mediana": float(np.median(tiempos)),
+        "segundos_min": float(min(tiempos)),
+        "memoria_pico_mb": pico / 2**20,
+    }
+
+    if hasattr(resultado, "to_json"):
+        t0 = time.perf_counter()
+        resultado.to_json(orient="records", date_format="iso")
+        fila["filas"] = len(resultado)
+        fila["serializar_segundos"] = time.perf_counter() - t0
+    elif isinstance(resultado, list):
+        fila["filas"] = len(resultado)
+
+    return fila
+
+
+def cargadores():
+    return [
+        ("obtener_registros (frío)", lambda: obtener_registros(EVENTO_A), _cache_intervalos.clear),
+        ("obtener_registros (caché)", lambda: obtener_registros(EVENTO_A), None),
+        ("obtener_reflexiones", obtener_reflexiones, None),
+        ("obtener_reflexiones (página)", lambda: obtener_reflexiones(20), None),
+        ("obtener_historial_capital_b", obtener_historial_capital_b, None),
+        ("obtener_historial_capital_b (página)", lambda: obtener_historial_capital_b(20), None),
+        ("historial_interrupciones", historial_interrupciones, None),
+        ("historial_interrupciones (página)", lambda: historial_interrupciones(20), None),
+    ]
+
+
+resultados = []
+for volumen in [int(v) for v in args.volumenes.split(",")]:
+    t0 = time.perf_counter()
+    sembrar(volumen)
+    print(f"── {volumen} documentos por colección (sembrado en {time.perf_counter() - t0:.1f} s)")
+
+    for nombre, funcion, antes in cargadores():
+        try:
+            fila = medir(nombre, funcion, antes)
+        except Exception as e:
+            # mongomock no implementa $setWindowFields
+            fila = {"cargador": nombre, "error": f"{type(e).__name__}: {e}"[:200]}
+            print(f"   {nombre:<40} ✖ {fila['error'][:60]}")
+        else:
+            print(
+                f"   {nombre:<40} {fila['segundos_mediana'] * 1000:9.1f} ms "
+                f"{fila['memoria_pico_mb']:8.1f} MB"
+            )
+        resultados.append({"volumen": volumen, **fila})
+
+cliente.drop_database(BASE)
+
+# =========================
+# SALIDA
+# =========================
+try:
+    revision = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+except (OSError, subprocess.CalledProcessError):
+    revision = "desconocida"
+
+informe = {
+    "fecha": datetime.now(timezone.utc).isoformat(),
+    "revision": revision,
+    "python": platform.python_version(),
+    "motor": motor,
+    "repeticiones": args.repeticiones,
+    "resultados": resultados,
+}
+
+salida = Path(args.salida or f"benchmarks/resultados/cargadores-{revision}.json")
+salida.parent.mkdir(parents=True, exist_ok=True)
+salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+print(f"✔ Resultados en {salida}")
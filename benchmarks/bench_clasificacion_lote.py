@@ -0,0 +1,50 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_clasificacion_lote
+# Contra el servidor falso de benchmarks/openai_falso.py: clasificar de a una
+# reflexión por solicitud frente a lotes con salida estructurada. Sale con 1
+# si algún código devuelto no es del sistema categorial.
+import argparse
+import sys
+import time
+
+from openai import OpenAI
+
+from benchmarks.openai_falso import OpenAIFalso
+from config import sistema_categorial
+from helpers import clasificar_lote_remoto
+
+parser = argparse.ArgumentParser(description="Una solicitud por reflexión contra lotes estructurados.")
+parser.add_argument("--reflexiones", type=int, default=200)
+parser.add_argument("--por-solicitud", type=int, default=20)
+parser.add_argument("--latencia", type=float, default=0.3, help="segundos fijos por solicitud del servidor falso")
+parser.add_argument("--latencia-por-token", type=float, default=0.005)
+parser.add_argument("--tasa-invalidos", type=float, default=0.05)
+args = parser.parse_args()
+
+textos = [
+    f"Reflexión {i}: hoy me sentí {['ansioso', 'tranquilo', 'solo', 'culpable'][i % 4]} después del trabajo"
+    for i in range(args.reflexiones)
+]
+
+falso = OpenAIFalso(
+    latencia=args.latencia, latencia_por_token=args.latencia_por_token, tasa_invalidos=args.tasa_invalidos
+).iniciar()
+cliente = OpenAI(api_key="falso", base_url=falso.base_url, max_retries=0)
+
+validos = True
+for nombre, tamano in [("uno por uno", 1), (f"lotes de {args.por_solicitud}", args.por_solicitud)]:
+    falso.reiniciar_contadores()
+    t0 = time.perf_counter()
+    codigos = []
+    for i in range(0, len(textos), tamano):
+        codigos += clasificar_lote_remoto(textos[i:i + tamano], cliente)
+    segundos = time.perf_counter() - t0
+
+    sin_codigo = sum(c is None for c in codigos)
+    validos &= all(c is None or c in sistema_categorial for c in codigos)
+    print(
+        f"{nombre:<14} {falso.solicitudes:4d} solicitudes · {segundos * 1000 / len(textos):7.1f} ms/reflexión · "
+        f"{(falso.tokens_entrada + falso.tokens_salida) / len(textos):7.1f} tokens/reflexión · {sin_codigo} sin código"
+    )
+
+falso.detener()
+sys.exit(0 if validos else 1)
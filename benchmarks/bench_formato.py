@@ -0,0 +1,103 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_formato
+# Compara armar las tablas fila por fila (dict por registro, strftime y replace)
+# con armarlas por columnas usando formato.py, sobre los mismos documentos.
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import colombia, sistema_categorial
+from helpers import tabla_reflexiones
+from servicios import tabla_capital_b
+
+parser = argparse.ArgumentParser(description="Fila por fila contra columnas al formatear tablas.")
+parser.add_argument("--filas", type=int, default=100_000)
+parser.add_argument("--repeticiones", type=int, default=5)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+codigos = list(sistema_categorial) + ["", "??"]
+inicio = datetime(2015, 1, 1)
+fechas = [inicio + timedelta(minutes=int(m)) for m in np.cumsum(rng.integers(1, 600, size=args.filas))]
+
+reflexiones = [{
+    "fecha_hora": f,
+    "reflexion": "texto",
+    "categoria_categorial": codigos[i % len(codigos)],
+    "emociones": [{"emoji": "😌", "nombre": "Aliviado"}, {"emoji": "😔", "nombre": "Triste"}],
+} for i, f in enumerate(fechas)]
+
+capital = [{
+    "fecha_registro": f,
+    "fecha_futura": f + timedelta(days=3),
+    "monto": float(rng.integers(0, 5_000_000_00)) / 100,
+} for f in fechas]
+
+
+# =========================
+# FILA POR FILA (IMPLEMENTACIÓN ANTERIOR)
+# =========================
+def _cop_fila(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def reflexiones_por_filas(registros):
+    filas = []
+    for r in registros:
+        fecha = colombia.fromutc(r["fecha_hora"])
+        cat_info = sistema_categorial.get(r.get("categoria_categorial", ""), {
+            "categoria": "Sin categoría", "subcategoria": "", "descriptor": "", "observable": ""
+        })
+        filas.append({
+            "Fecha": fecha.strftime("%d-%m-%y"),
+            "Hora": fecha.strftime("%H:%M"),
+            "Reflexión": r.get("reflexion", ""),
+            "Categoría": cat_info["categoria"],
+            "Subcategoría": cat_info["subcategoria"],
+            "Descriptor": cat_info.get("descriptor", ""),
+            "Observable": cat_info.get("observable", ""),
+            "Emociones": " ".join([e["emoji"] for e in r.get("emociones", [])]),
+            "fecha_hora": r["fecha_hora"]
+        })
+    return pd.DataFrame(filas)
+
+
+def capital_por_filas(registros):
+    filas = []
+    for r in registros:
+        filas.append({
+            "Actual": colombia.fromutc(r["fecha_registro"]).strftime("%d-%m-%y %H:%M"),
+            "Adelantado": colombia.fromutc(r["fecha_futura"]).strftime("%d-%m-%y %H:%M"),
+            "COP": _cop_fila(r["monto"]),
+            "fecha_registro": r["fecha_registro"]
+        })
+    return pd.DataFrame(filas)
+
+
+# =========================
+# MEDICIÓN
+# =========================
+def medir(funcion, registros):
+    tiempos = []
+    for _ in range(args.repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion(registros)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return resultado, float(np.median(tiempos))
+
+
+for nombre, filas, columnas, registros in [
+    ("reflexiones", reflexiones_por_filas, tabla_reflexiones, reflexiones),
+    ("capital_b", capital_por_filas, tabla_capital_b, capital),
+]:
+    esperado, ms_filas = medir(filas, registros)
+    obtenido, ms_columnas = medir(columnas, registros)
+
+    # _id es solo para paginar: la implementación anterior no lo tenía
+    pd.testing.assert_frame_equal(obtenido.drop(columns="_id"), esperado, check_dtype=False)
+    print(
+        f"{nombre:<12} {args.filas} filas · por filas {ms_filas:8.1f} ms · "
+        f"por columnas {ms_columnas:8.1f} ms · ×{ms_filas / ms_columnas:.1f}"
+    )
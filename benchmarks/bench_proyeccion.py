@@ -0,0 +1,44 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.bench_proyeccion
+# Ajuste y proyección de capital sobre registros sintéticos con una velocidad
+# conocida. Sale con 1 si el ajuste no la recupera o si pasa el límite de tiempo.
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import proyeccion
+
+parser = argparse.ArgumentParser(description="Tiempos del ajuste y la proyección de capital.")
+parser.add_argument("--registros", type=int, default=5000)
+parser.add_argument("--velocidad", type=float, default=2500.0, help="COP por día de la serie sintética")
+parser.add_argument("--repeticiones", type=int, default=200)
+parser.add_argument("--limite-ms", type=float, default=5.0, help="tiempo máximo (p95) de ajuste + proyección")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+inicio = np.datetime64("2022-01-01T00:00", "ms")
+dias = np.sort(rng.uniform(0, 3 * 365, size=args.registros))
+fechas = inicio + (dias * proyeccion.MS_POR_DIA).astype("int64").astype("timedelta64[ms]")
+montos = 100_000 + args.velocidad * dias + rng.normal(0, 20_000, size=args.registros)
+
+# La ventana termina en el último registro sintético
+ultimo = proyeccion._a_datetime(fechas[-1])
+
+tiempos = []
+for _ in range(args.repeticiones):
+    t0 = time.perf_counter()
+    ajuste = proyeccion.ajustar(fechas, montos, ultimo)
+    p = proyeccion.proyectar(ajuste, float(montos[-1]), 5_000_000, 1_000_000, datetime.now(timezone.utc))
+    tiempos.append((time.perf_counter() - t0) * 1000)
+
+p50, p95 = np.percentile(tiempos, [50, 95])
+error = abs(ajuste["velocidad"] - args.velocidad) / args.velocidad
+print(
+    f"{args.registros} registros · ajuste + proyección p50 {p50:.3f} ms · p95 {p95:.3f} ms · "
+    f"velocidad {ajuste['velocidad']:.0f} COP/día (real {args.velocidad:.0f}, R² {ajuste['r2']:.2f})"
+)
+print(f"objetivo: {p['fecha_objetivo']} · cruce: {p['fecha_cruce']}")
+
+sys.exit(0 if error < 0.05 and p95 <= args.limite_ms else 1)
@@ -0,0 +1,49 @@
+# Ejecutar desde la raíz del repo: python -m benchmarks.medir_arranque [--repeticiones 5]
+# Compara el tiempo de importar los módulos de la app (pandas, numpy, pyarrow,
+# requests y openai se importan dentro de las funciones que los usan) con el
+# de importar además esas librerías al arrancar, como antes.
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULOS = "helpers, servicios, interrupcion, agregaciones, estado, analitica, ynab_client, openai_client"
+PESADOS = "numpy, pandas, pyarrow, pyarrow.compute, requests, openai"
+
+parser = argparse.ArgumentParser(description="Mide el costo de importar los módulos de la app.")
+parser.add_argument("--repeticiones", type=int, default=5)
+parser.add_argument("--top", type=int, default=10, help="módulos más pesados a listar")
+args = parser.parse_args()
+
+
+def importar(ansioso):
+    # -X importtime escribe en stderr: "import time: self [us] | cumulative | nombre"
+    codigo = f"import {PESADOS}; import {MODULOS}" if ansioso else f"import {MODULOS}"
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, check=True
+    )
+
+    propios = 0
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        # Solo los módulos de primer nivel: sus tiempos acumulados no se solapan
+        if nombre.startswith(" ") and not nombre.startswith("  "):
+            propios += int(acumulado)
+            modulos[nombre.strip()] = int(acumulado)
+    return propios / 1000, modulos
+
+
+for ansioso in (True, False):
+    totales = []
+    for _ in range(args.repeticiones):
+        total, modulos = importar(ansioso)
+        totales.append(total)
+
+    print(f"── {'ansioso' if ansioso else 'perezoso'}: "
+          f"mediana {statistics.median(totales):.0f} ms (mín {min(totales):.0f} ms)")
+    for nombre, us in sorted(modulos.items(), key=lambda m: -m[1])[:args.top]:
+        print(f"   {nombre:<30} {us / 1000:8.1f} ms")
@@ -0,0 +1,130 @@
+# Servidor compatible con /v1/chat/completions para medir y probar la
+# clasificación sin red ni costo. Responde según el response_format pedido
+# (json_schema de helpers.ESQUEMA_LOTE) y puede devolver elementos inválidos
+# o faltantes para ejercitar los reintentos.
+#
+#   python -m benchmarks.openai_falso --puerto 8765
+#   # .streamlit/secrets.toml: openai_base_url = "http://127.0.0.1:8765/v1"
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Aproximación de tokens: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+
+class OpenAIFalso:
+
+    def __init__(self, puerto=0, latencia=0.0, latencia_por_token=0.0, tasa_invalidos=0.0, semilla=0):
+        self.latencia = latencia
+        self.latencia_por_token = latencia_por_token
+        self.tasa_invalidos = tasa_invalidos
+        self.solicitudes = 0
+        self.tokens_entrada = 0
+        self.tokens_salida = 0
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self._hilo = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v1"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="openai-falso", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.solicitudes = self.tokens_entrada = self.tokens_salida = 0
+
+    # =========================
+    # RESPUESTA
+    # =========================
+    def responder(self, cuerpo):
+        prompt = "\n".join(m.get("content", "") for m in cuerpo.get("messages", []))
+        numeros = [int(n) for n in re.findall(r'^(\d+): """', prompt, flags=re.M)]
+        esquema = (cuerpo.get("response_format") or {}).get("json_schema", {}).get("schema", {})
+        codigos = (
+            esquema.get("properties", {}).get("clasificaciones", {})
+            .get("items", {}).get("properties", {}).get("codigo", {}).get("enum")
+        ) or ["1.1"]
+
+        elementos = []
+        with self._lock:
+            for n in numeros or [1]:
+                azar = self._rng.random()
+                if azar < self.tasa_invalidos / 2:
+                    continue                                            # falta
+                codigo = "9.9" if azar < self.tasa_invalidos else self._rng.choice(codigos)
+                elementos.append({"n": n, "codigo": codigo})
+
+        contenido = json.dumps({"clasificaciones": elementos})
+        entrada = len(prompt) // CARACTERES_POR_TOKEN
+        salida = len(contenido) // CARACTERES_POR_TOKEN
+        with self._lock:
+            self.solicitudes += 1
+            self.tokens_entrada += entrada
+            self.tokens_salida += salida
+
+        time.sleep(self.latencia + self.latencia_por_token * salida)
+        return {
+            "id": f"falso-{self.solicitudes}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": cuerpo.get("model", "falso"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": contenido},
+            }],
+            "usage": {"prompt_tokens": entrada, "completion_tokens": salida, "total_tokens": entrada + salida},
+        }
+
+    def _manejador(self):
+        falso = self
+
+        class Manejador(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                datos = json.dumps(falso.responder(cuerpo)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor falso compatible con OpenAI.")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos fijos por solicitud")
+    parser.add_argument("--latencia-por-token", type=float, default=0.01, help="segundos por token de salida")
+    parser.add_argument("--tasa-invalidos", type=float, default=0.0)
+    args = parser.parse_args()
+
+    falso = OpenAIFalso(args.puerto, args.latencia, args.latencia_por_token, args.tasa_invalidos).iniciar()
+    print(f"Escuchando en {falso.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        falso.detener()
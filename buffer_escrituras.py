@@ -0,0 +1,170 @@
+# buffer_escrituras.py
+
+import sqlite3
+import threading
+import time
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+LOTE = 200
+MAX_INTENTOS = 5
+ESPERA_BASE = 1.0
+ESPERA_MAX = 60.0
+SONDEO_SEGUNDOS = 30
+RETENCION_SEGUNDOS = 30 * 86400
+
+DUPLICADO = 11000
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS escrituras (
+    id           TEXT PRIMARY KEY,   -- _id del documento, generado aquí
+    coleccion    TEXT NOT NULL,
+    documento    TEXT NOT NULL,      -- Extended JSON
+    creado       REAL NOT NULL,
+    sincronizado REAL,               -- NULL mientras falta enviarlo a Mongo
+    intentos     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS escrituras_pendientes ON escrituras (sincronizado, creado);
+"""
+
+
+# Cada escritura se confirma al quedar en SQLite, sin esperar a Mongo. Un hilo
+# la envía después en lotes; como el _id se genera antes de guardar, reenviar
+# un lote ya insertado solo produce errores de clave duplicada, que cuentan
+# como sincronizados. al_sincronizar(coleccion, documentos) recibe los
+# documentos que ya están en Mongo, nuevos o duplicados (para actualizar estado,
+# avisar colas…), antes de marcarlos: debe tolerar ver uno más de una vez.
+class BufferEscrituras:
+
+    def __init__(self, ruta, colecciones, al_sincronizar=None):
+        self.colecciones = {c.name: c for c in colecciones}
+        self.al_sincronizar = al_sincronizar
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        # FULL: la confirmación al usuario sobrevive a un corte de luz
+        self._conexion.execute("PRAGMA synchronous=FULL")
+        self._conexion.executescript(ESQUEMA)
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="buffer-escrituras", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join()
+
+    # =========================
+    # ESCRITURA
+    # =========================
+    def anotar(self, coleccion, documento):
+        documento = {"_id": ObjectId(), **documento}
+        with self._lock:
+            self._conexion.execute(
+                "INSERT INTO escrituras (id, coleccion, documento, creado) VALUES (?, ?, ?, ?)",
+                (str(documento["_id"]), coleccion.name, json_util.dumps(documento), time.time())
+            )
+        self._despertar.set()
+        return documento["_id"]
+
+    def resumen(self):
+        with self._lock:
+            pendientes, sincronizados, fallidos = self._conexion.execute(
+                """SELECT
+                       COALESCE(SUM(sincronizado IS NULL AND intentos < ?), 0),
+                       COALESCE(SUM(sincronizado IS NOT NULL), 0),
+                       COALESCE(SUM(sincronizado IS NULL AND intentos >= ?), 0)
+                   FROM escrituras""",
+                (MAX_INTENTOS, MAX_INTENTOS)
+            ).fetchone()
+        return {"pendientes": pendientes, "sincronizados": sincronizados, "fallidos": fallidos}
+
+    # =========================
+    # SINCRONIZACIÓN
+    # =========================
+    def _bucle(self):
+        espera = ESPERA_BASE
+        while not self._parar.is_set():
+            try:
+                enviados = self.sincronizar()
+                espera = ESPERA_BASE
+            except Exception:
+                # Sin red (o falló al_sincronizar): lo pendiente sigue en SQLite y se reintenta más tarde
+                self._parar.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX)
+                continue
+
+            if not enviados:
+                self._despertar.wait(SONDEO_SEGUNDOS)
+                self._despertar.clear()
+
+    def sincronizar(self):
+        # Envía todo lo pendiente; devuelve cuántas escrituras quedaron en Mongo
+        total = 0
+        while filas := self._pendientes():
+            por_coleccion = {}
+            for fila in filas:
+                por_coleccion.setdefault(fila[1], []).append(fila)
+
+            enviados = sum(self._enviar(nombre, grupo) for nombre, grupo in por_coleccion.items())
+            total += enviados
+            if not enviados:
+                break
+
+        self._purgar()
+        return total
+
+    def _pendientes(self):
+        with self._lock:
+            return self._conexion.execute(
+                """SELECT id, coleccion, documento FROM escrituras
+                   WHERE sincronizado IS NULL AND intentos < ?
+                   ORDER BY creado LIMIT ?""",
+                (MAX_INTENTOS, LOTE)
+            ).fetchall()
+
+    def _enviar(self, nombre, filas):
+        documentos = [json_util.loads(f[2]) for f in filas]
+        errores = {}
+        try:
+            self.colecciones[nombre].insert_many(documentos, ordered=False)
+        except BulkWriteError as e:
+            errores = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        rechazados = {i: err for i, err in errores.items() if err.get("code") != DUPLICADO}
+        listos = [f[0] for i, f in enumerate(filas) if i not in rechazados]
+        fallidos = [(err.get("errmsg", "")[:500], filas[i][0]) for i, err in rechazados.items()]
+
+        # Primero el aviso: si falla, las filas siguen pendientes y en el reintento
+        # vuelven como duplicadas, que también se avisan (ya estaban en Mongo)
+        enviados = [d for i, d in enumerate(documentos) if i not in rechazados]
+        if enviados and self.al_sincronizar:
+            self.al_sincronizar(nombre, enviados)
+
+        with self._lock:
+            ahora = time.time()
+            self._conexion.execute("BEGIN")
+            self._conexion.executemany(
+                "UPDATE escrituras SET sincronizado = ? WHERE id = ?", [(ahora, i) for i in listos]
+            )
+            self._conexion.executemany(
+                "UPDATE escrituras SET intentos = intentos + 1, error = ? WHERE id = ?", fallidos
+            )
+            self._conexion.execute("COMMIT")
+        return len(listos)
+
+    def _purgar(self):
+        with self._lock:
+            self._conexion.execute(
+                "DELETE FROM escrituras WHERE sincronizado < ?", (time.time() - RETENCION_SEGUNDOS,)
+            )
@@ -0,0 +1,322 @@
+# busqueda.py
+
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import Counter, deque
+
+import streamlit as st
+
+import db
+import instantaneas
+
+DIMENSIONES = 512
+NGRAMA = 3
+# Con menos documentos nuevos que esto (relativo al total) no se recalculan idf ni normas
+REFRESCO_IDF = 0.05
+# Por debajo de esto el parecido es ruido de colisiones del hashing
+PARECIDO_MINIMO = 0.15
+
+_PALABRA = re.compile(r"\w+")
+
+
+# =========================
+# TEXTO → PALABRAS → RASGOS
+# =========================
+_sin_tildes_cache = {}
+
+
+def _sin_tildes(palabra):
+    r = _sin_tildes_cache.get(palabra)
+    if r is None:
+        r = "".join(c for c in unicodedata.normalize("NFKD", palabra) if not unicodedata.combining(c))
+        _sin_tildes_cache[palabra] = r
+    return r
+
+
+def palabras(texto):
+    # Sin tildes ni mayúsculas: "Ansiedad" y "ansiedád" cuentan igual
+    crudas = _PALABRA.findall(unicodedata.normalize("NFC", texto or "").casefold())
+    return [p if p.isascii() else _sin_tildes(p) for p in crudas]
+
+
+def _contar(texto):
+    return Counter(palabras(texto))
+
+
+def rasgos(palabra):
+    # La palabra entera y sus trigramas de caracteres, llevados a DIMENSIONES
+    # columnas con signo (hashing trick): "ansioso" y "ansiosa" quedan cerca
+    marcada = f" {palabra} "
+    hashes = [zlib.crc32(palabra.encode())] + [
+        zlib.crc32(marcada[i:i + NGRAMA].encode()) for i in range(len(marcada) - NGRAMA + 1)
+    ]
+    return [h % DIMENSIONES for h in hashes], [1.0 if h >> 31 else -1.0 for h in hashes]
+
+
+# =========================
+# ÍNDICE
+# =========================
+# Todo en memoria y sin red: un índice invertido palabra -> (posiciones, tf)
+# para la búsqueda de texto, y una matriz densa documentos × DIMENSIONES para
+# "parecidas" (coseno con pesos idf). Los rasgos de cada palabra se calculan
+# una sola vez (vocabulario) y las filas se arman por lotes con bincount.
+# idf y normas se recalculan solo cuando el índice creció lo suficiente.
+class IndiceReflexiones:
+
+    def __init__(self):
+        import numpy as np
+        self.ids = []
+        self.fechas = []
+        self.textos = []
+        self._posicion = {}
+        self._invertido = {}
+        # palabra -> número; sus rasgos están en _columnas/_signos desde _inicio, _largo elementos
+        self._vocabulario = {}
+        self._columnas, self._signos = array("q"), array("f")
+        self._inicio, self._largo = array("q"), array("q")
+        self._matriz = np.zeros((0, DIMENSIONES), dtype="float32")
+        self._df = np.zeros(DIMENSIONES, dtype="int64")
+        self._idf = None
+        self._normas = np.zeros(0, dtype="float32")
+        self._n_idf = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, _id):
+        return str(_id) in self._posicion
+
+    def texto(self, _id):
+        posicion = self._posicion.get(str(_id))
+        return None if posicion is None else self.textos[posicion]
+
+    def _palabra(self, palabra):
+        numero = self._vocabulario.get(palabra)
+        if numero is None:
+            columnas, signos = rasgos(palabra)
+            numero = self._vocabulario[palabra] = len(self._inicio)
+            self._inicio.append(len(self._columnas))
+            self._largo.append(len(columnas))
+            self._columnas.extend(columnas)
+            self._signos.extend(signos)
+        return numero
+
+    def _filas(self, cuantas, fila, palabra, tf):
+        # (fila, palabra, tf) por cada palabra distinta de cada texto -> matriz cuantas × DIMENSIONES
+        import numpy as np
+        fila = np.asarray(fila, dtype="int64")
+        palabra = np.asarray(palabra, dtype="int64")
+        largo = np.frombuffer(self._largo, dtype="int64")[palabra]
+        repetir = np.repeat(np.arange(len(palabra)), largo)
+        desplazamiento = np.arange(len(repetir)) - np.repeat(np.cumsum(largo) - largo, largo)
+        rasgo = np.frombuffer(self._inicio, dtype="int64")[palabra][repetir] + desplazamiento
+
+        # TF sublineal por palabra y también por columna (las colisiones suman)
+        peso = np.frombuffer(self._signos, dtype="float32")[rasgo] * (1 + np.log(np.asarray(tf, dtype="float32")))[repetir]
+        celda = fila[repetir] * DIMENSIONES + np.frombuffer(self._columnas, dtype="int64")[rasgo]
+        v = np.bincount(celda, peso, minlength=cuantas * DIMENSIONES).reshape(cuantas, DIMENSIONES)
+        return (np.sign(v) * np.log1p(np.abs(v))).astype("float32")
+
+    def vector(self, texto):
+        with self._lock:
+            return self._vector(texto)
+
+    def _vector(self, texto):
+        conteos = _contar(texto)
+        return self._filas(1, [0] * len(conteos), [self._palabra(p) for p in conteos], list(conteos.values()))[0]
+
+    def agregar(self, documentos, lote=5000):
+        with self._lock:
+            total = 0
+            nuevos = []
+            for d in documentos:
+                if str(d["_id"]) not in self._posicion:
+                    nuevos.append(d)
+                if len(nuevos) >= lote:
+                    total += self._agregar(nuevos)
+                    nuevos = []
+            total += self._agregar(nuevos)
+            return total
+
+    def _agregar(self, nuevos):
+        import numpy as np
+        if not nuevos:
+            return 0
+
+        inicio = len(self.ids)
+        if inicio + len(nuevos) > len(self._matriz):
+            # Crece al doble, como una lista: agregar de a uno no copia la matriz cada vez
+            capacidad = max(inicio + len(nuevos), 2 * len(self._matriz), 1024)
+            matriz = np.zeros((capacidad, DIMENSIONES), dtype="float32")
+            matriz[:inicio] = self._matriz[:inicio]
+            self._matriz = matriz
+
+        filas, numeros, tfs = [], [], []
+        for k, d in enumerate(nuevos):
+            posicion = inicio + k
+            texto = d.get("reflexion") or ""
+            self._posicion[str(d["_id"])] = posicion
+            self.ids.append(str(d["_id"]))
+            self.fechas.append(d.get("fecha_hora"))
+            self.textos.append(texto)
+
+            for palabra, n in _contar(texto).items():
+                posiciones, tf = self._invertido.setdefault(palabra, (array("I"), array("I")))
+                posiciones.append(posicion)
+                tf.append(n)
+                filas.append(k)
+                numeros.append(self._palabra(palabra))
+                tfs.append(n)
+
+        bloque = self._filas(len(nuevos), filas, numeros, tfs)
+        self._matriz[inicio:inicio + len(nuevos)] = bloque
+        self._df += (bloque != 0).sum(axis=0)
+
+        if self._idf is None or len(self.ids) > self._n_idf * (1 + REFRESCO_IDF):
+            self._recalcular_idf()
+        else:
+            self._normas = np.concatenate([self._normas, self._norma(bloque)])
+        return len(nuevos)
+
+    def _recalcular_idf(self):
+        import numpy as np
+        n = len(self.ids)
+        self._idf = (np.log((1 + n) / (1 + self._df)) + 1).astype("float32")
+        self._normas = self._norma(self._matriz[:n])
+        self._n_idf = n
+
+    def _norma(self, filas):
+        import numpy as np
+        return np.sqrt((filas * filas) @ (self._idf * self._idf)).astype("float32")
+
+    # =========================
+    # CONSULTAS
+    # =========================
+    def buscar(self, consulta, k=20):
+        # Documentos con todas las palabras; puntaje tf·idf, y a igual puntaje el más nuevo
+        import numpy as np
+        with self._lock:
+            terminos = set(palabras(consulta))
+            if not terminos or any(t not in self._invertido for t in terminos):
+                return []
+
+            n = len(self.ids)
+            candidatos, puntaje = None, None
+            for t in sorted(terminos, key=lambda t: len(self._invertido[t][0])):
+                posiciones = np.frombuffer(self._invertido[t][0], dtype="uint32")
+                tf = np.frombuffer(self._invertido[t][1], dtype="uint32")
+                idf = math.log((1 + n) / (1 + len(posiciones))) + 1
+
+                if candidatos is None:
+                    candidatos, puntaje = posiciones.astype("int64"), tf * idf
+                    continue
+                i = np.searchsorted(posiciones, candidatos)
+                i[i == len(posiciones)] = 0
+                esta = posiciones[i] == candidatos
+                candidatos, puntaje = candidatos[esta], puntaje[esta] + tf[i[esta]] * idf
+                if not len(candidatos):
+                    return []
+
+            orden = np.lexsort((-candidatos, -puntaje))[:k]
+            return [self._resultado(candidatos[j], puntaje[j]) for j in orden]
+
+    def parecidas(self, texto=None, _id=None, k=5):
+        # Por texto libre o por una reflexión ya indexada (que queda fuera del resultado)
+        import numpy as np
+        with self._lock:
+            n = len(self.ids)
+            if not n:
+                return []
+
+            propia = self._posicion.get(str(_id)) if _id is not None else None
+            q = self._matriz[propia] if propia is not None else self._vector(texto)
+            q = q * self._idf
+            norma_q = float(np.linalg.norm(q))
+            if norma_q == 0:
+                return []
+
+            normas = self._normas[:n]
+            puntajes = (self._matriz[:n] @ (q * self._idf)) / (np.where(normas > 0, normas, 1) * norma_q)
+            if propia is not None:
+                puntajes[propia] = -np.inf
+
+            k = min(k, n - (propia is not None))
+            if k <= 0:
+                return []
+            mejores = np.argpartition(puntajes, -k)[-k:]
+            mejores = mejores[np.argsort(-puntajes[mejores])]
+            return [self._resultado(j, puntajes[j]) for j in mejores if puntajes[j] >= PARECIDO_MINIMO]
+
+    def _resultado(self, posicion, puntaje):
+        posicion = int(posicion)
+        return {
+            "_id": self.ids[posicion],
+            "fecha_hora": self.fechas[posicion],
+            "reflexion": self.textos[posicion],
+            "puntaje": float(puntaje),
+        }
+
+
+# =========================
+# ÍNDICE DEL PROCESO
+# =========================
+# Avisos acumulados sin ninguna búsqueda (la cola también avisa cada
+# clasificación): pasado esto se descartan y el índice se arma de nuevo
+MAX_RECIENTES = 1000
+
+_recientes = deque()
+_lock_recientes = threading.Lock()
+
+
+def avisar(documentos):
+    # Lo llaman el buffer de escrituras al sincronizar y el vigilante al ver un
+    # cambio con su documento: no construye el índice, solo deja los documentos
+    # para la próxima consulta
+    with _lock_recientes:
+        _recientes.extend(documentos)
+        if len(_recientes) <= MAX_RECIENTES:
+            return
+        # Ya están en Mongo: la próxima consulta los lee al armar el índice
+        _recientes.clear()
+    invalidar()
+
+
+def invalidar():
+    # Un cambio que el índice no sabe aplicar (un borrado, o un aviso sin
+    # documento del sondeo o al releer todo): se arma de nuevo en la próxima consulta
+    indice_reflexiones.clear()
+
+
+@st.cache_resource
+def indice_reflexiones():
+    # La instantánea Arrow, si cuadra con el conteo, evita leer toda la colección
+    # de Mongo; lo posterior llega con avisar
+    documentos = instantaneas.documentos("coleccion_reflexiones", db.coleccion_reflexiones.estimated_document_count())
+    if documentos is None:
+        documentos = db.coleccion_reflexiones.find({}, {"reflexion": 1, "fecha_hora": 1}).sort("fecha_hora", 1)
+
+    indice = IndiceReflexiones()
+    indice.agregar(documentos)
+    return indice
+
+
+def indice_al_dia():
+    # Sin consultar Mongo: lo que cambió lo avisaron el buffer y el vigilante
+    indice = indice_reflexiones()
+
+    with _lock_recientes:
+        pendientes = list(_recientes)
+        _recientes.clear()
+
+    # Un texto editado no se reemplaza en su lugar: se arma de nuevo
+    if any(indice.texto(d["_id"]) not in (None, d.get("reflexion") or "") for d in pendientes):
+        invalidar()
+        return indice_reflexiones()
+
+    indice.agregar(pendientes)
+    return indice
@@ -0,0 +1,67 @@
+# cache_clasificacion.py
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKC", texto or "")
+    return re.sub(r"\s+", " ", texto).strip().casefold()
+
+
+def clave(texto, version):
+    return hashlib.sha256(f"{version}\0{normalizar(texto)}".encode("utf-8")).hexdigest()
+
+
+# Memoización de clasificaciones: un LRU en memoria delante de una colección
+# de Mongo. La versión (prompt + modelo) forma parte de la clave, así que un
+# cambio de prompt deja de encontrar las entradas viejas sin borrar nada.
+class CacheClasificacion:
+
+    def __init__(self, coleccion, version, capacidad=1024):
+        self.coleccion = coleccion
+        self.version = version
+        self.capacidad = capacidad
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recordar(self, k, codigo):
+        with self._lock:
+            self._lru[k] = codigo
+            self._lru.move_to_end(k)
+            while len(self._lru) > self.capacidad:
+                self._lru.popitem(last=False)
+
+    def obtener(self, texto):
+        k = clave(texto, self.version)
+
+        with self._lock:
+            if k in self._lru:
+                self._lru.move_to_end(k)
+                return self._lru[k]
+
+        doc = self.coleccion.find_one({"_id": k}, {"codigo": 1})
+        if doc:
+            self._recordar(k, doc["codigo"])
+            return doc["codigo"]
+        return None
+
+    def guardar(self, texto, codigo):
+        k = clave(texto, self.version)
+        self._recordar(k, codigo)
+        self.coleccion.update_one(
+            {"_id": k},
+            {"$set": {
+                "codigo": codigo,
+                "version": self.version,
+                "actualizado": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    def purgar_versiones_viejas(self):
+        return self.coleccion.delete_many({"version": {"$ne": self.version}}).deleted_count
@@ -0,0 +1,171 @@
+# clasificador_local.py
+
+import hashlib
+import zlib
+
+from busqueda import palabras
+
+DIMENSIONES = 2 ** 14
+NGRAMA = 3
+# Cambia si cambian los rasgos: un artefacto de otra versión no se carga
+VERSION_RASGOS = 1
+
+ITERACIONES = 300
+TASA = 1.0
+MOMENTO = 0.9
+REGULARIZACION = 1e-4
+# Sin artefacto calibrado no se confía en nada: todo va a OpenAI
+UMBRAL_NUNCA = 1.01
+
+
+# =========================
+# RASGOS
+# =========================
+# Palabras, pares de palabras y trigramas de caracteres, llevados a
+# DIMENSIONES columnas con signo (hashing trick). Sin vocabulario que guardar:
+# el artefacto es solo la matriz de pesos.
+def rasgos(texto):
+    import numpy as np
+    ps = palabras(texto)
+    claves = [f"p:{p}" for p in ps] + [f"b:{a} {b}" for a, b in zip(ps, ps[1:])]
+    for p in ps:
+        marcada = f" {p} "
+        claves += [f"c:{marcada[i:i + NGRAMA]}" for i in range(len(marcada) - NGRAMA + 1)]
+    if not claves:
+        return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32")
+
+    hashes = np.array([zlib.crc32(k.encode()) for k in claves], dtype="int64")
+    columnas, inversa = np.unique(hashes % DIMENSIONES, return_inverse=True)
+    valores = np.bincount(inversa, np.where(hashes >> 31, 1.0, -1.0)).astype("float32")
+
+    valores = np.sign(valores) * np.log1p(np.abs(valores))
+    norma = np.linalg.norm(valores)
+    return columnas, valores / norma if norma else valores
+
+
+def _matriz(textos):
+    # Dispersa como (fila, columna, valor) por cada rasgo no nulo
+    import numpy as np
+    filas, columnas, valores = [], [], []
+    for i, texto in enumerate(textos):
+        c, v = rasgos(texto)
+        filas.append(np.full(len(c), i, dtype="int64"))
+        columnas.append(c)
+        valores.append(v)
+    return np.concatenate(filas), np.concatenate(columnas), np.concatenate(valores)
+
+
+# =========================
+# MODELO
+# =========================
+# Regresión logística multinomial: puntaje = pesos · rasgos + sesgo, y la
+# confianza es la probabilidad softmax del código elegido.
+class ClasificadorLocal:
+
+    def __init__(self, pesos, sesgo, codigos, umbral=UMBRAL_NUNCA):
+        self.pesos = pesos.astype("float32")
+        self.sesgo = sesgo.astype("float32")
+        self.codigos = list(codigos)
+        self.umbral = float(umbral)
+        huella = hashlib.sha256(self.pesos.astype("float16").tobytes() + "\0".join(self.codigos).encode())
+        self.version = f"local-{huella.hexdigest()[:12]}"
+
+    @classmethod
+    def cargar(cls, ruta):
+        # None si no existe o es de otra versión de rasgos
+        import numpy as np
+        try:
+            with np.load(ruta, allow_pickle=False) as datos:
+                if int(datos["version_rasgos"]) != VERSION_RASGOS or int(datos["dimensiones"]) != DIMENSIONES:
+                    return None
+                return cls(datos["pesos"], datos["sesgo"], datos["codigos"].tolist(), datos["umbral"])
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, ruta):
+        # float16 comprimido: unos cientos de KB para 12 códigos
+        import numpy as np
+        with open(ruta, "wb") as f:
+            np.savez_compressed(
+                f,
+                pesos=self.pesos.astype("float16"),
+                sesgo=self.sesgo,
+                codigos=np.array(self.codigos),
+                umbral=np.float32(self.umbral),
+                version_rasgos=np.int64(VERSION_RASGOS),
+                dimensiones=np.int64(DIMENSIONES),
+            )
+
+    def probabilidades(self, texto):
+        columnas, valores = rasgos(texto)
+        return _softmax(self.pesos[:, columnas] @ valores + self.sesgo)
+
+    def predecir(self, texto):
+        # (código, confianza)
+        import numpy as np
+        p = self.probabilidades(texto)
+        i = int(np.argmax(p))
+        return self.codigos[i], float(p[i])
+
+    def clasificar(self, texto):
+        # El código solo si la confianza alcanza el umbral; si no, None
+        codigo, confianza = self.predecir(texto)
+        return codigo if confianza >= self.umbral else None
+
+
+def _softmax(z):
+    import numpy as np
+    z = np.exp(z - z.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+
+# =========================
+# ENTRENAMIENTO
+# =========================
+def entrenar(textos, etiquetas, pesos_ejemplo=None, iteraciones=ITERACIONES, regularizacion=REGULARIZACION):
+    # Descenso de gradiente con momento sobre la pérdida logística promedio
+    import numpy as np
+    codigos = sorted(set(etiquetas))
+    indice = {c: i for i, c in enumerate(codigos)}
+    n, k = len(textos), len(codigos)
+
+    filas, columnas, valores = _matriz(textos)
+    y = np.zeros((n, k), dtype="float32")
+    y[np.arange(n), [indice[e] for e in etiquetas]] = 1
+    w = np.ones(n, dtype="float32") if pesos_ejemplo is None else np.asarray(pesos_ejemplo, dtype="float32")
+    w = w / w.sum()
+
+    pesos = np.zeros((k, DIMENSIONES), dtype="float32")
+    sesgo = np.zeros(k, dtype="float32")
+    v_pesos, v_sesgo = np.zeros_like(pesos), np.zeros_like(sesgo)
+
+    for _ in range(iteraciones):
+        z = np.stack([np.bincount(filas, pesos[j, columnas] * valores, minlength=n) for j in range(k)], axis=1)
+        g = (_softmax(z + sesgo) - y) * w[:, None]
+
+        g_pesos = np.stack([np.bincount(columnas, g[filas, j] * valores, minlength=DIMENSIONES) for j in range(k)])
+        g_pesos += regularizacion * pesos
+        v_pesos = MOMENTO * v_pesos - TASA * g_pesos.astype("float32")
+        v_sesgo = MOMENTO * v_sesgo - TASA * g.sum(axis=0)
+        pesos += v_pesos
+        sesgo += v_sesgo
+
+    return ClasificadorLocal(pesos, sesgo, codigos)
+
+
+def calibrar_umbral(modelo, textos, etiquetas, acierto_objetivo):
+    # Menor umbral con el que las respuestas aceptadas aciertan al menos
+    # `acierto_objetivo`; UMBRAL_NUNCA si ninguno lo logra
+    import numpy as np
+    if not textos:
+        return UMBRAL_NUNCA
+    predicciones = [modelo.predecir(t) for t in textos]
+    confianzas = np.array([c for _, c in predicciones])
+    aciertos = np.array([p == e for (p, _), e in zip(predicciones, etiquetas)], dtype="float64")
+
+    orden = np.argsort(-confianzas)
+    acierto_acumulado = np.cumsum(aciertos[orden]) / np.arange(1, len(orden) + 1)
+    validos = np.nonzero(acierto_acumulado >= acierto_objetivo)[0]
+    if not len(validos):
+        return UMBRAL_NUNCA
+    return float(confianzas[orden][validos[-1]])
@@ -0,0 +1,155 @@
+# cola_clasificacion.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+CLASIFICADA = "clasificada"
+FALLIDA = "fallida"
+
+MAX_INTENTOS = 5
+ESPERA_BASE = timedelta(seconds=5)
+ESPERA_MAX = timedelta(minutes=10)
+# Más que el peor caso de una clasificación remota (ver openai_client.TIMEOUT_SEGUNDOS)
+BLOQUEO = timedelta(minutes=5)
+SONDEO_SEGUNDOS = 30
+
+
+def documento_pendiente(documento):
+    # Campos con los que se inserta una reflexión todavía sin clasificar
+    ahora = datetime.now(timezone.utc)
+    return {
+        **documento,
+        "categoria_categorial": PENDIENTE,
+        "clasificacion": {"estado": PENDIENTE, "intentos": 0, "proximo_intento": ahora},
+    }
+
+
+# La cola vive en la propia colección: cada reflexión lleva su estado en
+# "clasificacion", así que sobrevive a reinicios del proceso. Un documento
+# tomado por un hilo que murió se libera al vencer "bloqueado_hasta".
+# `local(texto)` se prueba antes que `clasificador`: devuelve (código, versión)
+# si puede resolverlo sin red, o None para seguir con el clasificador remoto.
+class ColaClasificacion:
+
+    def __init__(self, coleccion, clasificador, hilos=2, version=None, local=None):
+        self.coleccion = coleccion
+        self.clasificador = clasificador
+        self.version = version
+        self.local = local
+        self._cupos = threading.Semaphore(hilos)
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="clasificacion")
+        self._despertar = threading.Event()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="cola-clasificacion", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join()
+        self._pool.shutdown(wait=True)
+
+    def avisar(self):
+        self._despertar.set()
+
+    # =========================
+    # BUCLE
+    # =========================
+    def _bucle(self):
+        while not self._parar.is_set():
+            self._cupos.acquire()
+            try:
+                doc = self._tomar()
+            except Exception:
+                doc = None
+
+            if doc is None:
+                self._cupos.release()
+                self._despertar.wait(SONDEO_SEGUNDOS)
+                self._despertar.clear()
+                continue
+
+            self._pool.submit(self._procesar, doc)
+
+    def drenar(self):
+        # Procesa en el hilo actual todo lo que esté listo (útil en scripts y pruebas)
+        procesados = 0
+        while (doc := self._tomar()) is not None:
+            self._cupos.acquire()
+            self._procesar(doc)
+            procesados += 1
+        return procesados
+
+    def _tomar(self):
+        ahora = datetime.now(timezone.utc)
+        return self.coleccion.find_one_and_update(
+            {"$or": [
+                {"clasificacion.estado": PENDIENTE, "clasificacion.proximo_intento": {"$lte": ahora}},
+                {"clasificacion.estado": PROCESANDO, "clasificacion.bloqueado_hasta": {"$lte": ahora}},
+            ]},
+            {"$set": {"clasificacion.estado": PROCESANDO, "clasificacion.bloqueado_hasta": ahora + BLOQUEO}},
+            sort=[("clasificacion.proximo_intento", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _procesar(self, doc):
+        try:
+            texto = doc.get("reflexion", "")
+            try:
+                resuelta = self.local(texto) if self.local else None
+                if resuelta:
+                    categoria, version = resuelta
+                else:
+                    categoria, version = self.clasificador(texto), self.version
+            except Exception as e:
+                self._reintentar(doc, e)
+                return
+
+            cambios = {
+                "categoria_categorial": categoria,
+                "clasificacion.estado": CLASIFICADA,
+                "clasificacion.origen": "local" if resuelta else "remoto",
+            }
+            if version:
+                cambios["version_clasificacion"] = version
+
+            self.coleccion.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": cambios,
+                    "$unset": {"clasificacion.bloqueado_hasta": "", "clasificacion.proximo_intento": "", "clasificacion.error": ""}
+                }
+            )
+        finally:
+            self._cupos.release()
+
+    def _reintentar(self, doc, error):
+        intentos = doc["clasificacion"].get("intentos", 0) + 1
+        cambios = {"clasificacion.intentos": intentos, "clasificacion.error": str(error)[:500]}
+
+        if intentos >= MAX_INTENTOS:
+            # Sin código del sistema la tabla la muestra como "Sin categoría", no
+            # como pendiente; reclasificar_reflexiones.py la vuelve a intentar
+            cambios["clasificacion.estado"] = FALLIDA
+            cambios["categoria_categorial"] = FALLIDA
+        else:
+            espera = min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAX)
+            cambios["clasificacion.estado"] = PENDIENTE
+            cambios["clasificacion.proximo_intento"] = datetime.now(timezone.utc) + espera
+
+        self.coleccion.update_one(
+            {"_id": doc["_id"]},
+            {"$set": cambios, "$unset": {"clasificacion.bloqueado_hasta": ""}}
+        )
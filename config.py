@@ -1,9 +1,15 @@
 # config.py
 
+import os
+from datetime import datetime
+
 import pytz
 
 colombia = pytz.timezone("America/Bogota")
 
+# Colombia no tiene horario de verano: un único desfase sirve para toda la historia
+DESFASE_COLOMBIA = int(colombia.utcoffset(datetime(2000, 1, 1)).total_seconds())
+
 dias_semana_3letras = {
     0: "Lun", 1: "Mar", 2: "Mié", 3: "Jue", 4: "Vie", 5: "Sáb", 6: "Dom"
 }
@@ -11,6 +17,24 @@ dias_semana_3letras = {
 EVENTO_A = "La Iniciativa Aquella"
 EVENTO_B = "La Iniciativa de Pago"
 
+# Registros por página en el historial
+TAMANO_PAGINA_HISTORIAL = int(os.getenv("HISTORIAL_TAMANO_PAGINA", "20"))
+
+# Escrituras confirmadas localmente antes de llegar a Mongo (SQLite)
+ARCHIVO_BUFFER_ESCRITURAS = os.getenv("BUFFER_ESCRITURAS", "buffer_escrituras.sqlite3")
+
+# Copias columnares (Arrow IPC por mes) para leer el historial sin ir a Mongo
+DIRECTORIO_INSTANTANEAS = os.getenv("INSTANTANEAS", "instantaneas")
+
+# Pesos del clasificador local que responde antes de llamar a OpenAI
+ARCHIVO_CLASIFICADOR_LOCAL = os.getenv("CLASIFICADOR_LOCAL", "clasificador_local.npz")
+
+# Cada cuánto una sesión abierta mira si otro dispositivo cambió el estado (sin consultar Mongo)
+REFRESCO_SESIONES_SEGUNDOS = float(os.getenv("REFRESCO_SESIONES", "5"))
+
+# Caracteres de texto que se muestran antes de "Ver completo"
+LARGO_VISTA_PREVIA = 300
+
 # Sistema categorial (COMPLETO, sin perder nada)
 sistema_categorial = {
     "1.1": {"categoria": "Dinámicas cotidianas", "subcategoria": "Organización del tiempo",
@@ -1,14 +1,191 @@
 import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
 import streamlit as st
-from pymongo import MongoClient
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
 
-uri = st.secrets.get("mongo_uri") or os.getenv("MONGO_URI")
+from config import EVENTO_A
+from instrumentacion import escuchas_mongo
 
-client = MongoClient(uri, serverSelectionTimeoutMS=5000)
-client.admin.command("ping")
 
-db = client["registro_bucle"]
+def _config(clave, defecto=None):
+    try:
+        valor = st.secrets.get(clave)
+    except FileNotFoundError:
+        # Sin secrets.toml (scripts, benchmarks): solo variables de entorno
+        valor = None
+    return valor or os.getenv(clave.upper()) or defecto
 
-coleccion_eventos = db["eventos"]
-coleccion_reflexiones = db["reflexiones"]
-coleccion_capital_b = db["capitalizacion_b"]
\ No newline at end of file
+
+COLECCIONES = {
+    "coleccion_eventos": "eventos",
+    "coleccion_reflexiones": "reflexiones",
+    "coleccion_capital_b": "capitalizacion_b",
+    "coleccion_cache_clasificacion": "cache_clasificaciones",
+    "coleccion_estado": "estado_actual",
+}
+
+
+# =========================
+# CLIENTE COMPARTIDO (UNO POR PROCESO)
+# =========================
+_inyectado = {"client": None, "base": "registro_bucle"}
+
+
+def usar_cliente(client, base="registro_bucle"):
+    # Para benchmarks y pruebas: hay que llamarlo antes de importar los demás módulos
+    _inyectado["client"] = client
+    _inyectado["base"] = base
+    _recursos.clear()
+
+
+@st.cache_resource
+def _recursos():
+    # MongoClient no bloquea al construirse: la conexión se abre con la primera operación
+    client = _inyectado["client"] or MongoClient(
+        _config("mongo_uri"),
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=int(_config("mongo_max_pool_size", 20)),
+        minPoolSize=int(_config("mongo_min_pool_size", 1)),
+        maxIdleTimeMS=int(_config("mongo_max_idle_time_ms", 300000)),
+        event_listeners=escuchas_mongo(),
+    )
+    db = client[_inyectado["base"]]
+
+    recursos = {"client": client, "db": db}
+    for nombre, coleccion in COLECCIONES.items():
+        recursos[nombre] = db[coleccion]
+    return recursos
+
+
+def __getattr__(nombre):
+    # `from db import coleccion_eventos` sigue funcionando, pero todos comparten el mismo pool
+    if nombre in ("client", "db") or nombre in COLECCIONES:
+        return _recursos()[nombre]
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+# =========================
+# SALUD DE LA CONEXIÓN
+# =========================
+ESPERA_MIN = 1.0
+ESPERA_MAX = 60.0
+
+
+@st.cache_resource
+def _salud():
+    return {"ok": False, "siguiente": 0.0, "espera": ESPERA_MIN, "lock": threading.Lock()}
+
+
+def conexion_saludable():
+    # Un solo ping por proceso; si falla, los reintentos se espacian exponencialmente
+    estado = _salud()
+    if estado["ok"]:
+        return True
+    if time.monotonic() < estado["siguiente"]:
+        return False
+
+    with estado["lock"]:
+        if not estado["ok"]:
+            try:
+                _recursos()["client"].admin.command("ping")
+                asegurar_indices()
+                estado["ok"] = True
+                estado["espera"] = ESPERA_MIN
+            except PyMongoError:
+                estado["siguiente"] = time.monotonic() + estado["espera"]
+                estado["espera"] = min(estado["espera"] * 2, ESPERA_MAX)
+
+    return estado["ok"]
+
+
+# =========================
+# ÍNDICES
+# =========================
+def indices():
+    r = _recursos()
+    return [
+        # _id desempata fechas iguales en la paginación por (fecha, _id)
+        (r["coleccion_eventos"], [("evento", ASCENDING), ("fecha_hora", DESCENDING), ("_id", DESCENDING)]),
+        (r["coleccion_reflexiones"], [("fecha_hora", DESCENDING), ("_id", DESCENDING)]),
+        (r["coleccion_reflexiones"], [("clasificacion.estado", ASCENDING), ("clasificacion.proximo_intento", ASCENDING)]),
+        (r["coleccion_capital_b"], [("fecha_registro", DESCENDING), ("_id", DESCENDING)]),
+    ]
+
+
+def indices_reemplazados():
+    # Versiones anteriores sin _id: los de arriba los cubren como prefijo
+    r = _recursos()
+    return [
+        (r["coleccion_eventos"], "evento_1_fecha_hora_-1"),
+        (r["coleccion_reflexiones"], "fecha_hora_-1"),
+        (r["coleccion_capital_b"], "fecha_registro_-1"),
+    ]
+
+
+def asegurar_indices():
+    # create_index no hace nada si el índice ya existe con la misma definición
+    for coleccion, claves in indices():
+        coleccion.create_index(claves)
+    for coleccion, nombre in indices_reemplazados():
+        if nombre in coleccion.index_information():
+            coleccion.drop_index(nombre)
+
+
+# =========================
+# PAGINACIÓN
+# =========================
+def orden_pagina(campo):
+    return [(campo, DESCENDING), ("_id", DESCENDING)]
+
+
+def anteriores(campo, cursor):
+    # Lo que sigue a cursor = (fecha, _id) en orden (campo, _id) descendente:
+    # con solo la fecha, los registros con la misma fecha se perderían o repetirían
+    fecha, _id = cursor
+    return {"$or": [{campo: {"$lt": fecha}}, {campo: fecha, "_id": {"$lt": _id}}]}
+
+
+def consultas_calientes():
+    r = _recursos()
+    ahora = datetime.now(timezone.utc)
+    return [
+        ("eventos por tipo", r["coleccion_eventos"].find({"evento": EVENTO_A}).sort("fecha_hora", -1)),
+        ("interrupción anterior", r["coleccion_eventos"].find(
+            {"evento": "interrupcion", "fecha_hora": {"$lt": ahora}}).sort("fecha_hora", -1).limit(1)),
+        ("reflexiones", r["coleccion_reflexiones"].find().sort(orden_pagina("fecha_hora"))),
+        ("reflexiones (página)", r["coleccion_reflexiones"].find(
+            anteriores("fecha_hora", (ahora, ObjectId()))).sort(orden_pagina("fecha_hora")).limit(20)),
+        ("capital", r["coleccion_capital_b"].find().sort(orden_pagina("fecha_registro"))),
+    ]
+
+
+def _etapas(plan):
+    yield plan.get("stage")
+    for clave in ("inputStage", "queryPlan"):
+        if clave in plan:
+            yield from _etapas(plan[clave])
+    for sub in plan.get("inputStages", []):
+        yield from _etapas(sub)
+
+
+def verificar_indices():
+    resultado = {}
+    for nombre, cursor in consultas_calientes():
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        resultado[nombre] = "COLLSCAN" in set(_etapas(plan))
+    return resultado
+
+
+if __name__ == "__main__":
+    asegurar_indices()
+    if "--check" in sys.argv:
+        resultado = verificar_indices()
+        for nombre, collscan in resultado.items():
+            print(f"{'✖ COLLSCAN' if collscan else '✔ índice  '}  {nombre}")
+        sys.exit(1 if any(resultado.values()) else 0)
+    print("✔ Índices asegurados")
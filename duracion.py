@@ -0,0 +1,160 @@
+# duracion.py
+
+import calendar
+import functools
+import time
+from datetime import date, datetime, timedelta
+
+from config import DESFASE_COLOMBIA
+
+US_POR_SEGUNDO = 1_000_000
+US_POR_DIA = 86_400 * US_POR_SEGUNDO
+EPOCA = datetime(1970, 1, 1)
+
+# Meses precalculados (ordinal del día 1) para anclar sin calendar/date en cada llamada
+ANIO_TABLA_DESDE, ANIO_TABLA_HASTA = 1900, 2200
+
+UNIDADES_CORTAS = ("a", "m", "d", "h", "m", "s")
+UNIDADES_LARGAS = ("años", "meses", "días", "horas", "minutos")
+
+
+# =========================
+# DESCOMPOSICIÓN (EQUIVALENTE A relativedelta(fin, inicio))
+# =========================
+# Sobre la hora de pared: los meses se cuentan anclando el día de `inicio`
+# (recortado al largo del mes) y el resto se reparte en días, horas, minutos
+# y segundos. Todo con enteros en microsegundos, sin construir relativedelta.
+def _instante(f):
+    return f.toordinal() * US_POR_DIA + _hora_us(f)
+
+
+def _hora_us(f):
+    return ((f.hour * 60 + f.minute) * 60 + f.second) * US_POR_SEGUNDO + f.microsecond
+
+
+@functools.cache
+def _primeros_de_mes():
+    return [
+        date(anio, mes, 1).toordinal()
+        for anio in range(ANIO_TABLA_DESDE, ANIO_TABLA_HASTA + 1) for mes in range(1, 13)
+    ]
+
+
+def _mes(k):
+    # k = año * 12 + mes - 1 → (ordinal del día 1, días del mes)
+    tabla = _primeros_de_mes()
+    i = k - ANIO_TABLA_DESDE * 12
+    if 0 <= i < len(tabla) - 1:
+        return tabla[i], tabla[i + 1] - tabla[i]
+    anio, mes = divmod(k, 12)
+    return date(anio, mes + 1, 1).toordinal(), calendar.monthrange(anio, mes + 1)[1]
+
+
+def _ancla(f, meses):
+    # f + relativedelta(months=meses)
+    primero, largo = _mes(f.year * 12 + f.month - 1 + meses)
+    return (primero + min(f.day, largo) - 1) * US_POR_DIA + _hora_us(f)
+
+
+def _repartir(meses, segundos):
+    # Como relativedelta: cada unidad trunca hacia cero y conserva el signo
+    sm = -1 if meses < 0 else 1
+    ss = -1 if segundos < 0 else 1
+    meses, segundos = abs(meses), abs(segundos)
+    return (
+        meses // 12 * sm, meses % 12 * sm,
+        segundos // 86400 * ss, segundos % 86400 // 3600 * ss,
+        segundos % 3600 // 60 * ss, segundos % 60 * ss,
+    )
+
+
+def partes(inicio, fin):
+    # (años, meses, días, horas, minutos, segundos)
+    fin_us = _instante(fin)
+    meses = (fin.year - inicio.year) * 12 + fin.month - inicio.month
+    ancla = _ancla(inicio, meses)
+
+    # El ancla cae en el mes de `fin`: basta con un paso de corrección
+    if fin_us >= _instante(inicio):
+        if ancla > fin_us:
+            meses -= 1
+            ancla = _ancla(inicio, meses)
+    elif ancla < fin_us:
+        meses += 1
+        ancla = _ancla(inicio, meses)
+
+    return _repartir(meses, (fin_us - ancla) // US_POR_SEGUNDO)
+
+
+def partes_arreglo(inicio, fin):
+    # Lo mismo que `partes`, sobre arreglos datetime64 de hora de pared
+    import numpy as np
+    inicio = np.asarray(inicio, dtype="datetime64[us]")
+    fin = np.asarray(fin, dtype="datetime64[us]")
+
+    mes_inicio = inicio.astype("datetime64[M]")
+    dia_inicio = (inicio.astype("datetime64[D]") - mes_inicio.astype("datetime64[D]")).astype("int64")
+    hora_inicio = (inicio - inicio.astype("datetime64[D]")).astype("int64")
+    fin_us = fin.astype("int64")
+
+    def ancla(meses):
+        mes = mes_inicio + meses
+        primero = mes.astype("datetime64[D]")
+        largo = ((mes + 1).astype("datetime64[D]") - primero).astype("int64")
+        dia = primero + np.minimum(dia_inicio, largo - 1)
+        return dia.astype("datetime64[us]").astype("int64") + hora_inicio
+
+    meses = (fin.astype("datetime64[M]") - mes_inicio).astype("int64")
+    fijo = ancla(meses)
+
+    adelante = fin_us >= inicio.astype("int64")
+    correccion = np.where(adelante, -(fijo > fin_us).astype("int64"), (fijo < fin_us).astype("int64"))
+    if correccion.any():
+        meses = meses + correccion
+        fijo = np.where(correccion != 0, ancla(meses), fijo)
+
+    segundos = (fin_us - fijo) // US_POR_SEGUNDO
+    sm, ss = np.sign(meses), np.sign(segundos)
+    meses, segundos = np.abs(meses), np.abs(segundos)
+    return (
+        meses // 12 * sm, meses % 12 * sm,
+        segundos // 86400 * ss, segundos % 86400 // 3600 * ss,
+        segundos % 3600 // 60 * ss, segundos % 60 * ss,
+    )
+
+
+# =========================
+# TEXTO
+# =========================
+def texto_corto(p, incluir_segundos=False):
+    # "1a 2m 3d 4h 5m"
+    unidades = UNIDADES_CORTAS if incluir_segundos else UNIDADES_CORTAS[:5]
+    return " ".join(f"{v}{u}" for v, u in zip(p, unidades) if v) or "0m"
+
+
+def texto_largo(p):
+    # "1 años, 2 meses, 3 días, 4 horas, 5 minutos"
+    return ", ".join(f"{v} {u}" for v, u in zip(p, UNIDADES_LARGAS) if v) or "0 minutos"
+
+
+def textos_cortos(p, incluir_segundos=False):
+    # texto_corto sobre los arreglos de partes_arreglo
+    import numpy as np
+    unidades = UNIDADES_CORTAS if incluir_segundos else UNIDADES_CORTAS[:5]
+    texto = np.full(len(p[0]), "", dtype=object)
+    for valores, unidad in zip(p, unidades):
+        texto = texto + np.where(valores != 0, valores.astype(str).astype(object) + unidad + " ", "")
+    texto = np.char.rstrip(texto.astype(str))
+    return np.where(texto == "", "0m", texto).astype(object)
+
+
+def ahora_colombia():
+    # Hora de pared sin zona; evita pytz, que es lo más caro de datetime.now(colombia)
+    return EPOCA + timedelta(seconds=time.time() + DESFASE_COLOMBIA)
+
+
+def humanizar_minutos(minutos, referencia=None):
+    # Los meses y años dependen del calendario: se cuentan desde `referencia` (por defecto, ahora)
+    referencia = referencia or ahora_colombia()
+    return texto_largo(partes(referencia, referencia + timedelta(minutes=minutos)))
+
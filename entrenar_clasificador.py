@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+import numpy as np
+
+import clasificador_local
+from config import sistema_categorial, ARCHIVO_CLASIFICADOR_LOCAL
+from db import coleccion_reflexiones
+# Sin caché de clasificaciones: para comparar hay que medir la llamada real
+from helpers import clasificar_lote_remoto
+
+parser = argparse.ArgumentParser(description="Entrena el clasificador local de reflexiones.")
+parser.add_argument("--salida", default=ARCHIVO_CLASIFICADOR_LOCAL)
+parser.add_argument("--validacion", type=float, default=0.2,
+                    help="fracción de reflexiones etiquetadas apartada para calibrar el umbral")
+parser.add_argument("--acierto-objetivo", type=float, default=0.9,
+                    help="acierto mínimo de las respuestas locales aceptadas")
+parser.add_argument("--peso-sistema", type=float, default=1.0,
+                    help="peso de los textos del sistema categorial frente a una reflexión")
+parser.add_argument("--iteraciones", type=int, default=clasificador_local.ITERACIONES)
+parser.add_argument("--comparar", type=int, default=0,
+                    help="reflexiones de validación a clasificar también con OpenAI (cuesta llamadas)")
+parser.add_argument("--reporte", help="guardar el reporte en este archivo JSON")
+parser.add_argument("--semilla", type=int, default=0)
+args = parser.parse_args()
+
+# =========================
+# DATOS
+# =========================
+# Solo etiquetas puestas por OpenAI: entrenar con las del propio modelo local
+# reforzaría sus errores
+reflexiones = [
+    (d["reflexion"], d["categoria_categorial"])
+    for d in coleccion_reflexiones.find(
+        {"categoria_categorial": {"$in": list(sistema_categorial)}, "clasificacion.origen": {"$ne": "local"}},
+        {"reflexion": 1, "categoria_categorial": 1}
+    )
+    if (d.get("reflexion") or "").strip()
+]
+random.Random(args.semilla).shuffle(reflexiones)
+corte = int(len(reflexiones) * (1 - args.validacion))
+entrenamiento, validacion = reflexiones[:corte], reflexiones[corte:]
+
+# Cada código aporta su descripción y cada frase de lo observable, así
+# ningún código queda sin ejemplos aunque todavía no tenga reflexiones
+sistema = []
+for codigo, info in sistema_categorial.items():
+    frases = [info["subcategoria"], info["descriptor"], info["observable"], f"{info['categoria']}: {info['subcategoria']}"]
+    frases += [f.strip() for f in re.split(r"[,;()]", info["observable"]) if len(f.strip()) > 3]
+    sistema += [(f, codigo) for f in frases]
+
+print(f"{len(reflexiones)} reflexiones etiquetadas ({len(entrenamiento)} entrenamiento, "
+      f"{len(validacion)} validación) + {len(sistema)} textos del sistema")
+
+
+def entrenar(ejemplos):
+    textos, etiquetas = zip(*(ejemplos + sistema))
+    pesos = [1.0] * len(ejemplos) + [args.peso_sistema] * len(sistema)
+    return clasificador_local.entrenar(textos, etiquetas, pesos, iteraciones=args.iteraciones)
+
+
+def percentiles(ms):
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+# =========================
+# VALIDACIÓN Y UMBRAL
+# =========================
+t0 = time.perf_counter()
+modelo = entrenar(entrenamiento)
+print(f"Entrenado en {time.perf_counter() - t0:.1f} s")
+
+textos_val = [t for t, _ in validacion]
+etiquetas_val = [e for _, e in validacion]
+umbral = clasificador_local.calibrar_umbral(modelo, textos_val, etiquetas_val, args.acierto_objetivo)
+
+reporte = {"reflexiones": len(reflexiones), "umbral": umbral}
+if validacion:
+    tiempos, predicciones = [], []
+    for texto in textos_val:
+        t = time.perf_counter()
+        predicciones.append(modelo.predecir(texto))
+        tiempos.append((time.perf_counter() - t) * 1000)
+
+    aciertos = [p == e for (p, _), e in zip(predicciones, etiquetas_val)]
+    aceptadas = [a for (_, c), a in zip(predicciones, aciertos) if c >= umbral]
+    reporte["local"] = {
+        "acierto": round(sum(aciertos) / len(aciertos), 4),
+        "cobertura": round(len(aceptadas) / len(aciertos), 4),
+        "acierto_aceptadas": round(sum(aceptadas) / len(aceptadas), 4) if aceptadas else None,
+        **percentiles(tiempos),
+    }
+
+    # Contra OpenAI en vivo: acuerdo y latencia sobre las mismas reflexiones
+    if args.comparar:
+        muestra = list(zip(textos_val, predicciones))[:args.comparar]
+        tiempos_remoto, acuerdos, acuerdos_aceptadas = [], [], []
+        for texto, (codigo, confianza) in muestra:
+            t = time.perf_counter()
+            remoto = clasificar_lote_remoto([texto])[0]
+            tiempos_remoto.append((time.perf_counter() - t) * 1000)
+            acuerdos.append(remoto == codigo)
+            if confianza >= umbral:
+                acuerdos_aceptadas.append(remoto == codigo)
+
+        reporte["remoto"] = {
+            "muestra": len(muestra),
+            "acuerdo": round(sum(acuerdos) / len(acuerdos), 4),
+            "acuerdo_aceptadas": round(sum(acuerdos_aceptadas) / len(acuerdos_aceptadas), 4) if acuerdos_aceptadas else None,
+            **percentiles(tiempos_remoto),
+        }
+
+# =========================
+# MODELO FINAL
+# =========================
+# Con todo lo etiquetado y el umbral calibrado en validación
+modelo = entrenar(reflexiones)
+modelo.umbral = umbral
+modelo.guardar(args.salida)
+reporte["version"] = modelo.version
+reporte["bytes"] = os.path.getsize(args.salida)
+
+print(json.dumps(reporte, indent=2, ensure_ascii=False))
+if umbral >= clasificador_local.UMBRAL_NUNCA:
+    print(f"⚠ Ningún umbral llega a {args.acierto_objetivo:.0%} de acierto: todo seguirá yendo a OpenAI")
+if args.reporte:
+    with open(args.reporte, "w") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+print(f"✔ Guardado en {args.salida}")
@@ -0,0 +1,116 @@
+# estado.py
+
+from pymongo import ReturnDocument
+
+import db
+from agregaciones import minutos_entre
+
+# Un documento por tipo de evento, con _id = nombre del evento:
+#   ultima        fecha_hora del último registro
+#   inicio_racha  desde cuándo corre la racha actual (fin de la interrupción, o la fecha del evento)
+#   conteo        cantidad de registros
+#   gap_min       minutos entre la racha anterior y el último registro
+#   aplicados     _id de los últimos registros ya sumados
+
+# Más que un lote del buffer de escrituras: reenviar uno entero no suma dos veces
+RECORDADOS = 500
+
+
+def _referencia(doc):
+    return doc.get("fin") or doc["fecha_hora"]
+
+
+def _inicio(doc):
+    return doc.get("inicio") or doc["fecha_hora"]
+
+
+def actualizar_estado(evento, _id, fecha_hora, inicio=None, referencia=None):
+    inicio = inicio or fecha_hora
+    referencia = referencia or fecha_hora
+
+    # Un registro que ya se sumó (el buffer lo reenvió) no cambia nada
+    aplicados = {"$ifNull": ["$aplicados", []]}
+    ya_aplicado = {"$in": [_id, aplicados]}
+
+    # Un registro atrasado (anterior al último) solo suma al conteo
+    es_ultimo = {"$cond": [ya_aplicado, False, {"$gte": [fecha_hora, {"$ifNull": ["$ultima", fecha_hora]}]}]}
+    gap = {"$cond": [
+        {"$ifNull": ["$inicio_racha", False]},
+        {"$let": {
+            "vars": {"g": minutos_entre("$inicio_racha", inicio)},
+            "in": {"$cond": [{"$gte": ["$$g", 0]}, "$$g", None]}
+        }},
+        None
+    ]}
+
+    return db.coleccion_estado.find_one_and_update(
+        {"_id": evento},
+        [{"$set": {
+            "conteo": {"$add": [{"$ifNull": ["$conteo", 0]}, {"$cond": [ya_aplicado, 0, 1]}]},
+            "ultima": {"$cond": [es_ultimo, fecha_hora, "$ultima"]},
+            "inicio_racha": {"$cond": [es_ultimo, referencia, "$inicio_racha"]},
+            "gap_min": {"$cond": [es_ultimo, gap, "$gap_min"]},
+            "aplicados": {"$cond": [
+                ya_aplicado,
+                aplicados,
+                {"$slice": [{"$concatArrays": [aplicados, [_id]]}, -RECORDADOS]}
+            ]},
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+# =========================
+# LECTURA
+# =========================
+def estados_actuales(eventos):
+    encontrados = {e["_id"]: e for e in db.coleccion_estado.find({"_id": {"$in": list(eventos)}})}
+
+    for evento in eventos:
+        if evento not in encontrados:
+            encontrados[evento] = reconstruir_estado(evento)
+
+    return encontrados
+
+
+def estado_actual(evento):
+    return estados_actuales([evento])[evento]
+
+
+# =========================
+# RECONSTRUCCIÓN
+# =========================
+def reconstruir_estado(evento):
+    conteo = db.coleccion_eventos.count_documents({"evento": evento})
+    ultimos = list(
+        db.coleccion_eventos.find({"evento": evento}, {"inicio": 1, "fin": 1, "fecha_hora": 1})
+        .sort("fecha_hora", -1)
+        .limit(RECORDADOS)
+    )
+
+    if not ultimos:
+        db.coleccion_estado.delete_one({"_id": evento})
+        return None
+
+    gap = None
+    if len(ultimos) >= 2:
+        gap = int((_inicio(ultimos[0]) - _referencia(ultimos[1])).total_seconds() // 60)
+        if gap < 0:
+            gap = None
+
+    doc = {
+        "_id": evento,
+        "ultima": ultimos[0]["fecha_hora"],
+        "inicio_racha": _referencia(ultimos[0]),
+        "conteo": conteo,
+        "gap_min": gap,
+        # Ya están en el conteo: si el buffer los reenvía no se suman otra vez
+        "aplicados": [u["_id"] for u in reversed(ultimos)],
+    }
+    db.coleccion_estado.replace_one({"_id": evento}, doc, upsert=True)
+    return doc
+
+
+def reconstruir_todo():
+    return [reconstruir_estado(evento) for evento in db.coleccion_eventos.distinct("evento")]
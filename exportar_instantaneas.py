@@ -0,0 +1,21 @@
+import argparse
+import time
+
+import instantaneas
+
+parser = argparse.ArgumentParser(description="Exporta las colecciones a instantáneas Arrow por mes.")
+parser.add_argument("--completo", action="store_true",
+                    help="rehacer todo (por ejemplo después de reclasificar o migrar documentos)")
+parser.add_argument("--lote", type=int, default=instantaneas.LOTE, help="documentos por lote del cursor")
+parser.add_argument("--colecciones", default=",".join(instantaneas.COLECCIONES),
+                    help="claves de db.COLECCIONES separadas por coma")
+args = parser.parse_args()
+
+for clave in args.colecciones.split(","):
+    t0 = time.perf_counter()
+    filas = instantaneas.exportar(clave, completo=args.completo, lote=args.lote)
+    datos = instantaneas.manifiesto(clave)
+    total = datos["filas"] if datos else 0
+    print(f"{clave}: +{filas} ({total} en total) en {time.perf_counter() - t0:.2f} s")
+
+print("✔ Instantáneas al día")
@@ -0,0 +1,84 @@
+# formato.py
+
+import functools
+
+from config import colombia, dias_semana_3letras
+
+FORMATO_FECHA = "%d-%m-%y"
+FORMATO_HORA = "%H:%M"
+FORMATO_FECHA_HORA = f"{FORMATO_FECHA} {FORMATO_HORA}"
+
+# es-CO: punto para miles, coma para decimales (una sola pasada en vez de tres replace)
+_SEPARADORES_CO = str.maketrans(",.", ".,")
+
+
+# =========================
+# FECHAS (SOBRE SERIES COMPLETAS)
+# =========================
+def a_colombia(valores):
+    # Mongo devuelve datetimes sin zona, en UTC
+    import pandas as pd
+    fechas = pd.to_datetime(pd.Series(valores, dtype="object"))
+    if fechas.dt.tz is None:
+        fechas = fechas.dt.tz_localize("UTC")
+    return fechas.dt.tz_convert(colombia)
+
+
+# dt.strftime llama a strftime elemento por elemento (y con pytz es lento):
+# se arma el texto con los componentes enteros y una tabla "00".."99"
+@functools.cache
+def _dos_digitos():
+    import numpy as np
+    return np.array([f"{i:02d}" for i in range(100)], dtype=object)
+
+
+def _componente(valores):
+    return _dos_digitos()[valores.to_numpy()]
+
+
+def dia_semana(fechas):
+    return fechas.dt.weekday.map(dias_semana_3letras)
+
+
+def fecha(fechas):
+    # FORMATO_FECHA
+    import pandas as pd
+    texto = (
+        _componente(fechas.dt.day) + "-"
+        + _componente(fechas.dt.month) + "-"
+        + _componente(fechas.dt.year % 100)
+    )
+    return pd.Series(texto, index=fechas.index, dtype="object")
+
+
+def hora(fechas):
+    # FORMATO_HORA
+    import pandas as pd
+    texto = _componente(fechas.dt.hour) + ":" + _componente(fechas.dt.minute)
+    return pd.Series(texto, index=fechas.index, dtype="object")
+
+
+def fecha_hora(fechas):
+    # FORMATO_FECHA_HORA
+    return fecha(fechas) + " " + hora(fechas)
+
+
+# =========================
+# NÚMEROS
+# =========================
+def numero(valor, decimales=2):
+    return f"{valor:,.{decimales}f}".translate(_SEPARADORES_CO)
+
+
+def numeros(valores, decimales=2):
+    import pandas as pd
+    plantilla = f"{{:,.{decimales}f}}".format
+    return pd.Series(valores, dtype="float64").map(plantilla).str.translate(_SEPARADORES_CO)
+
+
+def cop(valor):
+    return numero(valor, 2)
+
+
+def cop_columna(valores):
+    return numeros(valores, 2)
@@ -1,44 +1,35 @@
 # helpers.py
 
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-import pandas as pd
+import hashlib
+import json
+from datetime import datetime
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
 
-from config import colombia, dias_semana_3letras, sistema_categorial
-from db import coleccion_eventos, coleccion_reflexiones
-from openai_client import openai_client
-
-
-def formatear_delta(rd, incluir_segundos=False):
-    partes = []
-    if rd.years: partes.append(f"{rd.years}a")
-    if rd.months: partes.append(f"{rd.months}m")
-    if rd.days: partes.append(f"{rd.days}d")
-    if rd.hours: partes.append(f"{rd.hours}h")
-    if rd.minutes: partes.append(f"{rd.minutes}m")
-    if incluir_segundos and rd.seconds: partes.append(f"{rd.seconds}s")
-    return " ".join(partes) if partes else "0m"
+from config import EVENTO_A, EVENTO_B, colombia, sistema_categorial, ARCHIVO_BUFFER_ESCRITURAS, ARCHIVO_CLASIFICADOR_LOCAL
+import db
+import formato
+import duracion
+import instantaneas
+import busqueda
+import proyeccion
+from openai_client import obtener_openai
+from reloj import reloj_en_vivo
+from estado import actualizar_estado, estado_actual, estados_actuales
+from instrumentacion import medir_api
+from cache_clasificacion import CacheClasificacion
+from cola_clasificacion import ColaClasificacion, documento_pendiente, PENDIENTE
+from buffer_escrituras import BufferEscrituras
+from clasificador_local import ClasificadorLocal
+from vigilante import Vigilante
 
 
 def minutos_a_tiempo_humano(minutos):
-    ahora = datetime.now(colombia)
-    futuro = ahora + timedelta(minutes=minutos)
-    rd = relativedelta(futuro, ahora)
+    return duracion.humanizar_minutos(minutos)
 
-    partes = []
-    if rd.years: partes.append(f"{rd.years} años")
-    if rd.months: partes.append(f"{rd.months} meses")
-    if rd.days: partes.append(f"{rd.days} días")
-    if rd.hours: partes.append(f"{rd.hours} horas")
-    if rd.minutes: partes.append(f"{rd.minutes} minutos")
 
-    return ", ".join(partes) if partes else "0 minutos"
+MODELO_CLASIFICACION = "gpt-4o-mini"
 
-
-def clasificar_reflexion_openai(texto):
-    prompt = f"""Sistema categorial para clasificar reflexiones:
+PROMPT_CLASIFICACION = """Sistema categorial para clasificar reflexiones:
 
 1.1 Organización del tiempo
 1.2 Relaciones sociales
@@ -57,74 +48,373 @@ def clasificar_reflexion_openai(texto):
 
 Reflexión: \"\"\"{texto}\"\"\"
 """
-    r = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+
+PROMPT_LOTE = """Clasificá cada reflexión numerada con uno de los códigos del sistema.
+Devolvé un elemento en "clasificaciones" por reflexión, con su número en "n" y su código en "codigo".
+
+{sistema}
+{reflexiones}
+"""
+
+# Salida estructurada: el modelo solo puede responder códigos de sistema_categorial
+ESQUEMA_LOTE = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "clasificaciones",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["clasificaciones"],
+            "properties": {
+                "clasificaciones": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["n", "codigo"],
+                        "properties": {
+                            "n": {"type": "integer"},
+                            "codigo": {"type": "string", "enum": list(sistema_categorial)},
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+# Los que vuelven sin código válido se piden de nuevo, solos, hasta este número de veces
+REINTENTOS_LOTE = 2
+TOKENS_POR_CLASIFICACION = 16
+
+# Cambia solo si cambia el prompt, el esquema o el modelo; invalida la caché de clasificaciones
+VERSION_CLASIFICACION = hashlib.sha256(
+    f"{MODELO_CLASIFICACION}\0{PROMPT_CLASIFICACION}\0{PROMPT_LOTE}\0{json.dumps(ESQUEMA_LOTE)}".encode("utf-8")
+).hexdigest()[:12]
+
+
+@st.cache_resource
+def _cache_clasificacion():
+    return CacheClasificacion(db.coleccion_cache_clasificacion, VERSION_CLASIFICACION)
+
+
+@medir_api("openai")
+def _clasificar_lote_remoto(textos, cliente=None):
+    # Una sola solicitud; None en las posiciones sin un código válido
+    sistema = PROMPT_CLASIFICACION.split("Reflexión:")[0].strip()
+    reflexiones = "\n".join(f'{i}: """{t}"""' for i, t in enumerate(textos, 1))
+
+    r = (cliente or obtener_openai()).chat.completions.create(
+        model=MODELO_CLASIFICACION,
+        messages=[{"role": "user", "content": PROMPT_LOTE.format(sistema=sistema, reflexiones=reflexiones)}],
+        response_format=ESQUEMA_LOTE,
         temperature=0,
-        max_tokens=5
+        max_tokens=TOKENS_POR_CLASIFICACION * (len(textos) + 1)
     )
-    return r.choices[0].message.content.strip()
+
+    try:
+        elementos = json.loads(r.choices[0].message.content or "")["clasificaciones"]
+    except (ValueError, KeyError, TypeError):
+        return [None] * len(textos)
+
+    # El esquema no garantiza que estén todos los números, ni una sola vez cada uno
+    codigos = {}
+    for e in elementos if isinstance(elementos, list) else []:
+        if not isinstance(e, dict):
+            continue
+        n, codigo = e.get("n"), e.get("codigo")
+        if isinstance(n, int) and 1 <= n <= len(textos) and codigo in sistema_categorial:
+            codigos.setdefault(n, codigo)
+    return [codigos.get(i) for i in range(1, len(textos) + 1)]
+
+
+def clasificar_lote_remoto(textos, cliente=None, reintentos=REINTENTOS_LOTE):
+    # Todo en una solicitud; solo lo que vuelve inválido se repite
+    resultado = [None] * len(textos)
+    faltan = list(range(len(textos)))
+
+    for _ in range(1 + reintentos):
+        if not faltan:
+            break
+        for i, codigo in zip(faltan, _clasificar_lote_remoto([textos[i] for i in faltan], cliente)):
+            resultado[i] = codigo
+        faltan = [i for i in faltan if resultado[i] is None]
+
+    return resultado
+
+
+def clasificar_lote_openai(textos):
+    # Una sola solicitud para todos los textos que no estén en caché; None si no hubo código
+    cache = _cache_clasificacion()
+    resultado = [cache.obtener(t) for t in textos]
+
+    faltan = [i for i, c in enumerate(resultado) if c is None]
+    if faltan:
+        nuevos = clasificar_lote_remoto([textos[i] for i in faltan])
+        for i, categoria in zip(faltan, nuevos):
+            if categoria is not None:
+                cache.guardar(textos[i], categoria)
+                resultado[i] = categoria
+
+    return resultado
+
+
+def clasificar_reflexion_openai(texto):
+    # Sin código válido es un error: la cola reintenta más tarde en vez de
+    # guardar algo que terminaría como "Sin categoría"
+    categoria = clasificar_lote_openai([texto])[0]
+    if categoria is None:
+        raise ValueError("OpenAI no devolvió un código del sistema categorial")
+    return categoria
+
+
+@st.cache_resource
+def clasificador_local():
+    # None hasta que se entrene con `python entrenar_clasificador.py`
+    return ClasificadorLocal.cargar(ARCHIVO_CLASIFICADOR_LOCAL)
+
+
+@medir_api("clasificador_local")
+def clasificar_reflexion_local(texto):
+    # (código, versión del modelo) si el modelo local está seguro; None para ir a OpenAI
+    modelo = clasificador_local()
+    if modelo is None:
+        return None
+    codigo = modelo.clasificar(texto)
+    return (codigo, modelo.version) if codigo else None
+
+
+@st.cache_resource
+def cola_clasificacion():
+    # Un único trabajador por proceso, compartido por todas las sesiones
+    return ColaClasificacion(
+        db.coleccion_reflexiones, clasificar_reflexion_openai,
+        version=VERSION_CLASIFICACION, local=clasificar_reflexion_local
+    ).iniciar()
+
+
+# =========================
+# ESCRITURAS (SQLITE → MONGO)
+# =========================
+def _al_sincronizar(coleccion, documentos):
+    # Lo que antes seguía a cada insert_one, ahora cuando el documento llega a Mongo
+    if coleccion == db.coleccion_eventos.name:
+        for d in documentos:
+            actualizar_estado(d["evento"], d["_id"], d["fecha_hora"], inicio=d.get("inicio"), referencia=d.get("fin"))
+            _cache_intervalos().pop(d["evento"], None)
+    elif coleccion == db.coleccion_reflexiones.name:
+        cola_clasificacion().avisar()
+        busqueda.avisar(documentos)
+    elif coleccion == db.coleccion_capital_b.name:
+        proyeccion.olvidar_ajuste()
+
+
+def _al_cambiar(coleccion, documento):
+    # Cambios vistos en Mongo, vengan de este proceso o de otro dispositivo
+    if coleccion == db.coleccion_reflexiones.name:
+        if documento is not None:
+            busqueda.avisar([documento])
+        else:
+            busqueda.invalidar()
+    elif coleccion == db.coleccion_capital_b.name:
+        proyeccion.olvidar_ajuste()
+
+
+@st.cache_resource
+def vigilante():
+    return Vigilante(
+        db.db,
+        [db.coleccion_eventos, db.coleccion_reflexiones, db.coleccion_capital_b],
+        db.coleccion_estado,
+        al_cambiar=_al_cambiar
+    ).iniciar()
+
+
+# El vigilante del proceso mantiene estado_actual en memoria: cada sesión solo
+# compara su versión con la del vigilante, sin consultar Mongo. sesion:
+# st.session_state; devuelve True si cambió el inicio de alguna racha
+def refrescar_estados(sesion):
+    vigia = vigilante()
+    version = vigia.version(db.coleccion_estado.name) if vigia.activo() else None
+    if version is not None and sesion.get("version_estados") == version:
+        return False
+
+    eventos_racha = [EVENTO_A, EVENTO_B]
+    estados = vigia.estados() if version is not None else {}
+    faltan = [ev for ev in eventos_racha if ev not in estados and ev not in sesion]
+    if faltan:
+        # Sin documento de estado todavía (o vigilante arrancando): se lee o reconstruye
+        estados.update(estados_actuales(faltan))
+
+    cambiaron = False
+    for ev in eventos_racha:
+        if not estados.get(ev):
+            continue
+        inicio = estados[ev]["inicio_racha"].astimezone(colombia)
+        # Nunca hacia atrás: un registro propio puede estar aún en el buffer local
+        if ev not in sesion or inicio > sesion[ev]:
+            sesion[ev] = inicio
+            cambiaron = True
+
+    sesion["version_estados"] = version
+    return cambiaron
+
+
+@st.cache_resource
+def buffer_escrituras():
+    return BufferEscrituras(
+        ARCHIVO_BUFFER_ESCRITURAS,
+        [db.coleccion_eventos, db.coleccion_reflexiones, db.coleccion_capital_b],
+        al_sincronizar=_al_sincronizar
+    ).iniciar()
 
 
 def guardar_reflexion(fecha, emociones, texto):
-    categoria = clasificar_reflexion_openai(texto)
-    coleccion_reflexiones.insert_one({
+    buffer_escrituras().anotar(db.coleccion_reflexiones, documento_pendiente({
         "fecha_hora": fecha,
         "emociones": [{"emoji": e.split()[0], "nombre": " ".join(e.split()[1:])} for e in emociones],
-        "reflexion": texto.strip(),
-        "categoria_categorial": categoria
-    })
-    return categoria
+        "reflexion": texto.strip()
+    }))
+    return PENDIENTE
 
 
 def registrar_evento(nombre, fecha):
-    coleccion_eventos.insert_one({"evento": nombre, "fecha_hora": fecha})
+    buffer_escrituras().anotar(db.coleccion_eventos, {"evento": nombre, "fecha_hora": fecha})
 
 
-def obtener_registros(nombre):
-    eventos_db = list(coleccion_eventos.find({"evento": nombre}).sort("fecha_hora", -1))
-    filas = []
-
-    for i, e in enumerate(eventos_db):
-        fecha = e["fecha_hora"].astimezone(colombia)
-        anterior = eventos_db[i + 1]["fecha_hora"].astimezone(colombia) if i + 1 < len(eventos_db) else None
-        diff = formatear_delta(relativedelta(fecha, anterior)) if anterior else ""
-
-        filas.append({
-            "Día": dias_semana_3letras[fecha.weekday()],
-            "Fecha": fecha.strftime("%d-%m-%y"),
-            "Hora": fecha.strftime("%H:%M"),
-            "Intervalo": diff
-        })
-
-    df = pd.DataFrame(filas)
-    df.index = range(len(df), 0, -1)
-    df.index.name = "#"
-    return df
+# =========================
+# TABLA DE INTERVALOS (CACHÉ INCREMENTAL)
+# =========================
+@st.cache_resource
+def _cache_intervalos():
+    # nombre -> {"ultima": fecha_hora cruda más reciente, "fechas": Series, "df": DataFrame}
+    return {}
 
 
-def obtener_reflexiones():
-    registros = list(coleccion_reflexiones.find().sort("fecha_hora", -1))
-    filas = []
+def _hora_de_pared(fechas):
+    return fechas.dt.tz_localize(None).to_numpy()
 
-    for r in registros:
-        fecha = r["fecha_hora"].astimezone(colombia)
-        cat_info = sistema_categorial.get(r.get("categoria_categorial", ""), {
-            "categoria": "Sin categoría", "subcategoria": "", "descriptor": "", "observable": ""
-        })
 
-        filas.append({
-            "Fecha": fecha.strftime("%d-%m-%y"),
-            "Hora": fecha.strftime("%H:%M"),
-            "Reflexión": r.get("reflexion", ""),
-            "Categoría": cat_info["categoria"],
-            "Subcategoría": cat_info["subcategoria"],
-            "Descriptor": cat_info.get("descriptor", ""),
-            "Observable": cat_info.get("observable", ""),
-            "Emociones": " ".join([e["emoji"] for e in r.get("emociones", [])])
-        })
+def _intervalos(fechas):
+    # fechas ordenadas de la más reciente a la más antigua
+    import pandas as pd
+    anteriores = fechas.shift(-1)
+    hay = anteriores.notna()
 
-    return pd.DataFrame(filas)
+    intervalo = pd.Series("", index=fechas.index, dtype="object")
+    if hay.any():
+        partes = duracion.partes_arreglo(_hora_de_pared(anteriores[hay]), _hora_de_pared(fechas[hay]))
+        intervalo[hay] = duracion.textos_cortos(partes)
+
+    return intervalo
+
+
+def _fechas_eventos(filtro):
+    return [e["fecha_hora"] for e in db.coleccion_eventos.find(filtro, {"_id": 0, "fecha_hora": 1})]
+
+
+def obtener_registros(nombre):
+    import pandas as pd
+    cache = _cache_intervalos()
+    entrada = cache.get(nombre)
+
+    # Si el vigilante no vio cambios en eventos desde la última lectura, ni se consulta
+    vigia = vigilante()
+    version = vigia.version(db.coleccion_eventos.name) if vigia.activo() else None
+    if entrada and version is not None and entrada["version"] == version:
+        return entrada["df"].copy()
+
+    estado = estado_actual(nombre)
+    conteo = estado["conteo"] if estado else 0
+
+    nuevos = None
+    if entrada:
+        nuevos = _fechas_eventos({"evento": nombre, "fecha_hora": {"$gt": entrada["ultima"]}})
+        if len(entrada["fechas"]) + len(nuevos) != conteo:
+            # Llegó un registro atrasado (p. ej. del buffer de otro dispositivo): se recarga todo
+            entrada = nuevos = None
+    if nuevos is None and estado:
+        # Carga completa: desde la instantánea si cuadra con el conteo
+        fechas = instantaneas.fechas("coleccion_eventos", conteo, evento=nombre)
+        nuevos = fechas.tolist() if fechas is not None else None
+    if nuevos is None:
+        nuevos = _fechas_eventos({"evento": nombre})
+
+    if entrada and not nuevos:
+        entrada["version"] = version
+        return entrada["df"].copy()
+
+    crudas = nuevos + ([entrada["ultima"]] if entrada else [])
+    fechas = formato.a_colombia(nuevos)
+    if entrada:
+        fechas = pd.concat([fechas, entrada["fechas"]], ignore_index=True)
+    fechas = fechas.sort_values(ascending=False, ignore_index=True)
+
+    df = pd.DataFrame({
+        "Día": formato.dia_semana(fechas),
+        "Fecha": formato.fecha(fechas),
+        "Hora": formato.hora(fechas),
+        "Intervalo": _intervalos(fechas)
+    })
+    df.index = range(len(df), 0, -1)
+    df.index.name = "#"
+
+    if crudas:
+        cache[nombre] = {"ultima": max(crudas), "fechas": fechas, "df": df, "version": version}
+    return df.copy()
+
+
+def contar_reflexiones():
+    return db.coleccion_reflexiones.estimated_document_count()
+
+
+def obtener_reflexiones(limite=None, antes_de=None):
+    if limite is None and antes_de is None:
+        # Historial completo: desde la instantánea si está al día
+        registros = instantaneas.documentos("coleccion_reflexiones", contar_reflexiones())
+        if registros is not None:
+            return tabla_reflexiones(registros[::-1])
+
+    # antes_de: (fecha_hora, _id) de la última fila ya cargada
+    filtro = db.anteriores("fecha_hora", antes_de) if antes_de is not None else {}
+    cursor = db.coleccion_reflexiones.find(filtro).sort(db.orden_pagina("fecha_hora"))
+    if limite:
+        cursor = cursor.limit(limite)
+    return tabla_reflexiones(list(cursor))
+
+
+# Una fila por código; se cruza con la columna de códigos en vez de buscar fila a fila
+_CATEGORIAS = {
+    **sistema_categorial,
+    PENDIENTE: {"categoria": "⏳ Clasificando…", "subcategoria": "", "descriptor": "", "observable": ""},
+}
+_SIN_CATEGORIA = {"categoria": "Sin categoría", "subcategoria": "", "descriptor": "", "observable": ""}
+
+
+def tabla_reflexiones(registros):
+    import pandas as pd
+    fechas_hora = [r["fecha_hora"] for r in registros]
+    fechas = formato.a_colombia(fechas_hora)
+
+    categorias = pd.DataFrame.from_dict(_CATEGORIAS, orient="index").reindex(
+        [r.get("categoria_categorial", "") for r in registros]
+    ).reset_index(drop=True)
+    for columna, defecto in _SIN_CATEGORIA.items():
+        categorias[columna] = categorias[columna].fillna(defecto)
+
+    return pd.DataFrame({
+        "Fecha": formato.fecha(fechas),
+        "Hora": formato.hora(fechas),
+        "Reflexión": [r.get("reflexion") or "" for r in registros],
+        "Categoría": categorias["categoria"],
+        "Subcategoría": categorias["subcategoria"],
+        "Descriptor": categorias["descriptor"],
+        "Observable": categorias["observable"],
+        "Emociones": [" ".join(e["emoji"] for e in r.get("emociones") or []) for r in registros],
+        "fecha_hora": fechas_hora,
+        "_id": [r.get("_id") for r in registros],
+    })
 
 
 def mostrar_racha(nombre_evento, emoji):
@@ -140,21 +430,23 @@ def mostrar_racha(nombre_evento, emoji):
 
     st.session_state[estado] = cambiar_estado
 
-    if st.session_state[estado]:
-        st_autorefresh(interval=1000, key=f"refresh_{nombre_evento}")
-
     if nombre_evento not in st.session_state:
         st.metric("Duración", "0 min")
         return
 
     inicio = st.session_state[nombre_evento]
+
+    # Con el cronómetro activo el conteo corre en el navegador, sin reruns
+    if st.session_state[estado]:
+        reloj_en_vivo(inicio, "Duración", "{min} min [COP]")
+        return
+
     ahora = datetime.now(colombia)
 
     delta = ahora - inicio
-    rd = relativedelta(ahora, inicio)
 
     st.metric(
         "Duración",
         f"{int(delta.total_seconds() // 60)} min [COP]",
-        formatear_delta(rd, incluir_segundos=True)
+        duracion.texto_corto(duracion.partes(inicio, ahora), incluir_segundos=True)
     )
@@ -0,0 +1,265 @@
+# instantaneas.py
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import db
+from config import DIRECTORIO_INSTANTANEAS
+from cola_clasificacion import FALLIDA, PENDIENTE, PROCESANDO
+
+LOTE = 5000
+
+# Fechas como las devuelve Mongo: UTC sin zona, con milisegundos
+_FECHA = "timestamp[ms]"
+
+# Tipo NumPy al leer columnas sueltas; lo demás queda como objeto
+_DTYPE = {_FECHA: "datetime64[ms]", "float64": "float64", "int64": "float64"}
+
+# clave en db.COLECCIONES -> (campo de fecha, columnas)
+COLECCIONES = {
+    "coleccion_eventos": ("fecha_hora", {
+        "_id": "string", "evento": "string", "fecha_hora": _FECHA, "inicio": _FECHA, "fin": _FECHA,
+        "duracion_min": "int64", "desde_anterior_min": "int64", "texto": "string",
+    }),
+    "coleccion_reflexiones": ("fecha_hora", {
+        "_id": "string", "fecha_hora": _FECHA, "reflexion": "string", "categoria_categorial": "string",
+        "emociones": "emociones",
+    }),
+    "coleccion_capital_b": ("fecha_registro", {
+        "_id": "string", "fecha_registro": _FECHA, "fecha_futura": _FECHA, "monto": "float64",
+    }),
+}
+
+
+# Una carpeta por colección y una subcarpeta por mes (mes=AAAA-MM) con archivos
+# Arrow IPC sin comprimir, que se leen con memory-map sin copiar. Cada
+# exportación agrega archivos nuevos con lo posterior a la última fecha
+# exportada; manifiesto.json lista los archivos válidos y se reescribe al final,
+# así que una exportación cortada a medias no deja nada visible.
+def _carpeta(clave):
+    return Path(DIRECTORIO_INSTANTANEAS) / db.COLECCIONES[clave]
+
+
+def _tipo(nombre):
+    import pyarrow as pa
+    if nombre == "emociones":
+        return pa.list_(pa.struct([("emoji", pa.string()), ("nombre", pa.string())]))
+    if nombre == _FECHA:
+        return pa.timestamp("ms")
+    return pa.type_for_alias(nombre)
+
+
+def esquema(clave):
+    import pyarrow as pa
+    return pa.schema([(columna, _tipo(tipo)) for columna, tipo in COLECCIONES[clave][1].items()])
+
+
+def manifiesto(clave):
+    ruta = _carpeta(clave) / "manifiesto.json"
+    if not ruta.exists():
+        return None
+    datos = json.loads(ruta.read_text())
+    datos["ultima"] = datos["ultima"] and datetime.fromisoformat(datos["ultima"])
+    return datos
+
+
+def _guardar_manifiesto(clave, datos):
+    ruta = _carpeta(clave) / "manifiesto.json"
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_text(json.dumps({
+        **datos, "ultima": datos["ultima"] and datos["ultima"].isoformat()
+    }, indent=2))
+    os.replace(temporal, ruta)
+
+
+# =========================
+# EXPORTACIÓN
+# =========================
+def _limpiar(documento, columnas):
+    # Registros viejos pueden traer tipos raros: lo que no encaja queda nulo
+    fila = {}
+    for columna, tipo in columnas.items():
+        valor = documento.get(columna)
+        if tipo == _FECHA:
+            valor = valor if isinstance(valor, datetime) else None
+        elif tipo in ("int64", "float64"):
+            valor = valor if isinstance(valor, (int, float)) and not isinstance(valor, bool) else None
+            valor = int(valor) if tipo == "int64" and valor is not None else valor
+        elif tipo == "string":
+            valor = None if valor is None else str(valor)
+        fila[columna] = valor
+    return fila
+
+
+def _hasta(clave):
+    # Solo se exporta lo que ya no va a cambiar (el conteo no detecta ediciones):
+    # lo anterior al mes en curso y, en reflexiones, lo anterior a la más vieja
+    # que la cola todavía puede reescribir. Lo posterior se lee siempre de Mongo.
+    hasta = datetime.now(timezone.utc).replace(tzinfo=None, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if clave == "coleccion_reflexiones":
+        abierta = db.coleccion_reflexiones.find_one(
+            {"clasificacion.estado": {"$in": [PENDIENTE, PROCESANDO, FALLIDA]}}, {"fecha_hora": 1},
+            sort=[("fecha_hora", 1)]
+        )
+        if abierta and abierta["fecha_hora"] < hasta:
+            hasta = abierta["fecha_hora"]
+    return hasta
+
+
+def descartar(clave):
+    # Para los scripts que reescriben documentos ya exportados (reclasificar,
+    # migrar): sin manifiesto se lee de Mongo y la próxima exportación rehace todo
+    (_carpeta(clave) / "manifiesto.json").unlink(missing_ok=True)
+
+
+def exportar(clave, completo=False, lote=LOTE):
+    import pyarrow as pa
+    campo, columnas = COLECCIONES[clave]
+    carpeta = _carpeta(clave)
+    actual = None if completo else manifiesto(clave)
+
+    if actual is None:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        actual = {"ultima": None, "filas": 0, "partes": []}
+    carpeta.mkdir(parents=True, exist_ok=True)
+
+    filtro = {}
+    if actual["ultima"] is not None:
+        filtro[campo] = {"$gt": actual["ultima"]}
+    filtro.setdefault(campo, {})["$lt"] = _hasta(clave)
+
+    cursor = (
+        getattr(db, clave).find(filtro, {c: 1 for c in columnas})
+        .sort(campo, 1)
+        .batch_size(lote)
+    )
+
+    sufijo = int(time.time() * 1000)
+    nuevas, filas, ultima = [], 0, actual["ultima"]
+    mes_abierto, escritor = None, None
+    pendientes = []
+
+    def volcar():
+        if pendientes:
+            escritor.write_table(pa.Table.from_pylist(pendientes, schema=esquema(clave)))
+            pendientes.clear()
+
+    try:
+        for documento in cursor:
+            fecha = documento.get(campo)
+            if not isinstance(fecha, datetime):
+                continue
+
+            # Cursor ordenado por fecha: un solo archivo abierto a la vez
+            mes = f"mes={fecha:%Y-%m}"
+            if mes != mes_abierto:
+                if escritor:
+                    volcar()
+                    escritor.close()
+                (carpeta / mes).mkdir(exist_ok=True)
+                nuevas.append(f"{mes}/parte-{sufijo}.arrow")
+                escritor = pa.ipc.new_file(str(carpeta / nuevas[-1]), esquema(clave))
+                mes_abierto = mes
+
+            pendientes.append(_limpiar(documento, columnas))
+            filas += 1
+            ultima = fecha
+            if len(pendientes) >= lote:
+                volcar()
+
+        if escritor:
+            volcar()
+    finally:
+        if escritor:
+            escritor.close()
+
+    if filas:
+        _guardar_manifiesto(clave, {
+            "ultima": ultima,
+            "filas": actual["filas"] + filas,
+            "partes": actual["partes"] + nuevas,
+            "exportado": datetime.now(timezone.utc).isoformat(),
+        })
+    return filas
+
+
+def exportar_todo(completo=False, lote=LOTE):
+    return {clave: exportar(clave, completo, lote) for clave in COLECCIONES}
+
+
+# =========================
+# LECTURA
+# =========================
+def tabla(clave, columnas=None, **iguales):
+    # Todas las partes con memory-map; None si nunca se exportó
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    datos = manifiesto(clave)
+    if datos is None:
+        return None
+
+    carpeta = _carpeta(clave)
+    partes = [pa.ipc.open_file(pa.memory_map(str(carpeta / p))).read_all() for p in datos["partes"]]
+    resultado = pa.concat_tables(partes) if partes else esquema(clave).empty_table()
+
+    for columna, valor in iguales.items():
+        resultado = resultado.filter(pc.equal(resultado[columna], valor))
+    return resultado.select(columnas) if columnas else resultado
+
+
+def documentos(clave, conteo=None, **iguales):
+    # Instantánea + lo que Mongo tiene después de la última fecha exportada.
+    # None si no hay instantánea o si el total no da `conteo` (registros
+    # atrasados o borrados): en ese caso hay que leer todo de Mongo.
+    datos = manifiesto(clave)
+    if datos is None:
+        return None
+
+    campo, columnas = COLECCIONES[clave]
+    filtro = {**iguales, campo: {"$gt": datos["ultima"]}} if datos["ultima"] else dict(iguales)
+    recientes = [
+        _limpiar(d, columnas) for d in getattr(db, clave).find(filtro, {c: 1 for c in columnas}).sort(campo, 1)
+    ]
+    filas = tabla(clave, **iguales).to_pylist() + recientes
+
+    if conteo is not None and len(filas) != conteo:
+        return None
+    return filas
+
+
+def columnas(clave, campos, conteo=None, **iguales):
+    # Como `documentos`, pero columna por columna: campo -> arreglo NumPy
+    # (fechas como datetime64[ms], números como float64 con NaN si faltan)
+    import numpy as np
+    datos = manifiesto(clave)
+    if datos is None:
+        return None
+
+    campo, tipos = COLECCIONES[clave]
+    filtro = {**iguales, campo: {"$gt": datos["ultima"]}} if datos["ultima"] else dict(iguales)
+    recientes = [
+        _limpiar(d, tipos) for d in getattr(db, clave).find(filtro, {"_id": 0, **{c: 1 for c in campos}}).sort(campo, 1)
+    ]
+    exportadas = tabla(clave, campos, **iguales)
+
+    resultado = {
+        c: np.concatenate([
+            exportadas[c].to_numpy(),
+            np.array([r[c] for r in recientes], dtype=_DTYPE.get(tipos[c], object)),
+        ])
+        for c in campos
+    }
+    if conteo is not None and len(resultado[campos[0]]) != conteo:
+        return None
+    return resultado
+
+
+def fechas(clave, conteo=None, **iguales):
+    # Solo la columna de fecha
+    campo = COLECCIONES[clave][0]
+    resultado = columnas(clave, [campo], conteo, **iguales)
+    return None if resultado is None else resultado[campo]
@@ -0,0 +1,283 @@
+# instrumentacion.py
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+ACTIVA = os.getenv("INSTRUMENTACION", "") not in ("", "0")
+ARCHIVO_JSONL = os.getenv("INSTRUMENTACION_JSONL")
+ARCHIVO_PROMETHEUS = os.getenv("INSTRUMENTACION_PROMETHEUS")
+
+# Mismo comando repetido más veces que esto en un rerun: probable N+1
+UMBRAL_REPETICIONES = 10
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Totales del proceso, para el archivo Prometheus
+_totales = {
+    "reruns": 0,
+    "rerun_segundos": 0.0,
+    "mongo": defaultdict(lambda: [0, 0.0]),
+    "apis": defaultdict(lambda: [0, 0, 0.0]),
+}
+_ultimos = deque(maxlen=50)
+
+
+def _nueva_medida():
+    return {"n": 0, "ms": 0.0, "max_ms": 0.0, "errores": 0}
+
+
+def _sumar(medida, ms, ok=True):
+    medida["n"] += 1
+    medida["ms"] += ms
+    medida["max_ms"] = max(medida["max_ms"], ms)
+    if not ok:
+        medida["errores"] += 1
+
+
+# =========================
+# RERUN
+# =========================
+class Rerun:
+
+    def __init__(self):
+        self.fecha = datetime.now(timezone.utc)
+        self.inicio = time.perf_counter()
+        self.ultima_actividad = self.inicio
+        self.mongo = defaultdict(_nueva_medida)
+        self.apis = defaultdict(_nueva_medida)
+        self.ms = None
+        self.cortado = False
+
+    def registrar_mongo(self, coleccion, operacion, ms, ok):
+        _sumar(self.mongo[(coleccion, operacion)], ms, ok)
+        self.ultima_actividad = time.perf_counter()
+
+    def registrar_api(self, nombre, ms, ok):
+        _sumar(self.apis[nombre], ms, ok)
+        self.ultima_actividad = time.perf_counter()
+
+    def repetidos(self):
+        return [(c, op, m["n"]) for (c, op), m in self.mongo.items() if m["n"] > UMBRAL_REPETICIONES]
+
+    def como_dict(self):
+        return {
+            "fecha": self.fecha.isoformat(),
+            "ms": self.ms,
+            "cortado": self.cortado,
+            "mongo": [{"coleccion": c, "operacion": op, **m} for (c, op), m in self.mongo.items()],
+            "apis": [{"api": nombre, **m} for nombre, m in self.apis.items()],
+        }
+
+
+def rerun_actual():
+    return getattr(_local, "rerun", None)
+
+
+def iniciar_rerun(sesion):
+    # sesion: st.session_state. Un rerun cortado por st.rerun()/st.stop() no llega
+    # a terminar_rerun; se cierra aquí, con la hora de su última actividad.
+    if not ACTIVA:
+        return None
+
+    anterior = sesion.get("_rerun_instrumentado")
+    if anterior is not None and anterior.ms is None:
+        anterior.cortado = True
+        _cerrar(anterior, anterior.ultima_actividad)
+
+    _local.rerun = Rerun()
+    sesion["_rerun_instrumentado"] = _local.rerun
+    return _local.rerun
+
+
+def terminar_rerun():
+    rerun = rerun_actual()
+    if rerun is not None and rerun.ms is None:
+        _cerrar(rerun, time.perf_counter())
+    _local.rerun = None
+
+
+def _cerrar(rerun, fin):
+    rerun.ms = (fin - rerun.inicio) * 1000
+
+    with _lock:
+        _totales["reruns"] += 1
+        _totales["rerun_segundos"] += rerun.ms / 1000
+        _ultimos.append(rerun)
+
+    if ARCHIVO_JSONL:
+        with _lock, open(ARCHIVO_JSONL, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rerun.como_dict(), ensure_ascii=False) + "\n")
+
+    if ARCHIVO_PROMETHEUS:
+        exportar_prometheus(ARCHIVO_PROMETHEUS)
+
+
+def ultimos_reruns():
+    with _lock:
+        return list(_ultimos)
+
+
+# =========================
+# MONGO
+# =========================
+class EscuchaMongo(monitoring.CommandListener):
+
+    def __init__(self):
+        self._pendientes = {}
+
+    def started(self, event):
+        coleccion = event.command.get(event.command_name)
+        if not isinstance(coleccion, str):
+            # getMore lleva el cursor en el nombre del comando y la colección aparte
+            coleccion = event.command.get("collection", event.database_name)
+        self._pendientes[(event.connection_id, event.request_id)] = coleccion
+
+    def succeeded(self, event):
+        self._registrar(event, True)
+
+    def failed(self, event):
+        self._registrar(event, False)
+
+    def _registrar(self, event, ok):
+        coleccion = self._pendientes.pop((event.connection_id, event.request_id), event.database_name)
+        ms = event.duration_micros / 1000
+
+        with _lock:
+            total = _totales["mongo"][(coleccion, event.command_name)]
+            total[0] += 1
+            total[1] += ms / 1000
+
+        rerun = rerun_actual()
+        if rerun is not None:
+            rerun.registrar_mongo(coleccion, event.command_name, ms, ok)
+
+
+def escuchas_mongo():
+    # Para MongoClient(event_listeners=...): vacío si la instrumentación está apagada
+    return [EscuchaMongo()] if ACTIVA else []
+
+
+# =========================
+# APIS EXTERNAS
+# =========================
+def medir_api(nombre):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            if not ACTIVA:
+                return funcion(*args, **kwargs)
+
+            t0 = time.perf_counter()
+            ok = False
+            try:
+                resultado = funcion(*args, **kwargs)
+                ok = True
+                return resultado
+            finally:
+                ms = (time.perf_counter() - t0) * 1000
+                with _lock:
+                    total = _totales["apis"][nombre]
+                    total[0 if ok else 1] += 1
+                    total[2] += ms / 1000
+
+                rerun = rerun_actual()
+                if rerun is not None:
+                    rerun.registrar_api(nombre, ms, ok)
+
+        return envuelta
+    return decorador
+
+
+# =========================
+# EXPORTACIÓN
+# =========================
+def texto_prometheus():
+    with _lock:
+        lineas = [
+            "# TYPE bucle_reruns_total counter",
+            f"bucle_reruns_total {_totales['reruns']}",
+            "# TYPE bucle_rerun_segundos_total counter",
+            f"bucle_rerun_segundos_total {_totales['rerun_segundos']:.6f}",
+            "# TYPE bucle_mongo_comandos_total counter",
+        ]
+        lineas += [
+            f'bucle_mongo_comandos_total{{coleccion="{c}",operacion="{op}"}} {n}'
+            for (c, op), (n, _) in sorted(_totales["mongo"].items())
+        ]
+        lineas.append("# TYPE bucle_mongo_segundos_total counter")
+        lineas += [
+            f'bucle_mongo_segundos_total{{coleccion="{c}",operacion="{op}"}} {s:.6f}'
+            for (c, op), (_, s) in sorted(_totales["mongo"].items())
+        ]
+        lineas.append("# TYPE bucle_api_llamadas_total counter")
+        for nombre, (ok, error, _) in sorted(_totales["apis"].items()):
+            lineas.append(f'bucle_api_llamadas_total{{api="{nombre}",resultado="ok"}} {ok}')
+            lineas.append(f'bucle_api_llamadas_total{{api="{nombre}",resultado="error"}} {error}')
+        lineas.append("# TYPE bucle_api_segundos_total counter")
+        lineas += [
+            f'bucle_api_segundos_total{{api="{nombre}"}} {s:.6f}'
+            for nombre, (_, _, s) in sorted(_totales["apis"].items())
+        ]
+    return "\n".join(lineas) + "\n"
+
+
+def exportar_prometheus(ruta):
+    # Escritura atómica para que el recolector nunca lea un archivo a medias
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(texto_prometheus())
+    os.replace(temporal, ruta)
+
+
+# =========================
+# PANEL
+# =========================
+def panel_debug():
+    import pandas as pd
+    import streamlit as st
+
+    reruns = ultimos_reruns()
+    actual = rerun_actual()
+
+    with st.expander("🐞 Debug", expanded=True):
+        if actual is not None:
+            parcial = (time.perf_counter() - actual.inicio) * 1000
+            st.caption(
+                f"Este rerun: {parcial:.0f} ms hasta aquí · "
+                f"{sum(m['n'] for m in actual.mongo.values())} comandos Mongo"
+            )
+            for coleccion, operacion, n in actual.repetidos():
+                st.warning(f"Posible N+1: {operacion} en {coleccion} × {n}")
+
+        if not reruns:
+            st.caption("Sin reruns completos todavía")
+            return
+
+        st.dataframe(pd.DataFrame([{
+            "fecha": r.fecha.strftime("%H:%M:%S"),
+            "ms": round(r.ms),
+            "cortado": r.cortado,
+            "mongo": sum(m["n"] for m in r.mongo.values()),
+            "mongo ms": round(sum(m["ms"] for m in r.mongo.values()), 1),
+            "apis ms": round(sum(m["ms"] for m in r.apis.values()), 1),
+        } for r in reversed(reruns)]), use_container_width=True)
+
+        ultimo = reruns[-1]
+        filas = [
+            {"origen": f"mongo {c}", "operación": op, **m}
+            for (c, op), m in ultimo.mongo.items()
+        ] + [
+            {"origen": "api", "operación": nombre, **m}
+            for nombre, m in ultimo.apis.items()
+        ]
+        if filas:
+            st.caption("Último rerun completo")
+            st.dataframe(pd.DataFrame(filas).sort_values("ms", ascending=False), use_container_width=True)
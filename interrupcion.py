@@ -2,22 +2,25 @@
 
 import streamlit as st
 from datetime import datetime
-from streamlit_autorefresh import st_autorefresh
 
-from db import coleccion_eventos
+import db
 from config import colombia
+from estado import estado_actual
+from helpers import buffer_escrituras
+from reloj import reloj_en_vivo
 
 
 def guardar_interrupcion(data):
-    coleccion_eventos.insert_one(data)
+    # El estado de "interrupcion" se actualiza cuando el buffer la envía a Mongo
+    buffer_escrituras().anotar(db.coleccion_eventos, data)
 
 
-def mostrar_interrupcion():
+def _estado_interrupcion():
+    # Sin conexión no hay estado que mostrar, pero se puede registrar igual
+    return estado_actual("interrupcion") if db.conexion_saludable() else None
 
-    # =========================
-    # AUTOREFRESH (tiempo en vivo)
-    # =========================
-    st_autorefresh(interval=1000, key="refresh_interrupcion")
+
+def mostrar_interrupcion():
 
     # =========================
     # INIT
@@ -57,23 +60,17 @@ def mostrar_interrupcion():
     # =========================
     # TIEMPO DESDE EL ÚLTIMO
     # =========================
-    ultimo = coleccion_eventos.find_one(
-        {"evento": "interrupcion"},
-        sort=[("fecha_hora", -1)]
-    )
-
-    if paso == 0 and ultimo:
-        try:
-            referencia = ultimo.get("fin") or ultimo.get("fecha_hora")
-            referencia = referencia.astimezone(colombia)
-
-            ahora = datetime.now(colombia)
-            minutos = int((ahora - referencia).total_seconds() // 60)
-
-            st.success(f"{minutos} min desde la última vez")
-
-        except:
-            pass
+    # El conteo corre en el navegador: una sola consulta al entrar
+    if paso == 0:
+        estado = _estado_interrupcion()
+
+        if estado:
+            reloj_en_vivo(
+                estado["inicio_racha"].astimezone(colombia),
+                formato="{min} min desde la última vez",
+                detalle=False,
+                alto=70
+            )
 
     # =========================
     # BLOQUEO SI YA CERRÓ
@@ -154,33 +151,20 @@ def mostrar_interrupcion():
                 pass
 
         # =========================
-        # ANTERIOR REAL
+        # GAP DESDE LA ANTERIOR
         # =========================
-        anterior = None
-        if inicio:
-            anterior = coleccion_eventos.find_one(
-                {
-                    "evento": "interrupcion",
-                    "fecha_hora": {"$lt": inicio}
-                },
-                sort=[("fecha_hora", -1)]
-            )
+        gap_min = st.session_state.get("interrupcion_gap")
+        estado = _estado_interrupcion() if inicio and not st.session_state["interrupcion_guardada"] else None
 
-        # =========================
-        # GAP
-        # =========================
-        gap_min = None
-        if anterior and inicio:
+        if estado:
             try:
-                referencia = anterior.get("fin") or anterior.get("fecha_hora")
-                referencia = referencia.astimezone(colombia)
-
+                referencia = estado["inicio_racha"].astimezone(colombia)
                 gap_min = int((inicio - referencia).total_seconds() // 60)
 
                 if gap_min < 0:
                     gap_min = None
 
-            except:
+            except (TypeError, ValueError):
                 pass
 
         # =========================
@@ -202,6 +186,7 @@ def mostrar_interrupcion():
 
             guardar_interrupcion(data)
             st.session_state["interrupcion_guardada"] = True
+            st.session_state["interrupcion_gap"] = gap_min
 
         # =========================
         # FEEDBACK
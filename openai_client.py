@@ -1,6 +1,23 @@
 # openai_client.py
 
-from openai import OpenAI
 import streamlit as st
 
-openai_client = OpenAI(api_key=st.secrets["openai_api_key"])
+# Una reflexión hace hasta 3 × (REINTENTOS + 1) solicitudes (clasificar_lote_remoto
+# repite las inválidas): todas deben terminar antes de que venza
+# cola_clasificacion.BLOQUEO, o otro hilo tomaría la misma reflexión
+TIMEOUT_SEGUNDOS = 20.0
+REINTENTOS = 1
+
+
+@st.cache_resource
+def obtener_openai():
+    # openai tarda casi un segundo en importarse: solo se paga al clasificar
+    from openai import OpenAI
+
+    # openai_base_url permite apuntar a un servidor compatible (o al falso de benchmarks/)
+    return OpenAI(
+        api_key=st.secrets["openai_api_key"],
+        base_url=st.secrets.get("openai_base_url"),
+        timeout=TIMEOUT_SEGUNDOS,
+        max_retries=REINTENTOS,
+    )
@@ -0,0 +1,139 @@
+# proyeccion.py
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import streamlit as st
+
+import db
+import instantaneas
+
+# La racha suma 1 COP por minuto
+COP_POR_DIA_RACHA = 1440.0
+# El ritmo de ahorro se ajusta sobre los últimos días, no sobre toda la historia
+VENTANA_DIAS = 90
+# Más allá de esto una fecha proyectada no dice nada (y timedelta se desborda)
+HORIZONTE_DIAS = 100 * 365
+MS_POR_DIA = 86_400_000
+
+
+# =========================
+# SERIE DE CAPITAL
+# =========================
+def serie_capital():
+    # (fechas datetime64[ms] UTC, montos float64), ordenadas y sin registros incompletos
+    import numpy as np
+    conteo = db.coleccion_capital_b.estimated_document_count()
+    datos = instantaneas.columnas("coleccion_capital_b", ["fecha_registro", "monto"], conteo)
+    if datos is None:
+        documentos = list(db.coleccion_capital_b.find({}, {"_id": 0, "fecha_registro": 1, "monto": 1}))
+        datos = {
+            "fecha_registro": np.array([d.get("fecha_registro") for d in documentos], dtype="datetime64[ms]"),
+            "monto": np.array([d.get("monto") for d in documentos], dtype="float64"),
+        }
+
+    fechas, montos = datos["fecha_registro"].astype("datetime64[ms]"), datos["monto"].astype("float64")
+    validos = ~np.isnat(fechas) & np.isfinite(montos)
+    fechas, montos = fechas[validos], montos[validos]
+    orden = np.argsort(fechas, kind="stable")
+    return fechas[orden], montos[orden]
+
+
+# =========================
+# AJUSTE
+# =========================
+def ajustar(fechas, montos, ahora, ventana_dias=VENTANA_DIAS):
+    # Recta de mínimos cuadrados monto = intercepto + velocidad · días, sobre los
+    # últimos `ventana_dias` hasta `ahora`. None con menos de dos fechas distintas,
+    # o si el último registro es más viejo que la ventana: ese ritmo ya no dice nada.
+    import numpy as np
+    if len(fechas) < 2:
+        return None
+
+    ahora = np.datetime64(ahora.astimezone(timezone.utc).replace(tzinfo=None), "ms")
+    dias = (fechas - ahora).astype("int64") / MS_POR_DIA
+    if dias[-1] < -ventana_dias:
+        return None
+    en_ventana = dias >= -ventana_dias
+    if np.count_nonzero(en_ventana) < 2:
+        en_ventana = slice(None)
+    x, y = dias[en_ventana], montos[en_ventana]
+
+    dx = x - x.mean()
+    varianza = float(dx @ dx)
+    if varianza == 0:
+        return None
+    velocidad = float(dx @ (y - y.mean())) / varianza
+    intercepto = float(y.mean() - velocidad * x.mean())
+
+    residuos = y - (intercepto + velocidad * x)
+    total = float(((y - y.mean()) ** 2).sum())
+    return {
+        "velocidad": velocidad,
+        "r2": 1 - float(residuos @ residuos) / total if total else 1.0,
+        "registros": int(len(x)),
+        "desde": _a_datetime(fechas[en_ventana][0]),
+        "hasta": _a_datetime(fechas[-1]),
+        # Días desde el último registro hasta `ahora`
+        "dias_sin_registros": float(-dias[-1]),
+    }
+
+
+def _a_datetime(valor):
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=int(valor.astype("int64")))
+
+
+@st.cache_resource
+def _cache_serie():
+    # La serie de capital, no el ajuste: este depende de la hora. La vacían el
+    # buffer al sincronizar y el vigilante al ver cambios, desde sus hilos.
+    return {"serie": None, "lock": threading.Lock()}
+
+
+def ajuste_capital(ahora):
+    cache = _cache_serie()
+    with cache["lock"]:
+        if cache["serie"] is None:
+            cache["serie"] = serie_capital()
+        fechas, montos = cache["serie"]
+    return ajustar(fechas, montos, ahora)
+
+
+def olvidar_ajuste():
+    cache = _cache_serie()
+    with cache["lock"]:
+        cache["serie"] = None
+
+
+# =========================
+# PROYECCIÓN
+# =========================
+def proyectar(ajuste, monto, objetivo, minutos_racha, ahora):
+    # Con el saldo actual como punto de partida y la velocidad del ajuste:
+    #   fecha_objetivo  cuándo se llega al objetivo de YNAB (None si no se llega)
+    #   fecha_cruce     cuándo cambia de signo la diferencia capital − minutos de racha
+    #                   (el atraso se cubre, o la ventaja se agota); None si no cambia
+    velocidad = ajuste["velocidad"] if ajuste else 0.0
+    neto = velocidad - COP_POR_DIA_RACHA
+    diferencia = monto - minutos_racha
+
+    fecha_objetivo = None
+    if objetivo and monto < objetivo and velocidad > 0:
+        fecha_objetivo = _en_dias(ahora, (objetivo - monto) / velocidad)
+
+    fecha_cruce = None
+    if diferencia < 0 < neto or neto < 0 < diferencia:
+        fecha_cruce = _en_dias(ahora, -diferencia / neto)
+
+    return {
+        "velocidad": velocidad,
+        "neto": neto,
+        "diferencia": diferencia,
+        "objetivo_alcanzado": bool(objetivo) and monto >= objetivo,
+        "fecha_objetivo": fecha_objetivo,
+        "fecha_cruce": fecha_cruce,
+    }
+
+
+def _en_dias(ahora, dias):
+    return ahora + timedelta(days=dias) if dias <= HORIZONTE_DIAS else None
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config import sistema_categorial
+from db import coleccion_reflexiones
+from cola_clasificacion import CLASIFICADA, PENDIENTE, PROCESANDO
+from helpers import clasificar_lote_openai, VERSION_CLASIFICACION
+import instantaneas
+
+parser = argparse.ArgumentParser(description="Reclasifica reflexiones en lote.")
+parser.add_argument("--lote", type=int, default=200, help="documentos por lote del cursor")
+parser.add_argument("--por-solicitud", type=int, default=10, help="textos por llamada a OpenAI")
+parser.add_argument("--concurrencia", type=int, default=4, help="llamadas simultáneas")
+parser.add_argument("--solo-invalidas", action="store_true",
+                    help="no reclasificar las que ya tienen un código válido de otra versión del prompt")
+parser.add_argument("--checkpoint", default=".reclasificar_checkpoint.json")
+parser.add_argument("--desde-cero", action="store_true", help="ignorar el checkpoint")
+args = parser.parse_args()
+
+# =========================
+# CHECKPOINT
+# =========================
+ultimo_id = None
+if not args.desde_cero and os.path.exists(args.checkpoint):
+    with open(args.checkpoint) as f:
+        ultimo_id = ObjectId(json.load(f)["ultimo_id"])
+    print(f"↻ Retomando después de {ultimo_id}")
+
+
+def guardar_checkpoint(_id):
+    with open(args.checkpoint, "w") as f:
+        json.dump({"ultimo_id": str(_id), "version": VERSION_CLASIFICACION}, f)
+
+
+# =========================
+# SELECCIÓN
+# =========================
+# Las pendientes las atiende la cola en segundo plano
+criterios = [{"categoria_categorial": {"$nin": list(sistema_categorial)}}]
+if not args.solo_invalidas:
+    criterios.append({"version_clasificacion": {"$ne": VERSION_CLASIFICACION}})
+
+filtro = {
+    "$or": criterios,
+    "clasificacion.estado": {"$nin": [PENDIENTE, PROCESANDO]},
+}
+if ultimo_id:
+    filtro["_id"] = {"$gt": ultimo_id}
+
+cursor = (
+    coleccion_reflexiones.find(filtro, {"reflexion": 1})
+    .sort("_id", 1)
+    .batch_size(args.lote)
+)
+
+# =========================
+# PROCESO
+# =========================
+procesadas = actualizadas = fallidas = 0
+t0 = time.perf_counter()
+
+
+def procesar(lote, pool):
+    grupos = [lote[i:i + args.por_solicitud] for i in range(0, len(lote), args.por_solicitud)]
+    resultados = pool.map(lambda g: clasificar_lote_openai([d.get("reflexion", "") for d in g]), grupos)
+
+    operaciones = []
+    sin_codigo = 0
+    for grupo, codigos in zip(grupos, resultados):
+        for doc, codigo in zip(grupo, codigos):
+            if codigo is None:
+                sin_codigo += 1
+                continue
+            operaciones.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "categoria_categorial": codigo,
+                        "version_clasificacion": VERSION_CLASIFICACION,
+                        "clasificacion.estado": CLASIFICADA,
+                        "clasificacion.origen": "remoto",
+                    },
+                    "$unset": {"clasificacion.proximo_intento": "", "clasificacion.error": ""}
+                }
+            ))
+
+    if operaciones:
+        # Lo ya exportado quedaría con la categoría vieja
+        instantaneas.descartar("coleccion_reflexiones")
+        coleccion_reflexiones.bulk_write(operaciones, ordered=False)
+    return len(operaciones), sin_codigo
+
+
+with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+    lote = []
+    for doc in cursor:
+        lote.append(doc)
+        if len(lote) < args.lote:
+            continue
+
+        ok, ko = procesar(lote, pool)
+        procesadas += len(lote)
+        actualizadas += ok
+        fallidas += ko
+        guardar_checkpoint(lote[-1]["_id"])
+        lote = []
+
+        segundos = time.perf_counter() - t0
+        print(f"… {procesadas} procesadas · {procesadas / segundos:.1f} docs/s")
+
+    if lote:
+        ok, ko = procesar(lote, pool)
+        procesadas += len(lote)
+        actualizadas += ok
+        fallidas += ko
+        guardar_checkpoint(lote[-1]["_id"])
+
+segundos = time.perf_counter() - t0
+print(
+    f"✔ Listo: {procesadas} procesadas, {actualizadas} actualizadas, {fallidas} sin código "
+    f"en {segundos:.1f} s ({procesadas / segundos if segundos else 0:.1f} docs/s)"
+)
+
+# Terminó completo: la próxima corrida vuelve a tomar las que quedaron sin código
+if os.path.exists(args.checkpoint):
+    os.remove(args.checkpoint)
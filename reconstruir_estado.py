@@ -0,0 +1,11 @@
+import time
+
+from estado import reconstruir_todo
+
+t0 = time.perf_counter()
+estados = reconstruir_todo()
+
+for e in estados:
+    print(f"{e['_id']}: {e['conteo']} registros, último {e['ultima']:%d-%m-%y %H:%M}, gap {e['gap_min']} min")
+
+print(f"✔ Listo, estado_actual reconstruido en {time.perf_counter() - t0:.2f} s")
@@ -0,0 +1,59 @@
+# reloj.py
+
+import json
+
+import streamlit.components.v1 as components
+
+# El reloj corre en el navegador a partir de un único instante de inicio:
+# el servidor no vuelve a ejecutar el script ni a consultar Mongo cada segundo.
+PLANTILLA = """
+<div style="font-family: 'Source Sans Pro', sans-serif; color: #fafafa;">
+  <div style="font-size: 0.875rem; opacity: 0.8;">__ETIQUETA__</div>
+  <div id="valor" style="font-size: 2.25rem; line-height: 1.4;"></div>
+  <div id="detalle" style="font-size: 0.875rem; color: #21c354;"></div>
+</div>
+<script>
+const cfg = __CONFIG__;
+
+// Equivalente de relativedelta(fin, inicio) sobre la hora de pared de Colombia
+function partes(inicio, fin) {
+  const a = new Date(inicio + cfg.offset), b = new Date(fin + cfg.offset);
+  const ancla = (m) => {
+    const y = a.getUTCFullYear(), mes = a.getUTCMonth() + m;
+    const dias = new Date(Date.UTC(y, mes + 1, 0)).getUTCDate();
+    return Date.UTC(y, mes, Math.min(a.getUTCDate(), dias),
+                    a.getUTCHours(), a.getUTCMinutes(), a.getUTCSeconds(), a.getUTCMilliseconds());
+  };
+  let meses = (b.getUTCFullYear() - a.getUTCFullYear()) * 12 + b.getUTCMonth() - a.getUTCMonth();
+  let fijo = ancla(meses);
+  if (fijo > b.getTime()) { meses -= 1; fijo = ancla(meses); }
+  const s = Math.floor((b.getTime() - fijo) / 1000);
+  return [[Math.floor(meses / 12), "a"], [meses % 12, "m"], [Math.floor(s / 86400), "d"],
+          [Math.floor(s % 86400 / 3600), "h"], [Math.floor(s % 3600 / 60), "m"], [s % 60, "s"]]
+    .filter(([v]) => v > 0).map(([v, u]) => v + u).join(" ") || "0m";
+}
+
+function pintar() {
+  const ahora = Date.now();
+  const minutos = Math.max(0, Math.floor((ahora - cfg.inicio) / 60000));
+  document.getElementById("valor").textContent = cfg.formato.replace("{min}", minutos);
+  if (cfg.detalle) {
+    document.getElementById("detalle").textContent = "↑ " + partes(cfg.inicio, Math.max(ahora, cfg.inicio));
+  }
+}
+
+pintar();
+setInterval(pintar, 1000);
+</script>
+"""
+
+
+def reloj_en_vivo(inicio, etiqueta="", formato="{min} min", detalle=True, alto=110):
+    config = {
+        "inicio": int(inicio.timestamp() * 1000),
+        "offset": int(inicio.utcoffset().total_seconds() * 1000) if inicio.utcoffset() else 0,
+        "formato": formato,
+        "detalle": detalle,
+    }
+    html = PLANTILLA.replace("__CONFIG__", json.dumps(config)).replace("__ETIQUETA__", etiqueta)
+    components.html(html, height=alto)
@@ -1,12 +1,13 @@
 # servicios.py
 
 from datetime import datetime, timedelta
-import pandas as pd
-import requests
 
 from config import colombia, EVENTO_B
-from db import coleccion_capital_b
+import db
+import formato
+import instantaneas
 from helpers import minutos_a_tiempo_humano
+from ynab_client import obtener_capital
 
 import streamlit as st
 
@@ -19,8 +20,7 @@ def parsear_y_formatear_cop(valor_str):
         return 0.00, "0,00"
 
     valor = int(limpio) / 100
-    formateado = f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return valor, formateado
+    return valor, formato.cop(valor)
 
 
 # =========================
@@ -39,55 +39,35 @@ def obtener_minutos_evento_b():
 # =========================
 # HISTORIAL CAPITAL
 # =========================
-def obtener_historial_capital_b():
-    registros = list(coleccion_capital_b.find().sort("fecha_registro", -1))
+def obtener_historial_capital_b(limite=None, antes_de=None):
+    if limite is None and antes_de is None:
+        registros = instantaneas.documentos("coleccion_capital_b", db.coleccion_capital_b.estimated_document_count())
+        if registros is not None:
+            return tabla_capital_b(registros[::-1])
 
-    filas = []
+    # antes_de: (fecha_registro, _id) de la última fila ya cargada
+    filtro = db.anteriores("fecha_registro", antes_de) if antes_de is not None else {}
+    cursor = db.coleccion_capital_b.find(filtro).sort(db.orden_pagina("fecha_registro"))
+    if limite:
+        cursor = cursor.limit(limite)
+    return tabla_capital_b(list(cursor))
 
-    for r in registros:
-        fecha_reg = r["fecha_registro"].astimezone(colombia)
-        fecha_fut = r["fecha_futura"].astimezone(colombia)
 
-        filas.append({
-            "Actual": fecha_reg.strftime("%d-%m-%y %H:%M"),
-            "Adelantado": fecha_fut.strftime("%d-%m-%y %H:%M"),
-            "COP": f"{r['monto']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        })
+def tabla_capital_b(registros):
+    import pandas as pd
+    fechas_registro = [r["fecha_registro"] for r in registros]
 
-    return pd.DataFrame(filas)
+    return pd.DataFrame({
+        "Actual": formato.fecha_hora(formato.a_colombia(fechas_registro)),
+        "Adelantado": formato.fecha_hora(formato.a_colombia([r["fecha_futura"] for r in registros])),
+        "COP": formato.cop_columna([r["monto"] for r in registros]),
+        "fecha_registro": fechas_registro,
+        "_id": [r.get("_id") for r in registros],
+    })
 
 
 # =========================
 # YNAB API
 # =========================
-YNAB_TOKEN = st.secrets["ynab_token"]
-YNAB_BUDGET_ID = st.secrets["ynab_budget_id"]
-
-headers_ynab = {
-    "Authorization": f"Bearer {YNAB_TOKEN}"
-}
-
-
 def obtener_capital_desde_ynab():
-    url = f"https://api.youneedabudget.com/v1/budgets/{YNAB_BUDGET_ID}/categories"
-
-    r = requests.get(url, headers=headers_ynab)
-
-    if r.status_code != 200:
-        return 0, 0, 0
-
-    data = r.json()
-
-    for grupo in data["data"]["category_groups"]:
-        if grupo["name"] == "Savings":
-
-            for cat in grupo["categories"]:
-                if cat["name"] == "💜 1 min 1 COP 💸":
-
-                    balance = cat["balance"] / 1000
-                    target = (cat.get("goal_target") or 0) / 1000
-                    progress = cat.get("goal_percentage_complete") or 0
-
-                    return balance, target, progress
-
-    return 0, 0, 0
+    return obtener_capital()
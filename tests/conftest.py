@@ -0,0 +1,100 @@
+# tests/conftest.py
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo import monitoring
+
+# Los módulos viven en la raíz del repo (como al correr `streamlit run app.py`)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mongo(monkeypatch, tmp_path):
+    # db con una base mongomock nueva por prueba y sin instantáneas en disco
+    mongomock = pytest.importorskip("mongomock")
+    import db
+    import instantaneas
+
+    db.usar_cliente(mongomock.MongoClient(), "pruebas")
+    monkeypatch.setattr(instantaneas, "DIRECTORIO_INSTANTANEAS", str(tmp_path / "instantaneas"))
+    return db
+
+
+# =========================
+# MONGOD REAL
+# =========================
+# Lo que mongomock no implementa ($setWindowFields, $lookup con let, change
+# streams) se prueba contra un mongod local; sin él, esas pruebas se saltan
+URI_PRUEBAS = os.getenv("MONGO_URI_PRUEBAS", "mongodb://localhost:27017")
+BASE_PRUEBAS = "pruebas_registro_bucle"
+
+
+class ComandosMongo(monitoring.CommandListener):
+    # CommandListener que anota el nombre de cada comando enviado al servidor
+    def __init__(self):
+        self.nombres = []
+
+    def started(self, event):
+        self.nombres.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.fixture(scope="session")
+def servidor_real():
+    # Una sola prueba de conexión por sesión: sin mongod, el skip queda en caché
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    comandos = ComandosMongo()
+    cliente = MongoClient(URI_PRUEBAS, serverSelectionTimeoutMS=500, event_listeners=[comandos])
+    try:
+        hola = cliente.admin.command("hello")
+    except PyMongoError:
+        cliente.close()
+        pytest.skip(f"sin mongod en {URI_PRUEBAS}")
+    yield cliente, hola, comandos
+    cliente.close()
+
+
+def _usar_real(cliente, monkeypatch, tmp_path):
+    import db
+    import instantaneas
+
+    cliente.drop_database(BASE_PRUEBAS)
+    db.usar_cliente(cliente, BASE_PRUEBAS)
+    db.asegurar_indices()
+    monkeypatch.setattr(instantaneas, "DIRECTORIO_INSTANTANEAS", str(tmp_path / "instantaneas"))
+    return db
+
+
+@pytest.fixture
+def mongod(servidor_real, monkeypatch, tmp_path):
+    cliente, _, _ = servidor_real
+    yield _usar_real(cliente, monkeypatch, tmp_path)
+    cliente.drop_database(BASE_PRUEBAS)
+
+
+@pytest.fixture
+def comandos_mongo(mongod, servidor_real):
+    # Nombres de los comandos enviados al mongod real desde que empezó la prueba
+    comandos = servidor_real[2]
+    comandos.nombres.clear()
+    return comandos.nombres
+
+
+@pytest.fixture
+def replica_set(servidor_real, monkeypatch, tmp_path):
+    # Change streams: solo en un replica set (MONGO_URI_PRUEBAS=mongodb://localhost:27017/?replicaSet=rs0)
+    cliente, hola, _ = servidor_real
+    if not hola.get("setName"):
+        pytest.skip(f"{URI_PRUEBAS} no es un replica set")
+    yield _usar_real(cliente, monkeypatch, tmp_path)
+    cliente.drop_database(BASE_PRUEBAS)
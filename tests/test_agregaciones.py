@@ -0,0 +1,86 @@
+# tests/test_agregaciones.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from agregaciones import historial_interrupciones
+
+INICIO = datetime(2026, 1, 1, 12)
+CAMPOS = ["_id", "fecha_hora", "duracion_min", "desde_anterior_min", "conteo_dia", "conteo_semana"]
+
+
+def _interrupcion(horas, duracion=20, **extra):
+    fin = INICIO + timedelta(hours=horas)
+    return {"evento": "interrupcion", "inicio": fin - timedelta(minutes=duracion), "fin": fin, "fecha_hora": fin, **extra}
+
+
+@pytest.fixture
+def interrupciones(mongod):
+    documentos = [
+        _interrupcion(0),
+        _interrupcion(1, texto="x" * 500),
+        # Tres con la misma fecha: el orden (fecha_hora, _id) decide el gap
+        _interrupcion(5), _interrupcion(5, duracion=3), _interrupcion(5, duracion=90),
+        # Sin inicio ni fin: la duración guardada, sin gap
+        {"evento": "interrupcion", "fecha_hora": INICIO + timedelta(hours=8), "duracion_min": 7},
+        # Empieza antes de que termine la anterior: gap negativo, sin gap
+        _interrupcion(8, duracion=600),
+        # Justo un día y justo una semana después
+        _interrupcion(32), _interrupcion(8 + 7 * 24), _interrupcion(300),
+        # Otros eventos no cuentan
+        {"evento": "A", "fecha_hora": INICIO + timedelta(hours=5)},
+    ]
+    mongod.coleccion_eventos.insert_many(documentos)
+    return [d for d in documentos if d["evento"] == "interrupcion"]
+
+
+def _esperado(documentos):
+    # El bucle de Python que reemplazó la agregación, con el mismo orden total
+    orden = sorted(documentos, key=lambda d: (d["fecha_hora"], d["_id"]))
+    filas = []
+    for i, d in enumerate(orden):
+        duracion = d.get("duracion_min")
+        if d.get("inicio") and d.get("fin"):
+            duracion = int((d["fin"] - d["inicio"]).total_seconds() // 60)
+
+        gap = None
+        if i and d.get("inicio"):
+            anterior = orden[i - 1]
+            gap = int((d["inicio"] - (anterior.get("fin") or anterior["fecha_hora"])).total_seconds() // 60)
+            if gap < 0:
+                gap = None
+
+        f = d["fecha_hora"]
+        filas.append({
+            "_id": d["_id"], "fecha_hora": f, "duracion_min": duracion, "desde_anterior_min": gap,
+            "conteo_dia": sum(f - timedelta(days=1) <= o["fecha_hora"] <= f for o in orden),
+            "conteo_semana": sum(f - timedelta(days=7) <= o["fecha_hora"] <= f for o in orden),
+        })
+    return filas[::-1]
+
+
+def _filas(resultado):
+    return [{c: r.get(c) for c in CAMPOS} for r in resultado]
+
+
+def test_coincide_con_el_bucle_de_python(interrupciones):
+    assert _filas(historial_interrupciones()) == _esperado(interrupciones)
+
+
+@pytest.mark.parametrize("tamano", [1, 2, 3, 4, 7])
+def test_las_paginas_coinciden_con_el_historial_completo(interrupciones, tamano):
+    filas, antes_de = [], None
+    while pagina := historial_interrupciones(tamano, antes_de):
+        assert len(pagina) <= tamano
+        filas += pagina
+        antes_de = (pagina[-1]["fecha_hora"], pagina[-1]["_id"])
+
+    assert _filas(filas) == _esperado(interrupciones)
+
+
+def test_vista_previa_del_texto(interrupciones):
+    fila = next(r for r in historial_interrupciones() if r["largo_texto"])
+
+    assert fila["largo_texto"] == 500
+    assert len(fila["texto"]) < 500
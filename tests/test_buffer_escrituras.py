@@ -0,0 +1,64 @@
+# tests/test_buffer_escrituras.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import helpers
+from buffer_escrituras import BufferEscrituras
+from estado import estado_actual, reconstruir_estado
+
+INICIO = datetime(2026, 1, 1, 12)
+
+
+@pytest.fixture
+def buffer(mongo, tmp_path):
+    # Sin hilo: cada prueba llama a sincronizar() a mano
+    return BufferEscrituras(str(tmp_path / "buffer.db"), [mongo.coleccion_eventos], helpers._al_sincronizar)
+
+
+def _anotar(buffer, mongo, horas):
+    for h in horas:
+        buffer.anotar(mongo.coleccion_eventos, {"evento": "interrupcion", "fecha_hora": INICIO + timedelta(hours=h)})
+
+
+def _reenviar(buffer):
+    # Como si se cortara entre el insert y el marcado: todo vuelve como duplicado
+    buffer._conexion.execute("UPDATE escrituras SET sincronizado = NULL")
+    return buffer.sincronizar()
+
+
+def test_reenviar_un_lote_no_cambia_el_estado(buffer, mongo):
+    _anotar(buffer, mongo, [0, 2, 5])
+    assert buffer.sincronizar() == 3
+    antes = estado_actual("interrupcion")
+    assert (antes["conteo"], antes["gap_min"]) == (3, 180)
+
+    assert _reenviar(buffer) == 3
+    assert mongo.coleccion_eventos.count_documents({}) == 3
+    assert estado_actual("interrupcion") == antes
+
+
+def test_un_aviso_fallido_se_aplica_una_sola_vez(buffer, mongo, monkeypatch):
+    _anotar(buffer, mongo, [0, 2])
+
+    def falla(coleccion, documentos):
+        raise ConnectionError("sin red")
+
+    monkeypatch.setattr(buffer, "al_sincronizar", falla)
+    with pytest.raises(ConnectionError):
+        buffer.sincronizar()
+    assert buffer.resumen()["pendientes"] == 2
+
+    monkeypatch.setattr(buffer, "al_sincronizar", helpers._al_sincronizar)
+    assert buffer.sincronizar() == 2
+    assert estado_actual("interrupcion")["conteo"] == 2
+
+
+def test_reenviar_despues_de_reconstruir(buffer, mongo):
+    _anotar(buffer, mongo, [0, 2])
+    buffer.sincronizar()
+    reconstruido = reconstruir_estado("interrupcion")
+
+    _reenviar(buffer)
+    assert estado_actual("interrupcion") == reconstruido
@@ -0,0 +1,86 @@
+# tests/test_busqueda.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import busqueda
+
+INICIO = datetime(2026, 1, 1, 12)
+
+
+@pytest.fixture
+def reflexiones(mongo):
+    coleccion = mongo.coleccion_reflexiones
+    coleccion.insert_many([
+        {"reflexion": texto, "fecha_hora": INICIO + timedelta(days=i)}
+        for i, texto in enumerate(["hoy me sentí ansioso en el trabajo", "una tarde tranquila en el parque"])
+    ])
+    busqueda.invalidar()
+    busqueda._recientes.clear()
+    yield coleccion
+    busqueda.invalidar()
+
+
+def _sin_mongo(monkeypatch, coleccion):
+    def falla(*args, **kwargs):
+        raise AssertionError("indice_al_dia consultó Mongo")
+
+    for metodo in ("find", "find_one", "estimated_document_count", "count_documents"):
+        monkeypatch.setattr(type(coleccion), metodo, falla)
+
+
+def test_las_consultas_no_tocan_mongo(reflexiones, monkeypatch):
+    assert len(busqueda.indice_al_dia()) == 2
+
+    nuevo = {"_id": "nuevo", "reflexion": "ansioso otra vez", "fecha_hora": INICIO + timedelta(days=5)}
+    _sin_mongo(monkeypatch, reflexiones)
+    busqueda.avisar([nuevo])
+
+    indice = busqueda.indice_al_dia()
+    assert len(indice) == 3
+    assert "nuevo" in {r["_id"] for r in indice.buscar("ansioso")}
+
+
+def test_aviso_repetido_sin_cambios_no_reconstruye(reflexiones):
+    indice = busqueda.indice_al_dia()
+    busqueda.avisar(list(reflexiones.find({})))
+
+    assert busqueda.indice_al_dia() is indice
+
+
+def test_un_texto_editado_reconstruye(reflexiones):
+    indice = busqueda.indice_al_dia()
+    documento = reflexiones.find_one({})
+    reflexiones.update_one({"_id": documento["_id"]}, {"$set": {"reflexion": "texto corregido"}})
+    busqueda.avisar([{**documento, "reflexion": "texto corregido"}])
+
+    nuevo = busqueda.indice_al_dia()
+    assert nuevo is not indice
+    assert nuevo.texto(documento["_id"]) == "texto corregido"
+
+
+def test_un_cambio_sin_documento_reconstruye(reflexiones):
+    indice = busqueda.indice_al_dia()
+    reflexiones.delete_one({})
+    busqueda.invalidar()
+
+    assert busqueda.indice_al_dia() is not indice
+    assert len(busqueda.indice_al_dia()) == 1
+
+
+def test_avisos_sin_busquedas_no_se_acumulan(reflexiones, monkeypatch):
+    monkeypatch.setattr(busqueda, "MAX_RECIENTES", 3)
+    indice = busqueda.indice_al_dia()
+
+    nuevos = [{"_id": f"n{i}", "reflexion": f"nueva {i}", "fecha_hora": INICIO} for i in range(4)]
+    reflexiones.insert_many([dict(d) for d in nuevos])
+    busqueda.avisar(nuevos[:3])
+    assert len(busqueda._recientes) == 3
+
+    # Pasado el tope se descartan y el índice se arma de nuevo desde Mongo
+    busqueda.avisar(nuevos[3:])
+    assert len(busqueda._recientes) == 0
+    nuevo = busqueda.indice_al_dia()
+    assert nuevo is not indice
+    assert len(nuevo) == 6
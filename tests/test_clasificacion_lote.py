@@ -0,0 +1,84 @@
+# tests/test_clasificacion_lote.py
+
+import json
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from benchmarks.openai_falso import OpenAIFalso  # noqa: E402
+from config import sistema_categorial  # noqa: E402
+from helpers import ESQUEMA_LOTE, REINTENTOS_LOTE, clasificar_lote_remoto  # noqa: E402
+
+TEXTOS = [f"Reflexión {i}: hoy me sentí {['ansioso', 'tranquilo', 'solo'][i % 3]}" for i in range(12)]
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    falso = OpenAIFalso(semilla=0).iniciar()
+    yield falso
+    falso.detener()
+
+
+@pytest.fixture
+def falso(servidor):
+    servidor.tasa_invalidos = 0.0
+    servidor.reiniciar_contadores()
+    return servidor
+
+
+@pytest.fixture
+def cliente(servidor):
+    return openai.OpenAI(api_key="falso", base_url=servidor.base_url, max_retries=0)
+
+
+def test_el_esquema_es_estricto_y_limita_los_codigos():
+    assert ESQUEMA_LOTE["json_schema"]["strict"] is True
+    item = ESQUEMA_LOTE["json_schema"]["schema"]["properties"]["clasificaciones"]["items"]
+    assert item["properties"]["codigo"]["enum"] == list(sistema_categorial)
+
+
+def test_un_lote_es_una_sola_solicitud(falso, cliente):
+    codigos = clasificar_lote_remoto(TEXTOS, cliente)
+
+    assert falso.solicitudes == 1
+    assert len(codigos) == len(TEXTOS)
+    assert all(c in sistema_categorial for c in codigos)
+
+
+def test_solo_se_repite_lo_invalido(falso, cliente):
+    falso.tasa_invalidos = 0.5
+    codigos = clasificar_lote_remoto(TEXTOS, cliente)
+
+    assert 1 < falso.solicitudes <= 1 + REINTENTOS_LOTE
+    # Un código fuera del sistema nunca llega: queda None
+    assert all(c is None or c in sistema_categorial for c in codigos)
+    assert any(c is not None for c in codigos)
+
+
+def test_sin_codigo_valido_devuelve_none(falso, cliente):
+    falso.tasa_invalidos = 1.0
+    codigos = clasificar_lote_remoto(TEXTOS, cliente)
+
+    assert codigos == [None] * len(TEXTOS)
+    assert falso.solicitudes == 1 + REINTENTOS_LOTE
+
+
+def test_respuesta_que_no_es_json(falso, cliente, monkeypatch):
+    respuesta = falso.responder({"messages": [{"content": '1: """x"""'}]})
+    respuesta["choices"][0]["message"]["content"] = "no es json"
+    monkeypatch.setattr(falso, "responder", lambda cuerpo: respuesta)
+
+    assert clasificar_lote_remoto(TEXTOS[:3], cliente, reintentos=0) == [None, None, None]
+
+
+def test_numeros_repetidos_o_fuera_de_rango(falso, cliente, monkeypatch):
+    codigo = next(iter(sistema_categorial))
+    otro = list(sistema_categorial)[1]
+    respuesta = falso.responder({"messages": [{"content": '1: """x"""'}]})
+    respuesta["choices"][0]["message"]["content"] = json.dumps({"clasificaciones": [
+        {"n": 1, "codigo": codigo}, {"n": 1, "codigo": otro}, {"n": 9, "codigo": codigo}, {"n": "2", "codigo": codigo},
+    ]})
+    monkeypatch.setattr(falso, "responder", lambda cuerpo: respuesta)
+
+    assert clasificar_lote_remoto(TEXTOS[:2], cliente, reintentos=0) == [codigo, None]
@@ -0,0 +1,141 @@
+# tests/test_cola_clasificacion.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import cola_clasificacion
+import openai_client
+from cola_clasificacion import (
+    CLASIFICADA, ESPERA_BASE, FALLIDA, MAX_INTENTOS, PENDIENTE, PROCESANDO,
+    ColaClasificacion, documento_pendiente
+)
+
+
+class ClasificadorFalso:
+    # Falla las primeras `fallos` llamadas y después responde `codigo`
+    def __init__(self, codigo="1.1", fallos=0):
+        self.codigo = codigo
+        self.fallos = fallos
+        self.textos = []
+
+    def __call__(self, texto):
+        self.textos.append(texto)
+        if len(self.textos) <= self.fallos:
+            raise ConnectionError("sin red")
+        return self.codigo
+
+
+@pytest.fixture
+def reflexiones(mongo):
+    return mongo.coleccion_reflexiones
+
+
+def _pendiente(reflexiones, texto="hoy"):
+    return reflexiones.insert_one(documento_pendiente({"reflexion": texto})).inserted_id
+
+
+def _vencer(reflexiones, _id):
+    # Adelanta el reloj de la cola: el reintento ya está listo
+    reflexiones.update_one({"_id": _id}, {"$set": {"clasificacion.proximo_intento": datetime.now(timezone.utc)}})
+
+
+def test_pendiente_a_clasificada(reflexiones):
+    _id = _pendiente(reflexiones)
+    clasificador = ClasificadorFalso("2.3")
+
+    assert ColaClasificacion(reflexiones, clasificador, version="v1").drenar() == 1
+
+    doc = reflexiones.find_one({"_id": _id})
+    assert doc["categoria_categorial"] == "2.3"
+    assert doc["version_clasificacion"] == "v1"
+    assert doc["clasificacion"] == {"estado": CLASIFICADA, "intentos": 0, "origen": "remoto"}
+    assert clasificador.textos == ["hoy"]
+
+
+def test_el_clasificador_local_evita_el_remoto(reflexiones):
+    _id = _pendiente(reflexiones)
+    clasificador = ClasificadorFalso()
+
+    ColaClasificacion(reflexiones, clasificador, local=lambda texto: ("3.1", "local-1")).drenar()
+
+    doc = reflexiones.find_one({"_id": _id})
+    assert (doc["categoria_categorial"], doc["clasificacion"]["origen"]) == ("3.1", "local")
+    assert clasificador.textos == []
+
+
+def test_un_fallo_reintenta_con_espera_creciente(reflexiones):
+    _id = _pendiente(reflexiones)
+    cola = ColaClasificacion(reflexiones, ClasificadorFalso("1.4", fallos=2))
+
+    esperas = []
+    for intento in (1, 2):
+        antes = datetime.now(timezone.utc)
+        assert cola.drenar() == 1
+        # Hasta que pase la espera no se vuelve a tomar
+        assert cola.drenar() == 0
+
+        clasificacion = reflexiones.find_one({"_id": _id})["clasificacion"]
+        assert (clasificacion["estado"], clasificacion["intentos"]) == (PENDIENTE, intento)
+        assert "sin red" in clasificacion["error"]
+        esperas.append(clasificacion["proximo_intento"].replace(tzinfo=timezone.utc) - antes)
+        _vencer(reflexiones, _id)
+
+    base = ESPERA_BASE.total_seconds()
+    assert [e.total_seconds() for e in esperas] == pytest.approx([base, 2 * base], abs=1)
+
+    assert cola.drenar() == 1
+    doc = reflexiones.find_one({"_id": _id})
+    assert doc["categoria_categorial"] == "1.4"
+    assert "error" not in doc["clasificacion"] and "proximo_intento" not in doc["clasificacion"]
+
+
+def test_agotados_los_intentos_queda_fallida(reflexiones):
+    _id = _pendiente(reflexiones)
+    cola = ColaClasificacion(reflexiones, ClasificadorFalso(fallos=MAX_INTENTOS))
+
+    for _ in range(MAX_INTENTOS):
+        assert cola.drenar() == 1
+        _vencer(reflexiones, _id)
+
+    doc = reflexiones.find_one({"_id": _id})
+    assert doc["clasificacion"]["estado"] == FALLIDA
+    assert doc["categoria_categorial"] == FALLIDA
+    assert cola.drenar() == 0
+
+
+def test_un_bloqueo_vencido_se_retoma(reflexiones):
+    # Un hilo que murió a mitad de una clasificación
+    vencido = datetime.now(timezone.utc) - timedelta(seconds=1)
+    _id = reflexiones.insert_one({
+        "reflexion": "hoy", "categoria_categorial": PENDIENTE,
+        "clasificacion": {"estado": PROCESANDO, "intentos": 0, "bloqueado_hasta": vencido},
+    }).inserted_id
+
+    assert ColaClasificacion(reflexiones, ClasificadorFalso()).drenar() == 1
+    assert reflexiones.find_one({"_id": _id})["clasificacion"]["estado"] == CLASIFICADA
+
+
+# =========================
+# TIEMPO LÍMITE DE OPENAI
+# =========================
+def test_una_clasificacion_remota_termina_antes_del_bloqueo():
+    openai = pytest.importorskip("openai")
+    from helpers import REINTENTOS_LOTE
+
+    solicitudes = (1 + REINTENTOS_LOTE) * (1 + openai_client.REINTENTOS)
+    esperas = (1 + REINTENTOS_LOTE) * openai_client.REINTENTOS * openai._constants.MAX_RETRY_DELAY
+    peor_caso = timedelta(seconds=solicitudes * openai_client.TIMEOUT_SEGUNDOS + esperas)
+
+    assert peor_caso < cola_clasificacion.BLOQUEO
+
+
+def test_el_cliente_usa_el_tiempo_limite(monkeypatch):
+    pytest.importorskip("openai")
+    monkeypatch.setattr(openai_client.st, "secrets", {"openai_api_key": "falsa"})
+    openai_client.obtener_openai.clear()
+    try:
+        cliente = openai_client.obtener_openai()
+        assert (cliente.timeout, cliente.max_retries) == (openai_client.TIMEOUT_SEGUNDOS, openai_client.REINTENTOS)
+    finally:
+        openai_client.obtener_openai.clear()
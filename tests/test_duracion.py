@@ -0,0 +1,82 @@
+# tests/test_duracion.py
+
+import calendar
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from duracion import humanizar_minutos, partes, partes_arreglo, texto_corto, textos_cortos
+
+CASOS = 2000
+
+
+# =========================
+# CASOS AL AZAR
+# =========================
+def _casos(semilla, cuantos=CASOS):
+    # Pares (inicio, fin) con sesgo hacia fines de mes, febreros bisiestos,
+    # medianoche y duraciones negativas
+    rng = random.Random(semilla)
+    for i in range(cuantos):
+        if i % 2:
+            anio, mes = rng.randint(1990, 2040), rng.randint(1, 12)
+            inicio = datetime(
+                anio, mes, min(rng.choice([1, 15, 28, 29, 30, 31]), calendar.monthrange(anio, mes)[1]),
+                rng.choice([0, 12, 23]), rng.randint(0, 59), rng.randint(0, 59), rng.choice([0, 999_000]),
+            )
+        else:
+            inicio = datetime(2000, 1, 1) + timedelta(seconds=rng.randint(0, 40 * 365 * 86400))
+
+        escala = rng.choice([60, 86400, 30 * 86400, 20 * 365 * 86400])
+        fin = inicio + timedelta(seconds=rng.randint(-escala, escala), microseconds=rng.choice([0, 500_000]))
+        yield inicio, fin
+
+
+def _esperado(inicio, fin):
+    rd = relativedelta(fin, inicio)
+    return rd.years, rd.months, rd.days, rd.hours, rd.minutes, rd.seconds
+
+
+# =========================
+# IGUAL A relativedelta
+# =========================
+@pytest.mark.parametrize("semilla", range(5))
+def test_partes_igual_a_relativedelta(semilla):
+    for inicio, fin in _casos(semilla):
+        assert partes(inicio, fin) == _esperado(inicio, fin), (inicio, fin)
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_partes_arreglo_igual_a_partes(semilla):
+    inicios, fines = zip(*_casos(semilla))
+    esperados = [_esperado(i, f) for i, f in zip(inicios, fines)]
+
+    vectorizado = list(zip(*(a.tolist() for a in partes_arreglo(list(inicios), list(fines)))))
+    assert vectorizado == esperados
+
+    textos = textos_cortos(partes_arreglo(list(inicios), list(fines)), incluir_segundos=True).tolist()
+    assert textos == [texto_corto(e, incluir_segundos=True) for e in esperados]
+
+
+@pytest.mark.parametrize("inicio, fin, esperado", [
+    (datetime(2024, 1, 31), datetime(2024, 2, 29), (0, 1, 0, 0, 0, 0)),
+    (datetime(2024, 1, 31), datetime(2024, 3, 1), (0, 1, 1, 0, 0, 0)),
+    (datetime(2024, 2, 29), datetime(2025, 2, 28), (1, 0, 0, 0, 0, 0)),
+    (datetime(2024, 3, 31, 23, 59, 59), datetime(2024, 4, 30), (0, 0, 29, 0, 0, 1)),
+    (datetime(2024, 3, 1), datetime(2024, 1, 31), (0, -1, -1, 0, 0, 0)),
+])
+def test_fines_de_mes(inicio, fin, esperado):
+    assert _esperado(inicio, fin) == esperado
+    assert partes(inicio, fin) == esperado
+
+
+# =========================
+# TEXTO
+# =========================
+def test_humanizar_minutos_cuenta_desde_la_referencia():
+    referencia = datetime(2024, 2, 1)
+    assert humanizar_minutos(0, referencia) == "0 minutos"
+    assert humanizar_minutos(28 * 1440 + 61, referencia) == "28 días, 1 horas, 1 minutos"
+    assert humanizar_minutos(29 * 1440, referencia) == "1 meses"
@@ -0,0 +1,61 @@
+# tests/test_instantaneas.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import instantaneas  # noqa: E402
+from cola_clasificacion import CLASIFICADA, FALLIDA, PENDIENTE  # noqa: E402
+
+# Mongo devuelve UTC sin zona
+MES = datetime.now(timezone.utc).replace(tzinfo=None, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _reflexion(dias, estado=CLASIFICADA, texto="hola"):
+    return {
+        "reflexion": texto, "fecha_hora": MES + timedelta(days=dias), "categoria_categorial": "1.1",
+        "clasificacion": {"estado": estado},
+    }
+
+
+def _exportadas(clave):
+    datos = instantaneas.manifiesto(clave)
+    return datos and datos["filas"]
+
+
+def test_el_mes_en_curso_no_se_exporta(mongo):
+    mongo.coleccion_capital_b.insert_many([
+        {"fecha_registro": MES + timedelta(days=d), "monto": 1000.0 * i} for i, d in enumerate([-40, -3, 0, 2])
+    ])
+    instantaneas.exportar("coleccion_capital_b")
+
+    assert _exportadas("coleccion_capital_b") == 2
+    datos = instantaneas.columnas("coleccion_capital_b", ["monto"], conteo=4)
+    assert datos["monto"].tolist() == [0.0, 1000.0, 2000.0, 3000.0]
+
+
+@pytest.mark.parametrize("estado", [PENDIENTE, FALLIDA])
+def test_reflexiones_que_aun_pueden_cambiar_no_se_exportan(mongo, estado):
+    mongo.coleccion_reflexiones.insert_many([_reflexion(-50), _reflexion(-40, estado), _reflexion(-30)])
+    instantaneas.exportar("coleccion_reflexiones")
+    assert _exportadas("coleccion_reflexiones") == 1
+
+    # Ya clasificada: la siguiente exportación sigue desde ahí
+    mongo.coleccion_reflexiones.update_many({}, {"$set": {"clasificacion.estado": CLASIFICADA}})
+    instantaneas.exportar("coleccion_reflexiones")
+    assert _exportadas("coleccion_reflexiones") == 3
+
+
+def test_descartar_vuelve_a_leer_de_mongo(mongo):
+    mongo.coleccion_reflexiones.insert_many([_reflexion(-50), _reflexion(-40)])
+    instantaneas.exportar("coleccion_reflexiones")
+
+    # Un script reescribe algo ya exportado: el conteo no cambia
+    mongo.coleccion_reflexiones.update_many({}, {"$set": {"reflexion": "editada"}})
+    instantaneas.descartar("coleccion_reflexiones")
+
+    assert instantaneas.documentos("coleccion_reflexiones", conteo=2) is None
+    instantaneas.exportar("coleccion_reflexiones")
+    assert [d["reflexion"] for d in instantaneas.documentos("coleccion_reflexiones", conteo=2)] == ["editada"] * 2
@@ -0,0 +1,44 @@
+# tests/test_paginacion.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import obtener_reflexiones
+from servicios import obtener_historial_capital_b
+
+INICIO = datetime(2026, 1, 1, 12)
+
+
+def _todas(cargar, campo, tamano):
+    # Como boton_cargar_mas: cada página sigue a la (fecha, _id) de la última fila
+    filas, antes_de = [], None
+    while True:
+        pagina = cargar(tamano, antes_de).to_dict("records")
+        filas += pagina
+        if len(pagina) < tamano:
+            return filas
+        antes_de = (pagina[-1][campo], pagina[-1]["_id"])
+
+
+@pytest.mark.parametrize("tamano", [1, 2, 3, 10])
+def test_reflexiones_con_la_misma_fecha_no_se_pierden_ni_repiten(mongo, tamano):
+    # Tres a la misma hora (un lote sincronizado del buffer) y dos antes
+    fechas = [INICIO] * 3 + [INICIO - timedelta(hours=1), INICIO - timedelta(days=1)]
+    ids = mongo.coleccion_reflexiones.insert_many(
+        [{"reflexion": f"r{i}", "fecha_hora": f} for i, f in enumerate(fechas)]
+    ).inserted_ids
+
+    filas = _todas(obtener_reflexiones, "fecha_hora", tamano)
+
+    assert [f["_id"] for f in filas] == sorted(ids[:3], reverse=True) + ids[3:]
+
+
+def test_capital_pagina_por_fecha_y_id(mongo):
+    ids = mongo.coleccion_capital_b.insert_many([
+        {"fecha_registro": INICIO, "fecha_futura": INICIO, "monto": float(i)} for i in range(4)
+    ]).inserted_ids
+
+    filas = _todas(obtener_historial_capital_b, "fecha_registro", 3)
+
+    assert [f["_id"] for f in filas] == ids[::-1]
@@ -0,0 +1,186 @@
+# tests/test_proyeccion.py
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import proyeccion
+from proyeccion import COP_POR_DIA_RACHA, HORIZONTE_DIAS, MS_POR_DIA, VENTANA_DIAS, ajustar, proyectar
+
+AHORA = datetime(2026, 6, 1, tzinfo=timezone.utc)
+# Día 0 de las series sintéticas
+INICIO = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _ajuste(velocidad):
+    return {"velocidad": velocidad, "r2": 1.0, "registros": 2, "desde": AHORA, "hasta": AHORA}
+
+
+def _serie(velocidad, dias, ruido=0.0, semilla=0):
+    rng = np.random.default_rng(semilla)
+    dias = np.asarray(dias, dtype="float64")
+    fechas = np.datetime64("2026-01-01T00:00", "ms") + (dias * MS_POR_DIA).astype("int64").astype("timedelta64[ms]")
+    return fechas, 1_000_000 + velocidad * dias + rng.normal(0, ruido, size=len(dias))
+
+
+def _dia(d):
+    return INICIO + timedelta(days=d)
+
+
+# =========================
+# AJUSTE
+# =========================
+def test_ajuste_recupera_la_velocidad():
+    ajuste = ajustar(*_serie(2500, np.linspace(0, 300, 400), ruido=5000), _dia(300))
+
+    assert ajuste["velocidad"] == pytest.approx(2500, rel=0.05)
+    assert ajuste["r2"] > 0.9
+
+
+def test_ajuste_solo_mira_la_ventana():
+    # Antes ahorraba 10 000/día; en los últimos 90 días, 1 000/día
+    fechas, montos = _serie(10_000, np.arange(0, 200))
+    montos[110:] = montos[110] + 1000 * np.arange(0, 90)
+    ajuste = ajustar(fechas, montos, _dia(199), ventana_dias=80)
+
+    assert ajuste["velocidad"] == pytest.approx(1000)
+
+
+def test_la_ventana_termina_ahora_y_no_en_el_ultimo_registro():
+    fechas, montos = _serie(10_000, np.arange(0, 200))
+    montos[110:] = montos[110] + 1000 * np.arange(0, 90)
+
+    # Contada desde el último registro (día 199) entraría parte del ritmo viejo
+    ajuste = ajustar(fechas, montos, _dia(230), ventana_dias=100)
+    assert ajuste["velocidad"] == pytest.approx(1000)
+    assert ajuste["desde"] == _dia(130)
+    assert ajuste["hasta"] == _dia(199)
+    assert ajuste["dias_sin_registros"] == pytest.approx(31)
+
+
+def test_sin_registros_en_la_ventana_no_hay_ajuste():
+    fechas, montos = _serie(1000, np.arange(0, 200))
+
+    assert ajustar(fechas, montos, _dia(199 + VENTANA_DIAS)) is not None
+    assert ajustar(fechas, montos, _dia(199 + VENTANA_DIAS + 1)) is None
+
+
+def test_sin_dos_fechas_distintas_no_hay_ajuste():
+    assert ajustar(*_serie(1000, [5]), _dia(5)) is None
+    assert ajustar(*_serie(1000, [5, 5, 5]), _dia(5)) is None
+
+
+# =========================
+# CRUCE CAPITAL − RACHA
+# =========================
+def test_el_atraso_se_cubre():
+    # Faltan 100 000 COP y se ganan 1 000/día netos sobre la racha
+    p = proyectar(_ajuste(COP_POR_DIA_RACHA + 1000), 400_000, None, 500_000, AHORA)
+
+    assert p["diferencia"] == -100_000
+    assert p["neto"] == pytest.approx(1000)
+    assert p["fecha_cruce"] == AHORA + timedelta(days=100)
+
+
+def test_la_ventaja_se_agota():
+    # Sobran 50 000 COP y la racha crece 500/día más rápido que el capital
+    p = proyectar(_ajuste(COP_POR_DIA_RACHA - 500), 550_000, None, 500_000, AHORA)
+
+    assert p["diferencia"] == 50_000
+    assert p["fecha_cruce"] == AHORA + timedelta(days=100)
+
+
+@pytest.mark.parametrize("velocidad, monto", [
+    (COP_POR_DIA_RACHA - 500, 400_000),     # atrás y perdiendo terreno
+    (COP_POR_DIA_RACHA + 500, 600_000),     # adelante y ganando terreno
+    (COP_POR_DIA_RACHA, 400_000),           # al mismo ritmo que la racha
+])
+def test_sin_cambio_de_signo_no_hay_cruce(velocidad, monto):
+    assert proyectar(_ajuste(velocidad), monto, None, 500_000, AHORA)["fecha_cruce"] is None
+
+
+# =========================
+# OBJETIVO
+# =========================
+def test_fecha_del_objetivo():
+    p = proyectar(_ajuste(2000), 1_000_000, 1_200_000, 0, AHORA)
+
+    assert p["fecha_objetivo"] == AHORA + timedelta(days=100)
+    assert not p["objetivo_alcanzado"]
+
+
+@pytest.mark.parametrize("ajuste", [_ajuste(0.0), _ajuste(-300.0), None])
+def test_objetivo_inalcanzable(ajuste):
+    p = proyectar(ajuste, 1_000_000, 1_200_000, 0, AHORA)
+
+    assert p["fecha_objetivo"] is None
+    assert not p["objetivo_alcanzado"]
+
+
+def test_objetivo_ya_alcanzado():
+    p = proyectar(_ajuste(2000), 1_500_000, 1_200_000, 0, AHORA)
+
+    assert p["objetivo_alcanzado"]
+    assert p["fecha_objetivo"] is None
+
+
+def test_objetivo_mas_alla_del_horizonte():
+    faltan = 1_000_000
+    velocidad = faltan / (HORIZONTE_DIAS + 1)
+    p = proyectar(_ajuste(velocidad), 0, faltan, 0, AHORA)
+
+    assert p["fecha_objetivo"] is None
+    assert proyectar(_ajuste(faltan / HORIZONTE_DIAS), 0, faltan, 0, AHORA)["fecha_objetivo"] is not None
+
+
+def test_cruce_mas_alla_del_horizonte():
+    neto = 1.0
+    p = proyectar(_ajuste(COP_POR_DIA_RACHA + neto), 0, None, HORIZONTE_DIAS + 10, AHORA)
+
+    assert p["diferencia"] < 0 < p["neto"]
+    assert p["fecha_cruce"] is None
+
+
+# =========================
+# CACHÉ DEL PROCESO
+# =========================
+def test_olvidar_ajuste_relee_la_serie(mongo):
+    proyeccion.olvidar_ajuste()
+    mongo.coleccion_capital_b.insert_many([
+        {"fecha_registro": (_dia(d)).replace(tzinfo=None), "monto": 1000.0 * d} for d in range(10)
+    ])
+    assert proyeccion.ajuste_capital(_dia(10))["registros"] == 10
+
+    mongo.coleccion_capital_b.insert_one({"fecha_registro": _dia(10).replace(tzinfo=None), "monto": 10_000.0})
+    assert proyeccion.ajuste_capital(_dia(10))["registros"] == 10
+    proyeccion.olvidar_ajuste()
+    assert proyeccion.ajuste_capital(_dia(10))["registros"] == 11
+
+
+def test_olvidar_desde_otros_hilos(mongo):
+    # El buffer y el vigilante vacían la caché mientras las sesiones la leen
+    proyeccion.olvidar_ajuste()
+    mongo.coleccion_capital_b.insert_many([
+        {"fecha_registro": (_dia(d)).replace(tzinfo=None), "monto": 1000.0 * d} for d in range(10)
+    ])
+    errores = []
+
+    def leer():
+        try:
+            for _ in range(100):
+                assert proyeccion.ajuste_capital(_dia(10))["registros"] == 10
+        except Exception as e:
+            errores.append(e)
+
+    def olvidar():
+        for _ in range(100):
+            proyeccion.olvidar_ajuste()
+
+    hilos = [threading.Thread(target=f) for f in (leer, leer, olvidar, olvidar)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
@@ -0,0 +1,110 @@
+# tests/test_reloj.py
+
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytz
+
+import helpers
+import reloj
+from config import EVENTO_A, EVENTO_B, REFRESCO_SESIONES_SEGUNDOS
+from estado import actualizar_estado
+from vigilante import Vigilante
+
+# Reruns del fragmento vigilar_estados en un minuto con el reloj abierto
+TICKS_POR_MINUTO = int(60 / REFRESCO_SESIONES_SEGUNDOS)
+
+
+def _renderizar(monkeypatch, *args, **kwargs):
+    llamadas = []
+    monkeypatch.setattr(reloj.components, "html", lambda html, height: llamadas.append((html, height)))
+    reloj.reloj_en_vivo(*args, **kwargs)
+    assert len(llamadas) == 1
+    html, alto = llamadas[0]
+    config = json.loads(re.search(r"const cfg = (\{.*\});", html).group(1))
+    return html, alto, config
+
+
+def test_el_navegador_recibe_solo_el_instante_de_inicio(monkeypatch):
+    inicio = pytz.timezone("America/Bogota").localize(datetime(2026, 3, 1, 8, 30))
+    html, alto, config = _renderizar(monkeypatch, inicio, etiqueta="⏱️ Racha", formato="{min} min", alto=90)
+
+    assert config["inicio"] == int(datetime(2026, 3, 1, 13, 30, tzinfo=timezone.utc).timestamp() * 1000)
+    # El desglose se calcula sobre la hora de pared de Colombia
+    assert config["offset"] == -5 * 3600 * 1000
+    assert config["formato"] == "{min} min"
+    assert config["detalle"] is True
+    assert "⏱️ Racha" in html and "__ETIQUETA__" not in html
+    assert alto == 90
+
+
+def test_inicio_en_utc_no_desplaza(monkeypatch):
+    _, _, config = _renderizar(monkeypatch, datetime(2026, 3, 1, tzinfo=timezone.utc), detalle=False)
+
+    assert config["offset"] == 0
+    assert config["detalle"] is False
+
+
+# =========================
+# CONSULTAS CON EL RELOJ CORRIENDO
+# =========================
+OPERACIONES = [
+    "find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "find_one_and_update",
+]
+
+
+@pytest.fixture
+def consultas_mongomock(mongo, monkeypatch):
+    # mongomock no tiene CommandListener: se anotan las llamadas a la colección
+    nombres = []
+    clase = type(mongo.coleccion_eventos)
+    for operacion in OPERACIONES:
+        original = getattr(clase, operacion)
+
+        def anotada(self, *args, _original=original, _operacion=operacion, **kwargs):
+            nombres.append(_operacion)
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(clase, operacion, anotada)
+    return nombres
+
+
+def _registrar(db, evento, fecha):
+    _id = db.coleccion_eventos.insert_one({"evento": evento, "fecha_hora": fecha}).inserted_id
+    actualizar_estado(evento, _id, fecha)
+
+
+@pytest.mark.parametrize("consultas", ["consultas_mongomock", "comandos_mongo"])
+def test_un_minuto_de_reloj_no_consulta_mongo(request, monkeypatch, consultas):
+    consultas = request.getfixturevalue(consultas)
+    db = helpers.db
+    for evento in (EVENTO_A, EVENTO_B):
+        _registrar(db, evento, datetime(2026, 3, 1, 13, 30))
+
+    # Sin hilo: el sondeo del vigilante (uno por proceso) se llama a mano
+    vigia = Vigilante(db.db, [db.coleccion_eventos], db.coleccion_estado, cambios=False)
+    vigia._sondear()
+    monkeypatch.setattr(helpers, "vigilante", lambda: vigia)
+    monkeypatch.setattr(reloj.components, "html", lambda html, height: None)
+
+    # Primer render de la pantalla con el cronómetro activo
+    sesion = {}
+    helpers.refrescar_estados(sesion)
+    reloj.reloj_en_vivo(sesion[EVENTO_A], "Duración", "{min} min [COP]")
+
+    consultas.clear()
+    cambios = [helpers.refrescar_estados(sesion) for _ in range(TICKS_POR_MINUTO)]
+    assert not any(cambios)
+    assert consultas == []
+
+    # Otro dispositivo registra: lo ve el vigilante, y la sesión sigue sin consultar
+    _registrar(db, EVENTO_A, datetime(2026, 3, 1, 14, 0))
+    vigia._sondear()
+    antes = sesion[EVENTO_A]
+    consultas.clear()
+    assert helpers.refrescar_estados(sesion)
+    assert sesion[EVENTO_A] - antes == timedelta(minutes=30)
+    assert consultas == []
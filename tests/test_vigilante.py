@@ -0,0 +1,293 @@
+# tests/test_vigilante.py
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import busqueda
+import helpers
+import proyeccion
+import vigilante
+from estado import actualizar_estado
+from vigilante import Vigilante
+
+INICIO = datetime(2026, 1, 1, 12)
+
+
+def _esperar(condicion, segundos=5):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class _Standalone:
+    # Base de un servidor sin replica set: watch falla como en Mongo real
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+# =========================
+# CHANGE STREAMS (GUIONADOS)
+# =========================
+class _Flujo:
+    # Devuelve `cambios` uno por uno (None: lote vacío) y después lanza `error`
+    def __init__(self, cambios, error):
+        self.cambios = list(cambios)
+        self.error = error
+        self.alive = True
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.alive = False
+
+    def try_next(self):
+        if not self.cambios:
+            raise self.error
+        cambio = self.cambios.pop(0)
+        if cambio is not None:
+            self.resume_token = {"_data": cambio["_id"]}
+        return cambio
+
+
+class _BaseGuionada:
+    # watch() entrega los flujos en orden; agotados, responde como un standalone
+    def __init__(self, *flujos):
+        self.flujos = list(flujos)
+        self.aperturas = []
+
+    def watch(self, pipeline, **kwargs):
+        self.aperturas.append(kwargs)
+        if not self.flujos:
+            _Standalone().watch()
+        return self.flujos.pop(0)
+
+
+def _cambio(token, operacion, coleccion, _id, documento=None):
+    cambio = {"_id": token, "operationType": operacion, "ns": {"coll": coleccion}, "documentKey": {"_id": _id}}
+    if documento is not None:
+        cambio["fullDocument"] = documento
+    return cambio
+
+
+@pytest.fixture
+def avisos(mongo, monkeypatch):
+    # Lo que helpers._al_cambiar dispara en búsqueda y proyección
+    avisos = []
+    monkeypatch.setattr(busqueda, "avisar", lambda documentos: avisos.append(("avisar", documentos)))
+    monkeypatch.setattr(busqueda, "invalidar", lambda: avisos.append(("invalidar",)))
+    monkeypatch.setattr(proyeccion, "olvidar_ajuste", lambda: avisos.append(("olvidar_ajuste",)))
+    monkeypatch.setattr(vigilante, "ESPERA_BASE", 0.01)
+    monkeypatch.setattr(vigilante, "SONDEO_SEGUNDOS", 0.01)
+    return avisos
+
+
+def _vigilar(mongo, base):
+    return Vigilante(
+        base, [mongo.coleccion_eventos, mongo.coleccion_reflexiones, mongo.coleccion_capital_b],
+        mongo.coleccion_estado, al_cambiar=helpers._al_cambiar
+    )
+
+
+def test_cambios_llegan_a_la_cache_y_luego_cae_a_sondeo(mongo, avisos):
+    mongo.coleccion_estado.insert_one({"_id": "a", "conteo": 1})
+    reflexion = {"_id": "r1", "reflexion": "hoy"}
+    base = _BaseGuionada(_Flujo([
+        _cambio("t1", "insert", "eventos", "e1", {"_id": "e1", "evento": "a"}),
+        None,
+        _cambio("t2", "update", "estado_actual", "a", {"_id": "a", "conteo": 2}),
+        _cambio("t3", "insert", "reflexiones", "r1", reflexion),
+        _cambio("t4", "delete", "reflexiones", "r0"),
+        _cambio("t5", "insert", "capitalizacion_b", "c1", {"_id": "c1", "monto": 1.0}),
+    ], OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)))
+
+    vigia = _vigilar(mongo, base)
+    with pytest.raises(OperationFailure):
+        vigia._escuchar()
+
+    # Al abrir el flujo se relee todo (+1 en cada versión); después, un cambio por documento
+    assert vigia.modo == "cambios"
+    assert {c: vigia.version(c) for c in ["eventos", "reflexiones", "capitalizacion_b", "estado_actual"]} == {
+        "eventos": 2, "reflexiones": 3, "capitalizacion_b": 2, "estado_actual": 2,
+    }
+    assert vigia.estados() == {"a": {"_id": "a", "conteo": 2}}
+    assert avisos == [
+        ("invalidar",), ("olvidar_ajuste",),
+        ("avisar", [reflexion]), ("invalidar",), ("olvidar_ajuste",),
+    ]
+
+    # El hilo reabre desde el último token; el servidor ya no da change streams
+    vigia.iniciar()
+    try:
+        assert _esperar(lambda: vigia.modo == "sondeo")
+    finally:
+        vigia.detener()
+    assert [a["resume_after"] for a in base.aperturas] == [None, {"_data": "t5"}]
+
+
+def test_un_corte_retoma_desde_el_token(mongo, avisos):
+    base = _BaseGuionada(
+        _Flujo([_cambio("t1", "insert", "eventos", "e1", {"_id": "e1"})], OperationFailure("corte", code=6)),
+        _Flujo([_cambio("t2", "insert", "eventos", "e2", {"_id": "e2"})], NotImplementedError()),
+    )
+
+    vigia = _vigilar(mongo, base).iniciar()
+    try:
+        assert _esperar(lambda: vigia.modo == "sondeo")
+    finally:
+        vigia.detener()
+
+    # Con token no se relee todo: solo los dos cambios sobre la lectura inicial
+    assert [a["resume_after"] for a in base.aperturas] == [None, {"_data": "t1"}]
+    assert vigia.version("eventos") == 3
+    assert vigia.version("reflexiones") == 1
+
+
+def test_invalidate_relee_todo(mongo, avisos):
+    base = _BaseGuionada(
+        _Flujo([_cambio("t1", "invalidate", "eventos", None)], AssertionError("no debe seguir leyendo")),
+        _Flujo([], NotImplementedError()),
+    )
+
+    vigia = _vigilar(mongo, base).iniciar()
+    try:
+        assert _esperar(lambda: vigia.modo == "sondeo")
+    finally:
+        vigia.detener()
+
+    assert [a["resume_after"] for a in base.aperturas] == [None, None]
+    assert vigia.version("eventos") == 2
+    assert avisos.count(("invalidar",)) == 2
+
+
+# =========================
+# SONDEO
+# =========================
+def test_sin_change_streams_cae_a_sondeo(mongo, monkeypatch):
+    monkeypatch.setattr(vigilante, "SONDEO_SEGUNDOS", 0.01)
+    vistos = []
+    vigia = Vigilante(
+        _Standalone(), [mongo.coleccion_eventos], mongo.coleccion_estado,
+        al_cambiar=lambda coleccion, documento: vistos.append(coleccion)
+    ).iniciar()
+    try:
+        assert _esperar(lambda: vigia.activo())
+        assert vigia.modo == "sondeo"
+
+        version = vigia.version("eventos")
+        mongo.coleccion_eventos.insert_one({"evento": "a", "fecha_hora": INICIO})
+        mongo.coleccion_estado.update_one({"_id": "a"}, {"$set": {"conteo": 1}}, upsert=True)
+
+        assert _esperar(lambda: vigia.version("eventos") > version)
+        assert _esperar(lambda: vigia.estados().get("a", {}).get("conteo") == 1)
+        assert "eventos" in vistos
+    finally:
+        vigia.detener()
+
+
+def test_sondeo_ve_altas_y_bajas(mongo):
+    vigia = Vigilante(mongo.db, [mongo.coleccion_eventos], mongo.coleccion_estado, cambios=False)
+    vigia._sondear()
+    version = vigia.version("eventos")
+
+    _id = mongo.coleccion_eventos.insert_one({"evento": "a", "fecha_hora": INICIO}).inserted_id
+    vigia._sondear()
+    assert vigia.version("eventos") == version + 1
+
+    # Las ediciones no cambian la firma (conteo, último _id): el sondeo no las ve
+    mongo.coleccion_eventos.update_one({"_id": _id}, {"$set": {"texto": "x"}})
+    vigia._sondear()
+    assert vigia.version("eventos") == version + 1
+
+    mongo.coleccion_eventos.delete_one({"_id": _id})
+    vigia._sondear()
+    assert vigia.version("eventos") == version + 2
+
+
+# =========================
+# obtener_registros
+# =========================
+@pytest.fixture
+def vigia(mongo, monkeypatch):
+    vigia = Vigilante(mongo.db, [mongo.coleccion_eventos], mongo.coleccion_estado, cambios=False)
+    monkeypatch.setattr(helpers, "vigilante", lambda: vigia)
+    helpers._cache_intervalos().clear()
+    yield vigia
+    helpers._cache_intervalos().clear()
+
+
+def _registrar(mongo, dias):
+    # Como el buffer: el insert y luego estado_actual
+    documentos = [{"evento": "a", "fecha_hora": INICIO + timedelta(days=d)} for d in dias]
+    mongo.coleccion_eventos.insert_many(documentos)
+    for d in documentos:
+        actualizar_estado("a", d["_id"], d["fecha_hora"])
+
+
+def test_sin_cambios_no_se_consulta_mongo(vigia, mongo):
+    vigia._sondear()
+    _registrar(mongo, [0, 1, 2])
+    assert len(helpers.obtener_registros("a")) == 3
+
+    # Escrito por fuera del vigilante: hasta que lo vea, se sirve la caché
+    _registrar(mongo, [3])
+    assert len(helpers.obtener_registros("a")) == 3
+
+    vigia._sondear()
+    assert len(helpers.obtener_registros("a")) == 4
+
+
+def test_sin_vigilante_activo_siempre_se_consulta(vigia, mongo):
+    _registrar(mongo, [0, 1])
+    assert len(helpers.obtener_registros("a")) == 2
+
+    _registrar(mongo, [2])
+    assert not vigia.activo()
+    assert len(helpers.obtener_registros("a")) == 3
+
+
+def test_un_registro_atrasado_recarga_todo(vigia, mongo):
+    vigia._sondear()
+    _registrar(mongo, [0, 1, 2])
+    assert len(helpers.obtener_registros("a")) == 3
+
+    # Llega del buffer de otro dispositivo con una fecha anterior a la última
+    _registrar(mongo, [-1])
+    vigia._sondear()
+    df = helpers.obtener_registros("a")
+
+    assert len(df) == 4
+    assert helpers._cache_intervalos()["a"]["df"].equals(df)
+    assert df["Intervalo"].iloc[-2] != ""
+
+
+# =========================
+# REPLICA SET REAL
+# =========================
+def test_replica_set_usa_change_streams(replica_set):
+    vistos = []
+    vigia = Vigilante(
+        replica_set.db, [replica_set.coleccion_eventos, replica_set.coleccion_reflexiones],
+        replica_set.coleccion_estado, al_cambiar=lambda coleccion, documento: vistos.append((coleccion, documento))
+    ).iniciar()
+    try:
+        assert _esperar(lambda: vigia.modo == "cambios", segundos=15)
+        version = vigia.version("eventos")
+
+        replica_set.coleccion_eventos.insert_one({"evento": "a", "fecha_hora": INICIO})
+        replica_set.coleccion_estado.update_one({"_id": "a"}, {"$set": {"conteo": 1}}, upsert=True)
+        _id = replica_set.coleccion_reflexiones.insert_one({"reflexion": "hoy", "fecha_hora": INICIO}).inserted_id
+
+        assert _esperar(lambda: vigia.version("eventos") > version, segundos=15)
+        assert _esperar(lambda: vigia.estados().get("a", {}).get("conteo") == 1, segundos=15)
+        assert _esperar(lambda: any(d and d.get("_id") == _id for c, d in vistos if c == "reflexiones"), segundos=15)
+        assert vigia.modo == "cambios"
+    finally:
+        vigia.detener()
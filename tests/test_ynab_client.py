@@ -0,0 +1,178 @@
+# tests/test_ynab_client.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import ynab_client  # noqa: E402
+from ynab_client import CATEGORIA_CAPITAL, GRUPO_CAPITAL  # noqa: E402
+
+
+@pytest.fixture
+def ynab(monkeypatch):
+    ynab_client._estado.clear()
+    reloj = {"ahora": 1000.0}
+    llamadas = []
+    monkeypatch.setattr(ynab_client, "time", SimpleNamespace(monotonic=lambda: reloj["ahora"]))
+    monkeypatch.setattr(ynab_client, "_config", lambda: {"ttl_segundos": 60})
+    yield reloj, llamadas
+    ynab_client._estado.clear()
+
+
+def _falla(llamadas):
+    def sincronizar(estado):
+        llamadas.append("falla")
+        raise requests.ConnectionError("sin red")
+    return sincronizar
+
+
+def test_un_fallo_espera_antes_de_reintentar(ynab, monkeypatch):
+    reloj, llamadas = ynab
+    monkeypatch.setattr(ynab_client, "_sincronizar", _falla(llamadas))
+
+    assert ynab_client.obtener_capital() == (0, 0, 0)
+    assert ynab_client.obtener_capital() == (0, 0, 0)
+    assert len(llamadas) == 1
+
+    # La espera se duplica con cada fallo seguido
+    reloj["ahora"] += ynab_client.ESPERA_MIN
+    ynab_client.obtener_capital()
+    assert len(llamadas) == 2
+    reloj["ahora"] += ynab_client.ESPERA_MIN
+    ynab_client.obtener_capital()
+    assert len(llamadas) == 2
+
+
+def test_sin_red_se_sirve_el_ultimo_valor(ynab, monkeypatch):
+    reloj, llamadas = ynab
+
+    def sincronizar(estado):
+        llamadas.append("ok")
+        estado["id_capital"] = "c"
+        estado["categorias"]["c"] = {"balance": 250_000, "goal_target": 1_000_000, "goal_percentage_complete": 25}
+
+    monkeypatch.setattr(ynab_client, "_sincronizar", sincronizar)
+    assert ynab_client.obtener_capital() == (250, 1000, 25)
+
+    monkeypatch.setattr(ynab_client, "_sincronizar", _falla(llamadas))
+    reloj["ahora"] += 61
+    assert ynab_client.obtener_capital() == (250, 1000, 25)
+    assert ynab_client.obtener_capital() == (250, 1000, 25)
+    assert llamadas == ["ok", "falla"]
+
+
+# =========================
+# CONTRA UN SERVIDOR HTTP LOCAL
+# =========================
+class _YnabLocal(BaseHTTPRequestHandler):
+    # Responde, en orden, los `data` de server.respuestas y anota cada solicitud
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.solicitudes.append({
+            "ruta": url.path,
+            "params": {k: v[0] for k, v in parse_qs(url.query).items()},
+            "token": self.headers.get("Authorization"),
+        })
+        cuerpo = json.dumps({"data": self.server.respuestas.pop(0)}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(ynab, monkeypatch):
+    reloj, _ = ynab
+    http = ThreadingHTTPServer(("127.0.0.1", 0), _YnabLocal)
+    http.respuestas, http.solicitudes = [], []
+    threading.Thread(target=http.serve_forever, args=(0.01,), daemon=True).start()
+
+    monkeypatch.setattr(ynab_client, "_config", lambda: {
+        "token": "secreto", "budget_id": "b1", "ttl_segundos": 60,
+        "base_url": f"http://127.0.0.1:{http.server_port}/v1",
+    })
+    ynab_client._sesion.clear()
+    yield http, reloj
+    http.shutdown()
+    http.server_close()
+    ynab_client._sesion.clear()
+
+
+def _categoria(id, grupo, balance=0, nombre=CATEGORIA_CAPITAL, **extra):
+    return {"id": id, "category_group_id": grupo, "name": nombre, "balance": balance * 1000,
+            "goal_target": 1_000_000 * 1000, "goal_percentage_complete": balance // 10_000, **extra}
+
+
+def _grupo(id, nombre, *categorias, **extra):
+    return {"id": id, "name": nombre, "categories": list(categorias), **extra}
+
+
+def _respuesta(conocimiento, *grupos):
+    return {"server_knowledge": conocimiento, "category_groups": list(grupos)}
+
+
+def _refrescar(servidor, respuesta):
+    http, reloj = servidor
+    http.respuestas.append(respuesta)
+    reloj["ahora"] += 61
+    return ynab_client.obtener_capital()
+
+
+@pytest.fixture
+def sincronizado(servidor):
+    # Primera carga completa: la categoría con el nombre en otro grupo no cuenta
+    capital = _refrescar(servidor, _respuesta(
+        10,
+        _grupo("g1", GRUPO_CAPITAL, _categoria("c1", "g1", 250_000), _categoria("c2", "g1", 5, nombre="Viajes")),
+        _grupo("g2", "Otros", _categoria("c3", "g2", 999_000)),
+    ))
+    assert capital == (250_000, 1_000_000, 25)
+    return servidor
+
+
+def test_la_primera_carga_es_completa(sincronizado):
+    http, _ = sincronizado
+    assert http.solicitudes == [{"ruta": "/v1/budgets/b1/categories", "params": {}, "token": "Bearer secreto"}]
+    assert set(ynab_client._estado()["categorias"]) == {"c1", "c2", "c3"}
+
+
+def test_un_delta_se_fusiona_con_lo_conocido(sincronizado):
+    http, _ = sincronizado
+    capital = _refrescar(sincronizado, _respuesta(11, _grupo("g1", GRUPO_CAPITAL, _categoria("c1", "g1", 300_000))))
+
+    assert capital == (300_000, 1_000_000, 30)
+    assert http.solicitudes[-1]["params"] == {"last_knowledge_of_server": "10"}
+    estado = ynab_client._estado()
+    assert set(estado["categorias"]) == {"c1", "c2", "c3"}
+    assert estado["server_knowledge"] == 11
+
+
+@pytest.mark.parametrize("delta", [
+    _grupo("g1", GRUPO_CAPITAL, _categoria("c1", "g1", 250_000, nombre="Renombrada")),
+    _grupo("g1", GRUPO_CAPITAL, _categoria("c1", "g1", 250_000, deleted=True)),
+    _grupo("g2", "Otros", _categoria("c1", "g2", 250_000)),
+    _grupo("g1", "Ahorros"),
+    _grupo("g1", GRUPO_CAPITAL, deleted=True),
+], ids=["renombrada", "borrada", "movida", "grupo renombrado", "grupo borrado"])
+def test_la_categoria_deja_de_ser_el_capital(sincronizado, delta):
+    assert _refrescar(sincronizado, _respuesta(11, delta)) == (0, 0, 0)
+    assert ynab_client._estado()["id_capital"] is None
+
+
+def test_otra_categoria_toma_su_lugar(sincronizado):
+    capital = _refrescar(sincronizado, _respuesta(
+        11, _grupo("g1", GRUPO_CAPITAL, _categoria("c1", "g1", deleted=True), _categoria("c4", "g1", 400_000))
+    ))
+
+    assert capital == (400_000, 1_000_000, 40)
+    assert ynab_client._estado()["id_capital"] == "c4"
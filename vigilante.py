@@ -0,0 +1,218 @@
+# vigilante.py
+
+import threading
+import time
+
+from pymongo.errors import OperationFailure
+
+ESPERA_BASE = 1.0
+ESPERA_MAX = 60.0
+SONDEO_SEGUNDOS = 5
+# Cuánto espera el servidor por cambios antes de devolver un lote vacío (y poder mirar _parar)
+ESPERA_CAMBIOS_MS = 1000
+
+# Servidor standalone: no hay change streams ($changeStream solo en replica sets)
+SIN_CHANGE_STREAMS = {40573}
+# El token ya salió del oplog: hay que empezar de nuevo y releer todo
+HISTORIA_PERDIDA = {286}
+
+
+# Un hilo por proceso escucha los change streams de la base y lleva, en
+# memoria, una versión por colección y los documentos de estado_actual. Las
+# sesiones comparan versiones en lugar de consultar Mongo: cuando algo cambió
+# (otro dispositivo registró un evento) releen de esta caché. En un servidor
+# sin replica set cae a sondear cada SONDEO_SEGUNDOS, una vez por proceso.
+# al_cambiar(coleccion, documento) recibe el documento completo si lo hay, y
+# None si solo se sabe que algo cambió (sondeo, borrados, releer todo).
+class Vigilante:
+
+    def __init__(self, base, colecciones, estado, al_cambiar=None, cambios=True):
+        self.base = base
+        self.colecciones = {c.name: c for c in colecciones}
+        self.coleccion_estado = estado
+        self.al_cambiar = al_cambiar
+        # "cambios" o "sondeo"; None hasta la primera lectura correcta
+        self.modo = None if cambios else "sondeo"
+        self._versiones = {nombre: 0 for nombre in [*self.colecciones, estado.name]}
+        self._estados = None
+        self._firmas = {}
+        self._token = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="vigilante", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+
+    # =========================
+    # LECTURA (LO QUE USAN LAS SESIONES)
+    # =========================
+    def activo(self):
+        return self._estados is not None
+
+    def version(self, coleccion):
+        return self._versiones[coleccion]
+
+    def estados(self):
+        # evento -> documento de estado_actual
+        with self._lock:
+            if self._estados is None:
+                self._estados = {d["_id"]: d for d in self.coleccion_estado.find({})}
+            return dict(self._estados)
+
+    # =========================
+    # BUCLE
+    # =========================
+    def _bucle(self):
+        espera = ESPERA_BASE
+        while not self._parar.is_set():
+            try:
+                if self.modo == "sondeo":
+                    self._sondear()
+                    self._parar.wait(SONDEO_SEGUNDOS)
+                else:
+                    self._escuchar()
+                espera = ESPERA_BASE
+            except (OperationFailure, NotImplementedError) as e:
+                codigo = getattr(e, "code", None)
+                if isinstance(e, NotImplementedError) or codigo in SIN_CHANGE_STREAMS:
+                    self.modo = "sondeo"
+                    continue
+                if codigo in HISTORIA_PERDIDA:
+                    self._token = None
+                    continue
+                self._parar.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX)
+            except Exception:
+                # Sin red: lo que pase mientras tanto se recupera con el token (o releyendo todo)
+                self._parar.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX)
+
+    def _escuchar(self):
+        nombres = list(self._versiones)
+        with self.base.watch(
+            [{"$match": {"ns.coll": {"$in": nombres}}}],
+            full_document="updateLookup",
+            resume_after=self._token,
+            max_await_time_ms=ESPERA_CAMBIOS_MS,
+        ) as flujo:
+            if self._token is None:
+                # Lo anterior a abrir el flujo no llega como cambio
+                self._refrescar()
+            self.modo = "cambios"
+
+            while flujo.alive and not self._parar.is_set():
+                cambio = flujo.try_next()
+                self._token = flujo.resume_token
+                if cambio is None:
+                    continue
+
+                if cambio["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+                    self._token = None
+                    return
+                borrado = cambio["operationType"] == "delete"
+                self._cambio(cambio["ns"]["coll"], cambio.get("fullDocument"), cambio["documentKey"]["_id"], borrado)
+
+    def _sondear(self):
+        # Conteo y último _id: detecta inserciones y borrados, no ediciones
+        for nombre, coleccion in self.colecciones.items():
+            ultimo = coleccion.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            firma = (coleccion.estimated_document_count(), ultimo and ultimo["_id"])
+            if nombre in self._firmas and firma != self._firmas[nombre]:
+                self._cambio(nombre, None, None)
+            self._firmas[nombre] = firma
+
+        # estado_actual son pocos documentos chicos: se comparan enteros
+        estados = {d["_id"]: d for d in self.coleccion_estado.find({})}
+        with self._lock:
+            if self._estados is not None and estados != self._estados:
+                self._versiones[self.coleccion_estado.name] += 1
+            self._estados = estados
+
+    def _refrescar(self):
+        estados = {d["_id"]: d for d in self.coleccion_estado.find({})}
+        with self._lock:
+            self._estados = estados
+            for nombre in self._versiones:
+                self._versiones[nombre] += 1
+
+        # Sin documento: quien dependa de al_cambiar también tiene que releer
+        if self.al_cambiar:
+            for nombre in self.colecciones:
+                self.al_cambiar(nombre, None)
+
+    def _cambio(self, nombre, documento, _id, borrado=False):
+        with self._lock:
+            self._versiones[nombre] = self._versiones.get(nombre, 0) + 1
+            if nombre == self.coleccion_estado.name and self._estados is not None:
+                if borrado:
+                    self._estados.pop(_id, None)
+                elif documento is not None:
+                    self._estados[_id] = documento
+
+        if self.al_cambiar and nombre in self.colecciones:
+            self.al_cambiar(nombre, documento)
+
+
+# =========================
+# VERIFICACIÓN CONTRA UN MONGO REAL
+# =========================
+def _verificar(uri, cambios, espera=15):
+    # Sobre una base descartable: inserta y espera ver el cambio en la caché
+    from pymongo import MongoClient
+
+    cliente = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    base = cliente["vigilante_check"]
+    cliente.drop_database(base.name)
+    eventos, estado = base["eventos"], base["estado_actual"]
+    vistos = []
+
+    vigilante = Vigilante(base, [eventos], estado, al_cambiar=lambda c, d: vistos.append(d), cambios=cambios)
+    vigilante.iniciar()
+    try:
+        limite = time.monotonic() + espera
+        while not vigilante.activo() and time.monotonic() < limite:
+            time.sleep(0.05)
+        print(f"modo: {vigilante.modo}")
+
+        version = vigilante.version("eventos")
+        t0 = time.perf_counter()
+        eventos.insert_one({"evento": "prueba", "fecha_hora": time.time()})
+        estado.update_one({"_id": "prueba"}, {"$set": {"conteo": 1}}, upsert=True)
+
+        while time.monotonic() < limite:
+            if vigilante.version("eventos") > version and vigilante.estados().get("prueba", {}).get("conteo") == 1:
+                print(f"✔ cambio visto en {(time.perf_counter() - t0) * 1000:.0f} ms")
+                return True
+            time.sleep(0.01)
+        print("✖ el cambio no llegó a la caché")
+        return False
+    finally:
+        vigilante.detener()
+        cliente.drop_database(base.name)
+
+
+if __name__ == "__main__":
+    # python vigilante.py --check [--uri mongodb://localhost:27017/?replicaSet=rs0] [--sondeo]
+    import argparse
+    import sys
+
+    import db
+
+    parser = argparse.ArgumentParser(description="Verifica el vigilante contra un Mongo real.")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--uri", default=None, help="por defecto mongo_uri de secrets o MONGO_URI")
+    parser.add_argument("--sondeo", action="store_true", help="forzar el modo sin change streams")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if _verificar(args.uri or db._config("mongo_uri"), cambios=not args.sondeo) else 1)
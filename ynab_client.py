@@ -0,0 +1,145 @@
+# ynab_client.py
+
+import threading
+import time
+
+import streamlit as st
+
+from instrumentacion import medir_api
+
+# (conexión, lectura)
+TIMEOUT = (3.05, 10)
+
+# Tras un fallo no se vuelve a llamar a YNAB hasta pasada la espera, que se duplica
+ESPERA_MIN = 5.0
+ESPERA_MAX = 300.0
+
+GRUPO_CAPITAL = "Savings"
+CATEGORIA_CAPITAL = "💜 1 min 1 COP 💸"
+
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+@st.cache_resource
+def _config():
+    # Los secretos se leen al primer uso, no al importar el módulo
+    return {
+        "token": st.secrets["ynab_token"],
+        "budget_id": st.secrets["ynab_budget_id"],
+        "base_url": st.secrets.get("ynab_base_url", "https://api.youneedabudget.com/v1"),
+        "ttl_segundos": float(st.secrets.get("ynab_ttl_segundos", 300)),
+    }
+
+
+# =========================
+# SESIÓN HTTP COMPARTIDA
+# =========================
+@st.cache_resource
+def _sesion():
+    import requests
+    sesion = requests.Session()
+    sesion.headers["Authorization"] = f"Bearer {_config()['token']}"
+
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+# =========================
+# ESTADO DELTA + TTL
+# =========================
+@st.cache_resource
+def _estado():
+    return {
+        "server_knowledge": None,
+        "grupos": {},
+        "categorias": {},
+        "id_capital": None,
+        "capital": None,
+        "expira": 0.0,
+        "espera": ESPERA_MIN,
+        "lock": threading.Lock(),
+    }
+
+
+def _es_capital(estado, cat):
+    return (
+        cat["name"] == CATEGORIA_CAPITAL
+        and estado["grupos"].get(cat["category_group_id"]) == GRUPO_CAPITAL
+    )
+
+
+@medir_api("ynab")
+def _sincronizar(estado):
+    # Con last_knowledge_of_server YNAB devuelve solo las categorías que cambiaron
+    params = {}
+    if estado["server_knowledge"] is not None:
+        params["last_knowledge_of_server"] = estado["server_knowledge"]
+
+    config = _config()
+    r = _sesion().get(
+        f"{config['base_url']}/budgets/{config['budget_id']}/categories",
+        params=params,
+        timeout=TIMEOUT
+    )
+    r.raise_for_status()
+    data = r.json()["data"]
+
+    for grupo in data["category_groups"]:
+        if grupo.get("deleted"):
+            estado["grupos"].pop(grupo["id"], None)
+        else:
+            estado["grupos"][grupo["id"]] = grupo["name"]
+
+    for grupo in data["category_groups"]:
+        for cat in grupo.get("categories", []):
+            if cat.get("deleted"):
+                estado["categorias"].pop(cat["id"], None)
+            else:
+                estado["categorias"][cat["id"]] = cat
+
+    # Borrada, renombrada o movida fuera del grupo (o el grupo renombrado): se busca otra vez
+    actual = estado["categorias"].get(estado["id_capital"])
+    if not actual or not _es_capital(estado, actual):
+        estado["id_capital"] = next(
+            (cat["id"] for cat in estado["categorias"].values() if _es_capital(estado, cat)), None
+        )
+
+    estado["server_knowledge"] = data.get("server_knowledge")
+
+
+def _capital(estado):
+    cat = estado["categorias"].get(estado["id_capital"])
+    if not cat:
+        return 0, 0, 0
+
+    balance = cat["balance"] / 1000
+    target = (cat.get("goal_target") or 0) / 1000
+    progress = cat.get("goal_percentage_complete") or 0
+
+    return balance, target, progress
+
+
+def obtener_capital():
+    import requests
+    estado = _estado()
+
+    with estado["lock"]:
+        if time.monotonic() < estado["expira"]:
+            return estado["capital"] or (0, 0, 0)
+
+        try:
+            _sincronizar(estado)
+        except (requests.RequestException, KeyError, ValueError):
+            # Sin red o respuesta inválida: se conserva el último valor conocido y
+            # cada rerun no vuelve a esperar el timeout
+            estado["expira"] = time.monotonic() + estado["espera"]
+            estado["espera"] = min(estado["espera"] * 2, ESPERA_MAX)
+            return estado["capital"] or (0, 0, 0)
+
+        estado["capital"] = _capital(estado)
+        estado["expira"] = time.monotonic() + _config()["ttl_segundos"]
+        estado["espera"] = ESPERA_MIN
+        return estado["capital"]